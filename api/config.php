@@ -19,3 +19,26 @@ if (!file_exists(CSV_PATH)) {
   @mkdir(dirname(CSV_PATH), 0775, true);
   file_put_contents(CSV_PATH, $header);
 }
+
+// Responses with is_online/is_active (last seen within 5 minutes) change without
+// new fixes: their ETag also changes every ONLINE_ETAG_BUCKET seconds
+define('ONLINE_ETAG_BUCKET', 60);
+
+// Reply 304 Not Modified when gps_log.csv is unchanged since the client's copy
+// (and, with $timeBucket seconds, within the same time bucket)
+function notModifiedSinceLog($timeBucket = 0) {
+  clearstatcache(true, CSV_PATH);
+  $etag = dechex(filemtime(CSV_PATH)) . '-' . dechex(filesize(CSV_PATH));
+  if ($timeBucket > 0) {
+    $etag .= '-' . dechex(intdiv(time(), $timeBucket));
+  }
+  $etag = '"' . $etag . '"';
+  header('ETag: ' . $etag);
+  header('Access-Control-Expose-Headers: ETag');
+  $match = $_SERVER['HTTP_IF_NONE_MATCH'] ?? '';
+  if ($match !== '' && in_array($etag, array_map('trim', explode(',', $match)), true)) {
+    http_response_code(304);
+    return true;
+  }
+  return false;
+}
@@ -13,6 +13,12 @@ if ($_SERVER['REQUEST_METHOD'] === 'OPTIONS') {
 
 $action = $_GET['action'] ?? 'devices';
 
+// Every action is derived from gps_log.csv alone, devices and stats also from the clock
+header('Cache-Control: no-cache');
+if (notModifiedSinceLog(in_array($action, ['devices', 'stats'], true) ? ONLINE_ETAG_BUCKET : 0)) {
+    exit(0);
+}
+
 switch ($action) {
     case 'devices':
         getAllDevices();
@@ -20,6 +26,9 @@ switch ($action) {
     case 'device':
         getDeviceData();
         break;
+    case 'batch':
+        getDevicesBatch();
+        break;
     case 'stats':
         getSystemStats();
         break;
@@ -138,6 +147,68 @@ function getDeviceData() {
     ]);
 }
 
+function getDevicesBatch() {
+    // Latest fixes of many devices in one request: device_ids=A,B or all
+    $requested = $_GET['device_ids'] ?? 'all';
+    $limit = isset($_GET['limit']) ? max(1, min(1000, intval($_GET['limit']))) : 10;
+    $all = ($requested === '' || $requested === 'all');
+
+    $devices = [];
+    if (!$all) {
+        foreach (explode(',', $requested) as $device_id) {
+            if ($device_id !== '') {
+                $devices[$device_id] = [];
+            }
+        }
+    }
+
+    $fh = fopen(CSV_PATH, 'r');
+    if (!$fh) {
+        http_response_code(500);
+        echo json_encode(['ok' => false, 'error' => 'cannot_open_csv']);
+        return;
+    }
+
+    $header = fgetcsv($fh); // skip header
+    while (($r = fgetcsv($fh)) !== false) {
+        $device_id = $r[1];
+        if (!$all && !isset($devices[$device_id])) {
+            continue;
+        }
+
+        $devices[$device_id][] = [
+            'timestamp_server_utc' => $r[0],
+            'device_id' => $r[1],
+            'timestamp_utc' => $r[2],
+            'lat' => floatval($r[3]),
+            'lng' => floatval($r[4]),
+            'speed_kmh' => ($r[5] !== '' ? floatval($r[5]) : null),
+            'alt_m' => ($r[6] !== '' ? floatval($r[6]) : null),
+            'sats' => ($r[7] !== '' ? intval($r[7]) : null),
+            'hdop' => ($r[8] !== '' ? floatval($r[8]) : null),
+            'ip' => $r[9]
+        ];
+
+        // Keep memory bounded to the last $limit rows per device
+        if (count($devices[$device_id]) > 2 * $limit) {
+            $devices[$device_id] = array_slice($devices[$device_id], -$limit);
+        }
+    }
+    fclose($fh);
+
+    foreach ($devices as &$rows) {
+        $rows = array_slice($rows, -$limit);
+    }
+    unset($rows);
+
+    echo json_encode([
+        'ok' => true,
+        'limit' => $limit,
+        'devices' => (object) $devices,
+        'count' => count($devices)
+    ]);
+}
+
 function getSystemStats() {
     $fh = fopen(CSV_PATH, 'r');
     if (!$fh) {
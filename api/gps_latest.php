@@ -19,6 +19,9 @@ if ($device_id === '') {
   echo json_encode(['ok'=>false,'error'=>'missing_device_id']);
   exit;
 }
+if (notModifiedSinceLog()) {
+  exit;
+}
 
 $fh = fopen(CSV_PATH, 'r');
 if (!$fh) {
@@ -24,5 +24,5 @@ if __name__ == "__main__":
     print(f"🌍 Location: Göteborg, Sweden")
     print(f"👨‍💻 Created by Eng. Nawoar Ekkou & Walace Cagnin")
     
-    # Start the server (modify the start_server function to accept port parameter)
-    start_server()
\ No newline at end of file
+    # Start the server; serving mode and workers come from GPS_SERVER_MODE / GPS_SERVER_WORKERS
+    start_server(port=port)
\ No newline at end of file
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Columnar Archive Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Compares on-disk size and scan speed of a gps_log.csv against the same fixes
+in the columnar archive format of gps_archive.py:
+
+  * full scan into JSON records (what history and export reads do)
+  * one device over the whole log
+  * a server time window covering a tenth of the log
+  * a column aggregate (average speed), which the archive answers from one
+    memory-mapped column without building records
+
+NumPy is used for the archive filters and aggregate when installed.
+
+Usage:
+    python benchmarks/bench_archive.py --rows 1000000 --devices 100
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench_common import print_results, synthetic_rows, write_json_results
+
+from gps_archive import GPSArchive, convert_csv, np
+from gps_log import CSV_HEADER, format_rows, iter_csv_rows, record_from_row, utc_now_iso
+
+
+def write_csv(path, rows, devices):
+    """Synthetic log in server time order (unlike write_synthetic_log's repeated blocks)"""
+    with open(path, 'w', newline='') as fh:
+        fh.write(CSV_HEADER)
+        chunk = []
+        for row in synthetic_rows(rows, devices):
+            chunk.append(row)
+            if len(chunk) == 10000:
+                fh.write(format_rows(chunk))
+                chunk = []
+        fh.write(format_rows(chunk))
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - started) * 1000, 1)
+
+
+def csv_scan(path, device_id=None, start=None, end=None):
+    records = 0
+    for row in iter_csv_rows(path):
+        if device_id is not None and row[1] != device_id:
+            continue
+        if (start is not None and row[0] < start) or (end is not None and row[0] > end):
+            continue
+        record_from_row(row)
+        records += 1
+    return records
+
+
+def csv_avg_speed(path):
+    speeds = [float(row[5]) for row in iter_csv_rows(path) if row[5] != '']
+    return round(sum(speeds) / len(speeds), 3)
+
+
+def archive_scan(path, device_id=None, start=None, end=None):
+    with GPSArchive(path) as archive:
+        return sum(1 for _ in archive.records(device_id, start, end))
+
+
+def archive_avg_speed(path):
+    with GPSArchive(path) as archive:
+        if np is not None:
+            speeds = archive.column('speed_kmh', numpy=True)
+            value = float(np.nanmean(speeds))
+            del speeds
+            return round(value, 3)
+        speeds = [speed for speed in archive.column('speed_kmh') if speed == speed]
+        return round(sum(speeds) / len(speeds), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=500000, help='Fixes in the generated log')
+    parser.add_argument('--devices', type=int, default=100, help='Devices in the generated log')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'gps_log.csv')
+        archive_path = os.path.join(tmp, 'gps_log.gpsc')
+        print(f"🛠️  Generating {args.rows} fixes for {args.devices} devices ...")
+        write_csv(csv_path, args.rows, args.devices)
+        _, convert_ms = timed(lambda: convert_csv(csv_path, archive_path))
+
+        with GPSArchive(archive_path) as archive:
+            window = max(1, (archive.ts_max - archive.ts_min) // 10)
+            middle = (archive.ts_min + archive.ts_max) // 2
+        start, end = utc_now_iso(middle), utc_now_iso(middle + window - 1)
+        device_id = 'FORKLIFT_0001'
+
+        cases = [
+            ('full scan', lambda: csv_scan(csv_path), lambda: archive_scan(archive_path)),
+            ('one device', lambda: csv_scan(csv_path, device_id),
+             lambda: archive_scan(archive_path, device_id)),
+            ('time window', lambda: csv_scan(csv_path, None, start, end),
+             lambda: archive_scan(archive_path, None, start, end)),
+            ('avg speed', lambda: csv_avg_speed(csv_path), lambda: archive_avg_speed(archive_path)),
+        ]
+        results = [{
+            'query': 'on-disk size (MB)',
+            'csv': round(os.path.getsize(csv_path) / 1024 / 1024, 1),
+            'archive': round(os.path.getsize(archive_path) / 1024 / 1024, 1),
+            'ratio': round(os.path.getsize(csv_path) / os.path.getsize(archive_path), 1),
+            'result': f'converted in {convert_ms} ms',
+        }]
+        for name, csv_fn, archive_fn in cases:
+            csv_result, csv_ms = timed(csv_fn)
+            archive_result, archive_ms = timed(archive_fn)
+            assert abs(csv_result - archive_result) < 0.01, f'{name}: {csv_result} != {archive_result}'
+            results.append({'query': f'{name} (ms)', 'csv': csv_ms, 'archive': archive_ms,
+                            'ratio': round(csv_ms / archive_ms, 1) if archive_ms else None,
+                            'result': csv_result})
+
+    print_results(f"CSV vs columnar archive ({args.rows} fixes, NumPy {'on' if np is not None else 'off'})",
+                  results, ['query', 'csv', 'archive', 'ratio', 'result'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Benchmark Helpers
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Shared helpers for the scripts in this folder: in-process servers on an
+ephemeral port, a keep-alive HTTP load driver and latency percentiles.
+"""
+
+import http.client
+import json
+import os
+import sys
+import threading
+import time
+
+# Make the repository root importable when run as `python benchmarks/<script>.py`
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from gps_http import create_server  # noqa: E402
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def synthetic_rows(count, devices=50, start_epoch=1759933800, interval_s=1.0, seed=42):
+    """Yield gps_log.csv rows for a synthetic fleet reporting round-robin"""
+    import random
+    rng = random.Random(seed)
+    positions = [[57.6870 + rng.uniform(-0.001, 0.001), 11.9755 + rng.uniform(-0.001, 0.001)]
+                 for _ in range(devices)]
+    for i in range(count):
+        device = i % devices
+        pos = positions[device]
+        pos[0] += rng.uniform(-0.00003, 0.00003)
+        pos[1] += rng.uniform(-0.00003, 0.00003)
+        ts = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(start_epoch + (i // devices) * interval_s))
+        yield [ts, f'FORKLIFT_{device + 1:04d}', ts, round(pos[0], 7), round(pos[1], 7),
+               round(rng.uniform(0, 15), 1), 102.0, rng.randint(5, 12), round(rng.uniform(0.7, 2.5), 1),
+               f'192.168.1.{device % 250 + 1}']
+
+
+def write_synthetic_log(path, rows=None, size_mb=None, devices=50):
+    """Write a synthetic gps_log.csv by row count or approximate size; returns rows written.
+
+    Large logs are produced by repeating a generated block so multi-GB files
+    can be written at disk speed.
+    """
+    import csv
+    import io
+    from gps_log import CSV_HEADER
+
+    block_rows = 20000
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator='\n').writerows(synthetic_rows(block_rows, devices))
+    block = buf.getvalue().encode()
+    target_bytes = size_mb * 1024 * 1024 if size_mb else None
+
+    written = 0
+    with open(path, 'wb') as fh:
+        fh.write(CSV_HEADER.encode())
+        if rows is not None and rows <= block_rows:
+            fh.write(b''.join(block.splitlines(keepends=True)[:rows]))
+            return rows
+        while True:
+            if rows is not None and written + block_rows > rows:
+                fh.write(b''.join(block.splitlines(keepends=True)[:rows - written]))
+                return rows
+            if target_bytes is not None and fh.tell() >= target_bytes:
+                return written
+            fh.write(block)
+            written += block_rows
+
+
+def write_ordered_log(path, rows, devices=50, start_epoch=1759933800, seed=42, cycle_s=600):
+    """Write a time-ordered synthetic gps_log.csv of ``rows`` fixes; returns the last epoch.
+
+    Every device reports once per second. Positions come from a random walk of
+    ``cycle_s`` seconds that is replayed over and over, so only the timestamps
+    are formatted per row and logs of 100M fixes are written in minutes.
+    """
+    from gps_log import CSV_HEADER
+
+    pieces = []
+    for row in synthetic_rows(devices * cycle_s, devices, start_epoch, seed=seed):
+        pieces.append((f',{row[1]},', ',' + ','.join(str(value) for value in row[3:]) + '\n'))
+    written = second = 0
+    with open(path, 'w', newline='', buffering=1024 * 1024) as fh:
+        fh.write(CSV_HEADER)
+        while written < rows:
+            ts = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(start_epoch + second))
+            step = (second % cycle_s) * devices
+            count = min(devices, rows - written)
+            fh.write(''.join(ts + prefix + ts + suffix for prefix, suffix in pieces[step:step + count]))
+            written += count
+            second += 1
+    return start_epoch + second - 1
+
+
+def quiet_handler(handler_class):
+    """Subclass a request handler with per-request stderr logging disabled"""
+    return type('Quiet' + handler_class.__name__, (handler_class,), {'log_message': lambda self, *args: None})
+
+
+def start_background_server(handler_class, mode='pool', workers=16):
+    """Start a server on 127.0.0.1 with an ephemeral port in a daemon thread"""
+    server = create_server(('127.0.0.1', 0), quiet_handler(handler_class), mode, workers)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    return server, server.server_address[1]
+
+
+def stop_background_server(server):
+    server.shutdown()
+    server.server_close()
+
+
+def run_http_load(port, path, clients=8, requests_per_client=200, method='GET',
+                  body_factory=None, headers=None, timeout=30):
+    """Drive ``clients`` concurrent keep-alive connections and collect latencies.
+
+    ``body_factory(client_index, request_index)`` returns the request body for
+    POST benchmarks.
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    start_gate = threading.Event()
+
+    def client(index):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+        local = []
+        local_errors = 0
+        start_gate.wait()
+        for i in range(requests_per_client):
+            body = body_factory(index, i) if body_factory else None
+            started = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    local_errors += 1
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+                continue
+            local.append(time.perf_counter() - started)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    for t in threads:
+        t.start()
+    started = time.perf_counter()
+    start_gate.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def print_results(title, rows, columns):
+    """Print benchmark rows as a fixed-width table"""
+    print(title)
+    print('-' * len(title))
+    widths = [max(len(col), *(len(str(row.get(col, ''))) for row in rows)) for col in columns]
+    print('  '.join(col.ljust(w) for col, w in zip(columns, widths)))
+    for row in rows:
+        print('  '.join(str(row.get(col, '')).ljust(w) for col, w in zip(columns, widths)))
+    print()
+
+
+def write_json_results(path, results):
+    """Write machine-readable results when --json is given"""
+    if not path:
+        return
+    with open(path, 'w') as fh:
+        json.dump(results, fh, indent=2)
+    print(f"📄 Results written to {path}")
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Export Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Peak Python memory and throughput of exporting a whole synthetic log as a
+GeoJSON FeatureCollection: building the records list and one json.dumps()
+(as the JSON history responses do) against the chunked generator of
+gps_export.py. Memory is traced with tracemalloc, which slows both cases
+down by the same factor.
+
+Usage:
+    python benchmarks/bench_export.py --rows 10000 100000 300000
+"""
+
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from bench_common import print_results, synthetic_rows, write_json_results
+
+from gps_export import export_chunks
+from gps_ingest import CSVLogFile
+from gps_log import CSV_HEADER
+
+
+def buffered_export(store):
+    records = list(store.query())
+    features = [{'type': 'Feature', 'geometry': {'type': 'Point', 'coordinates': [r['lng'], r['lat']]},
+                 'properties': r} for r in records]
+    return len(json.dumps({'type': 'FeatureCollection', 'features': features}).encode())
+
+
+def streaming_export(store):
+    return sum(len(chunk) for chunk in export_chunks(store.query(), 'geojson'))
+
+
+def measured(fn, store):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn(store)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 300000], help='Log sizes')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f'gps_log_{rows}.csv')
+            with open(path, 'w', newline='') as fh:
+                fh.write(CSV_HEADER)
+                csv.writer(fh, lineterminator='\n').writerows(synthetic_rows(rows))
+            store = CSVLogFile(path)
+            for name, fn in (('buffered', buffered_export), ('streaming', streaming_export)):
+                size, elapsed, peak = measured(fn, store)
+                results.append({'rows': rows, 'export': name, 'output_mb': round(size / 1e6, 1),
+                                'peak_mb': round(peak / 1e6, 1), 'rows_per_s': int(rows / elapsed)})
+
+    print_results('GeoJSON export of a whole log: buffered json.dumps vs chunked generator',
+                  results, ['rows', 'export', 'output_mb', 'peak_mb', 'rows_per_s'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
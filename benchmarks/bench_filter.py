@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Ingest Filter Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Feeds a synthetic one-fix-per-second fleet through the gps_filter.py stage
+and reports how many fixes (and CSV bytes) reach the log, why the others
+were left out, the cost per fix, and the mean distance of the stored
+positions from the true track. Each forklift alternates between driving
+(8-15 km/h) and parking, spends part of its time indoors (hdop 3-15, few
+satellites, metres of jitter) and reports an occasional 100-300 m spike.
+
+Usage:
+    python benchmarks/bench_filter.py --devices 50 --minutes 60
+"""
+
+import argparse
+import math
+import random
+import time
+
+from bench_common import print_results, write_json_results
+
+from gps_filter import METERS_PER_DEGREE, FixFilter, distance_m
+from gps_log import format_rows
+
+SITE_LAT, SITE_LNG = 57.6870, 11.9755
+START_EPOCH = 1759933800
+
+
+def synthetic_feed(devices, seconds, seed=5):
+    """(row, true_lat, true_lng) in arrival order, one fix per device per second"""
+    rng = random.Random(seed)
+    lng_scale = METERS_PER_DEGREE * math.cos(math.radians(SITE_LAT))
+    state = [{'x': rng.uniform(-100, 100), 'y': rng.uniform(-100, 100), 'heading': rng.uniform(0, 2 * math.pi),
+              'moving': rng.random() < 0.5, 'indoor': False, 'left': rng.randint(10, 120)} for _ in range(devices)]
+    feed = []
+    for t in range(seconds):
+        ts = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(START_EPOCH + t))
+        for d, s in enumerate(state):
+            s['left'] -= 1
+            if s['left'] <= 0:
+                s['moving'] = not s['moving']
+                s['indoor'] = rng.random() < 0.3
+                s['left'] = rng.randint(20, 180)
+            speed = 0.0
+            if s['moving']:
+                speed = rng.uniform(8, 15)
+                s['heading'] += rng.uniform(-0.2, 0.2)
+                s['x'] += math.cos(s['heading']) * speed / 3.6
+                s['y'] += math.sin(s['heading']) * speed / 3.6
+            hdop = rng.uniform(3, 15) if s['indoor'] else rng.uniform(0.7, 2.0)
+            sats = rng.randint(2, 6) if s['indoor'] else rng.randint(7, 12)
+            noise = 1.5 * hdop
+            x, y = s['x'] + rng.gauss(0, noise), s['y'] + rng.gauss(0, noise)
+            if rng.random() < 0.01:
+                x += rng.choice((-1, 1)) * rng.uniform(100, 300)
+            true_lat, true_lng = SITE_LAT + s['y'] / METERS_PER_DEGREE, SITE_LNG + s['x'] / lng_scale
+            row = [ts, f'FORKLIFT_{d + 1:04d}', ts, round(SITE_LAT + y / METERS_PER_DEGREE, 7),
+                   round(SITE_LNG + x / lng_scale, 7), round(speed + rng.uniform(0, 0.5) if speed else 0.0, 1),
+                   102.0, sats, round(hdop, 1), '192.168.1.10']
+            feed.append((row, true_lat, true_lng))
+    return feed
+
+
+def run(feed, fix_filter, batch=500):
+    """Stored rows, seconds spent and mean error of the stored positions"""
+    rows = [list(row) for row, _, _ in feed]
+    truth = {id(row): (lat, lng) for row, (_, lat, lng) in zip(rows, feed)}
+    stored = []
+    started = time.perf_counter()
+    for i in range(0, len(rows), batch):
+        chunk = rows[i:i + batch]
+        stored.extend(fix_filter(chunk) if fix_filter else chunk)
+    elapsed = time.perf_counter() - started
+    error = sum(distance_m(row[3], row[4], *truth[id(row)]) for row in stored) / max(1, len(stored))
+    return stored, elapsed, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=50, help='Forklifts reporting once per second')
+    parser.add_argument('--minutes', type=int, default=60, help='Minutes of traffic')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    feed = synthetic_feed(args.devices, args.minutes * 60)
+    cases = [('unfiltered', None), ('filter', FixFilter()), ('filter+smoothing', FixFilter(smooth=True))]
+    results = []
+    for name, fix_filter in cases:
+        stored, elapsed, error = run(feed, fix_filter)
+        counters = fix_filter.counters if fix_filter else {}
+        results.append({'case': name, 'received': len(feed), 'stored': len(stored),
+                        'stored_pct': round(100.0 * len(stored) / len(feed), 1),
+                        'csv_mb': round(len(format_rows(stored)) / 1e6, 2),
+                        'quality': counters.get('dropped_quality', 0), 'jump': counters.get('dropped_jump', 0),
+                        'stationary': counters.get('dropped_stationary', 0),
+                        'us_per_fix': round(elapsed * 1e6 / len(feed), 2) if fix_filter else 0.0,
+                        'mean_error_m': round(error, 1)})
+
+    print_results(f'Ingest filter on {len(feed)} synthetic fixes ({args.devices} devices, {args.minutes} min)',
+                  results, ['case', 'received', 'stored', 'stored_pct', 'csv_mb', 'quality', 'jump',
+                            'stationary', 'us_per_fix', 'mean_error_m'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
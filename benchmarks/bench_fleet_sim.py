@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Fleet Simulator Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Time per simulation tick for growing fleets: the per-vehicle dict update of
+update_forklift_position() in run_gps_app_enhanced.py (without its former
+sleep at waypoints) against the struct-of-arrays step of gps_fleet_sim.py,
+including turning the new positions into ingest rows. Run it with and
+without NumPy installed to see both code paths.
+
+Usage:
+    python benchmarks/bench_fleet_sim.py --vehicles 100 1000 10000 --ticks 20
+"""
+
+import argparse
+import math
+import random
+import time
+
+from bench_common import print_results, write_json_results
+
+import gps_fleet_sim
+from gps_fleet_sim import ARRIVAL_DEG, STEP_DEG, FleetSimulator
+from gps_log import utc_now_iso
+
+
+def dict_fleet(vehicles, seed=3):
+    rng = random.Random(seed)
+    fleet = {}
+    for i in range(vehicles):
+        destinations = [{'lat': 57.6870 + rng.uniform(-0.001, 0.001), 'lng': 11.9755 + rng.uniform(-0.001, 0.001)}
+                        for _ in range(4)]
+        fleet[f'SIM_{i + 1:05d}'] = ({'destinations': destinations, 'speed': rng.uniform(0.5, 1.5)}, {
+            'current_lat': destinations[0]['lat'], 'current_lng': destinations[0]['lng'],
+            'target_destination': 1, 'speed_kmh': 0.0, 'heading': 0.0, 'status': 'moving'})
+    return fleet
+
+
+def dict_tick(fleet):
+    """update_forklift_position() for every vehicle, then one row per vehicle"""
+    for config, state in fleet.values():
+        dest = config['destinations'][state['target_destination']]
+        lat_diff = dest['lat'] - state['current_lat']
+        lng_diff = dest['lng'] - state['current_lng']
+        distance = math.sqrt(lat_diff ** 2 + lng_diff ** 2)
+        if distance < ARRIVAL_DEG:
+            state['target_destination'] = (state['target_destination'] + 1) % len(config['destinations'])
+            dest = config['destinations'][state['target_destination']]
+            lat_diff = dest['lat'] - state['current_lat']
+            lng_diff = dest['lng'] - state['current_lng']
+            distance = math.sqrt(lat_diff ** 2 + lng_diff ** 2)
+        if distance > 0:
+            move_ratio = min(config['speed'] * STEP_DEG / distance, 1.0)
+            state['current_lat'] += lat_diff * move_ratio + random.uniform(-0.00002, 0.00002)
+            state['current_lng'] += lng_diff * move_ratio + random.uniform(-0.00002, 0.00002)
+            state['heading'] = (math.degrees(math.atan2(lng_diff, lat_diff)) + 90) % 360
+            state['speed_kmh'] = 8 + config['speed'] * 5 + random.uniform(-3, 3)
+    timestamp = utc_now_iso()
+    return [[timestamp, device_id, timestamp, round(state['current_lat'], 7), round(state['current_lng'], 7),
+             round(state['speed_kmh'], 1), 102.0, 9, 1.0, ''] for device_id, (_, state) in fleet.items()]
+
+
+def sim_tick(fleet):
+    fleet.step()
+    return fleet.rows()
+
+
+def per_tick_ms(tick, fleet, ticks):
+    started = time.perf_counter()
+    for _ in range(ticks):
+        rows = tick(fleet)
+    return rows, round((time.perf_counter() - started) * 1000 / ticks, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vehicles', type=int, nargs='+', default=[100, 1000, 10000], help='Fleet sizes')
+    parser.add_argument('--ticks', type=int, default=20, help='Ticks timed per fleet size')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    engine = 'numpy' if gps_fleet_sim.np is not None else 'stdlib'
+    results = []
+    for vehicles in args.vehicles:
+        dict_rows, dict_ms = per_tick_ms(dict_tick, dict_fleet(vehicles), args.ticks)
+        sim_rows, sim_ms = per_tick_ms(sim_tick, FleetSimulator(vehicles, seed=3), args.ticks)
+        assert len(dict_rows) == len(sim_rows) == vehicles
+        results.append({'vehicles': vehicles, 'dict_ms': dict_ms, f'{engine}_ms': sim_ms,
+                        'speedup': round(dict_ms / sim_ms, 1) if sim_ms else None,
+                        'fixes_per_s': int(vehicles / (sim_ms / 1000)) if sim_ms else None})
+
+    print_results(f'Simulator tick (step + ingest rows): per-vehicle dicts vs struct-of-arrays ({engine})',
+                  results, ['vehicles', 'dict_ms', f'{engine}_ms', 'speedup', 'fixes_per_s'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
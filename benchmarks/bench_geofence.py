@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Geofence Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Classifies random fixes over a site against hundreds of irregular polygon
+zones: testing every zone (bounding box, then polygon) against the grid
+index of gps_geofence.py, and the full GeofenceTracker path (classification
+plus enter/exit/dwell bookkeeping) fed with ingest rows.
+
+Usage:
+    python benchmarks/bench_geofence.py --zones 100 500 1000 --fixes 100000
+"""
+
+import argparse
+import math
+import random
+import time
+
+from bench_common import print_results, write_json_results
+
+from gps_geofence import GeofenceTracker, Zone, ZoneIndex
+
+SITE_CENTER = (57.6870, 11.9755)
+SITE_RADIUS_DEG = 0.01
+
+
+def random_zones(count, rng):
+    """Star-shaped polygons of 6-12 vertices, 10-60 m across, scattered over the site"""
+    zones = []
+    for number in range(count):
+        lat = SITE_CENTER[0] + rng.uniform(-SITE_RADIUS_DEG, SITE_RADIUS_DEG)
+        lng = SITE_CENTER[1] + rng.uniform(-SITE_RADIUS_DEG, SITE_RADIUS_DEG)
+        radius = rng.uniform(0.00005, 0.0003)
+        vertices = rng.randint(6, 12)
+        outline = [(lat + radius * rng.uniform(0.5, 1.0) * math.cos(2 * math.pi * k / vertices),
+                    lng + radius * rng.uniform(0.5, 1.0) * math.sin(2 * math.pi * k / vertices) * 1.9)
+                   for k in range(vertices)]
+        zones.append(Zone(f'Z{number}', f'Zone {number}', outline))
+    return zones
+
+
+def random_points(count, zones, rng):
+    """Half the fixes near a zone, half anywhere on the site"""
+    points = []
+    for i in range(count):
+        if i % 2:
+            min_lat, min_lng, max_lat, max_lng = rng.choice(zones).bbox
+            points.append((rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)))
+        else:
+            points.append((SITE_CENTER[0] + rng.uniform(-SITE_RADIUS_DEG, SITE_RADIUS_DEG),
+                           SITE_CENTER[1] + rng.uniform(-SITE_RADIUS_DEG, SITE_RADIUS_DEG)))
+    return points
+
+
+def linear_classify(zones, points):
+    return [[zone.zone_id for zone in zones if zone.contains(lat, lng)] for lat, lng in points]
+
+
+def grid_classify(index, points):
+    return [[zone.zone_id for zone in index.classify(lat, lng)] for lat, lng in points]
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--zones', type=int, nargs='+', default=[100, 500, 1000], help='Zone counts')
+    parser.add_argument('--fixes', type=int, default=100000, help='Fixes classified per zone count')
+    parser.add_argument('--devices', type=int, default=1000, help='Devices reporting in the tracker case')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    results = []
+    for count in args.zones:
+        zones = random_zones(count, rng)
+        points = random_points(args.fixes, zones, rng)
+        index, build_s = timed(ZoneIndex, zones)
+        expected, linear_s = timed(linear_classify, zones, points)
+        found, grid_s = timed(grid_classify, index, points)
+        assert [sorted(z) for z in found] == [sorted(z) for z in expected]
+
+        timestamps = [time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(1759933800 + i // args.devices))
+                      for i in range(args.fixes)]
+        rows = [[ts, f'DEV_{i % args.devices:05d}', ts, lat, lng, 8.0, 102.0, 9, 1.0, '']
+                for i, (ts, (lat, lng)) in enumerate(zip(timestamps, points))]
+        tracker = GeofenceTracker(index, dwell_s=60, max_events=len(rows) * 3)
+        _, tracker_s = timed(lambda: [tracker.add_rows(rows[i:i + 500]) for i in range(0, len(rows), 500)])
+
+        results.append({'zones': count, 'cells': len(index.cells), 'build_ms': round(build_s * 1000, 1),
+                        'linear_us': round(linear_s * 1e6 / args.fixes, 2),
+                        'grid_us': round(grid_s * 1e6 / args.fixes, 2),
+                        'speedup': round(linear_s / grid_s, 1),
+                        'tracker_fixes_per_s': int(args.fixes / tracker_s), 'events': tracker.seq})
+
+    print_results(f'Geofence classification of {args.fixes} fixes: every zone vs grid index (µs per fix)',
+                  results, ['zones', 'cells', 'build_ms', 'linear_us', 'grid_us', 'speedup',
+                            'tracker_fixes_per_s', 'events'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Heatmap Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Time to answer a traffic heatmap over the last day and the last week of a
+synthetic fleet log: binning the raw fixes of the range into tiles per
+request (what a client or a naive endpoint would do) against the hourly
+and daily rollups of gps_heatmap.py. Also reports how fast the rollups are
+built, as on the startup log scan.
+
+Usage:
+    python benchmarks/bench_heatmap.py --days 7 --devices 50 --interval 30 --zoom 18 21
+"""
+
+import argparse
+import time
+
+from bench_common import print_results, synthetic_rows, write_json_results
+
+from gps_heatmap import TrafficHeatmap, tile_xy
+from gps_log import utc_now_iso
+
+START_EPOCH = 1759881600  # 2025-10-08T00:00:00Z
+
+
+def raw_binning(rows, zoom, start, end):
+    """Tiles with fix counts and speeds, computed from the rows in range"""
+    tiles = {}
+    for row in rows:
+        if not start <= row[0] <= end:
+            continue
+        key = tile_xy(row[3], row[4], zoom)
+        aggregate = tiles.get(key)
+        if aggregate is None:
+            aggregate = tiles[key] = [0, 0.0, 0.0]
+        aggregate[0] += 1
+        aggregate[1] += row[5]
+        aggregate[2] = max(aggregate[2], row[5])
+    return len(tiles)
+
+
+def fastest(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--days', type=int, default=7, help='Days of fixes in the log')
+    parser.add_argument('--devices', type=int, default=50, help='Devices reporting')
+    parser.add_argument('--interval', type=float, default=30.0, help='Seconds between fixes of a device')
+    parser.add_argument('--zoom', type=int, nargs='+', default=[18, 21], help='Query zoom levels')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per query (the fastest is reported)')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    count = int(args.days * 86400 / args.interval) * args.devices
+    rows = list(synthetic_rows(count, devices=args.devices, start_epoch=START_EPOCH, interval_s=args.interval))
+    end = rows[-1][0]
+
+    heatmap = TrafficHeatmap()
+    started = time.perf_counter()
+    for _ in heatmap.observe(iter(rows)):
+        pass
+    build_s = time.perf_counter() - started
+    print(f"🔥 Rollups of {count} fixes built in {build_s:.2f}s ({int(count / build_s)} fixes/s), "
+          f"{heatmap.status()['hours']} hours, {heatmap.status()['days']} days")
+
+    results = []
+    for days in sorted({1, args.days}):
+        start = utc_now_iso(START_EPOCH + (args.days - days) * 86400)
+        for zoom in args.zoom:
+            tiles, raw_s = fastest(lambda: raw_binning(rows, zoom, start, end), args.repeat)
+            (_, total), rollup_s = fastest(lambda: heatmap.cells(zoom, start, end), args.repeat)
+            results.append({'days': days, 'zoom': zoom, 'tiles': total, 'raw_ms': round(raw_s * 1000, 1),
+                            'rollup_ms': round(rollup_s * 1000, 2), 'speedup': round(raw_s / rollup_s, 1)})
+            assert tiles == total
+
+    print_results(f'Heatmap query: raw binning vs rollups ({args.devices} devices, a fix every {args.interval:g}s)',
+                  results, ['days', 'zoom', 'tiles', 'raw_ms', 'rollup_ms', 'speedup'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - HTTP Serving Mode Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Compares requests/sec and latency percentiles of the enhanced server's
+GPSRequestHandler under the single, threaded and pool serving modes.
+
+Usage:
+    python benchmarks/bench_http_server.py --clients 16 --requests 500
+    python benchmarks/bench_http_server.py --slow-clients 2   # idle connections that stall a single-threaded server
+"""
+
+import argparse
+import socket
+
+from bench_common import (print_results, run_http_load, start_background_server,
+                          stop_background_server, write_json_results)
+
+import run_gps_app_enhanced as enhanced
+from gps_http import SERVER_MODES
+
+
+def open_slow_clients(port, count):
+    """Open connections that send half a request line and then go quiet"""
+    sockets = []
+    for _ in range(count):
+        sock = socket.create_connection(('127.0.0.1', port))
+        sock.sendall(b'GET /api/gps_latest.php')
+        sockets.append(sock)
+    return sockets
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', default=','.join(SERVER_MODES), help='Comma separated serving modes to compare')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent client connections')
+    parser.add_argument('--requests', type=int, default=300, help='Requests per client')
+    parser.add_argument('--workers', type=int, default=16, help='Worker threads for pool mode')
+    parser.add_argument('--slow-clients', type=int, default=0, help='Idle half-open connections held during the run')
+    parser.add_argument('--path', default='/api/gps_latest.php?device_id=FORKLIFT_001', help='Request path')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    enhanced.initialize_forklifts()
+
+    results = []
+    for mode in args.modes.split(','):
+        server, port = start_background_server(enhanced.GPSRequestHandler, mode, args.workers)
+        slow = open_slow_clients(port, args.slow_clients)
+        try:
+            result = run_http_load(port, args.path, clients=args.clients, requests_per_client=args.requests)
+        finally:
+            for sock in slow:
+                sock.close()
+            stop_background_server(server)
+        result['mode'] = mode
+        results.append(result)
+
+    print_results(f"HTTP serving modes ({args.clients} clients x {args.requests} requests, "
+                  f"{args.slow_clients} slow clients)",
+                  results, ['mode', 'requests', 'errors', 'requests_per_s', 'p50_ms', 'p95_ms', 'p99_ms'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Ingest Throughput Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Compares fixes/sec for single-record ingest (gps_ingest.php, one POST per
+fix) against batch ingest (gps_ingest_batch.php) with JSON array and NDJSON
+bodies. Fixes are written to a temporary CSV through the server's batching
+writer; the final flush is included in the measured time.
+
+Usage:
+    python benchmarks/bench_ingest.py --clients 8 --fixes 20000 --batch-size 500
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from bench_common import (print_results, run_http_load, start_background_server,
+                          stop_background_server, write_json_results)
+
+import run_gps_app_enhanced as enhanced
+
+API_HEADERS = {'X-API-Key': 'test_forklift_demo_2024', 'Content-Type': 'application/json'}
+
+
+def make_fix(client, seq):
+    return {
+        'device_id': f'BENCH_{client:04d}',
+        'timestamp_utc': '2025-10-08T14:30:23Z',
+        'lat': 57.6870 + seq * 1e-6,
+        'lng': 11.9755 - seq * 1e-6,
+        'speed_kmh': 8.5,
+        'alt_m': 102.0,
+        'sats': 9,
+        'hdop': 1.1,
+    }
+
+
+def run_case(name, port, path, clients, requests_per_client, fixes_per_request, body_factory, headers):
+    started = time.perf_counter()
+    result = run_http_load(port, path, clients=clients, requests_per_client=requests_per_client,
+                           method='POST', body_factory=body_factory, headers=headers)
+    enhanced.ingest_writer.flush()
+    elapsed = time.perf_counter() - started
+    fixes = result['requests'] * fixes_per_request
+    result.update({
+        'case': name,
+        'fixes': fixes,
+        'fixes_per_s': round(fixes / elapsed, 1),
+    })
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8, help='Concurrent client connections')
+    parser.add_argument('--fixes', type=int, default=20000, help='Total fixes per case')
+    parser.add_argument('--batch-size', type=int, default=500, help='Fixes per batch request')
+    parser.add_argument('--workers', type=int, default=16, help='Server worker threads')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    per_client = max(1, args.fixes // args.clients)
+    batches_per_client = max(1, per_client // args.batch_size)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        enhanced.setup_ingest(os.path.join(tmp, 'gps_log.csv'))
+        server, port = start_background_server(enhanced.GPSRequestHandler, 'pool', args.workers)
+        try:
+            def single_body(client, i):
+                return json.dumps(make_fix(client, i))
+
+            def array_body(client, i):
+                start = i * args.batch_size
+                return json.dumps([make_fix(client, start + k) for k in range(args.batch_size)])
+
+            def ndjson_body(client, i):
+                start = i * args.batch_size
+                return '\n'.join(json.dumps(make_fix(client, start + k)) for k in range(args.batch_size))
+
+            ndjson_headers = dict(API_HEADERS, **{'Content-Type': 'application/x-ndjson'})
+            results = [
+                run_case('single', port, '/api/gps_ingest.php', args.clients, per_client, 1,
+                         single_body, API_HEADERS),
+                run_case('batch-json', port, '/api/gps_ingest_batch.php', args.clients, batches_per_client,
+                         args.batch_size, array_body, API_HEADERS),
+                run_case('batch-ndjson', port, '/api/gps_ingest_batch.php', args.clients, batches_per_client,
+                         args.batch_size, ndjson_body, ndjson_headers),
+            ]
+        finally:
+            stop_background_server(server)
+            enhanced.shutdown_ingest()
+
+    print_results(f"Ingest throughput ({args.clients} clients, batch size {args.batch_size})",
+                  results, ['case', 'requests', 'errors', 'fixes', 'fixes_per_s', 'p50_ms', 'p99_ms'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Ingest Journal Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Fixes/sec through the batching log writer from concurrent appenders, without
+and with the gps_journal.py write-ahead journal, for each fsync policy; then
+the startup recovery time when --recover fixes were journaled but never
+reached the log (a crash with a long flush interval).
+
+Usage:
+    python benchmarks/bench_journal.py --threads 8 --fixes 100000 --batch 50 --recover 100000
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from bench_common import print_results, synthetic_rows, write_json_results
+
+from gps_ingest import CSVBatchWriter, CSVLogFile
+from gps_journal import IngestJournal
+
+
+def append_load(writer, rows, threads, batch):
+    """Seconds for ``threads`` appenders to push ``rows`` in batches of ``batch``, final flush included"""
+    chunks = [rows[i:i + batch] for i in range(0, len(rows), batch)]
+
+    def worker(offset):
+        for chunk in chunks[offset::threads]:
+            writer.append(chunk)
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    writer.flush()
+    return time.perf_counter() - started
+
+
+def run_case(tmp, name, rows, args, fsync, journaled):
+    path = os.path.join(tmp, f'{name}.csv')
+    journal = IngestJournal(os.path.join(tmp, f'{name}.journal'), fsync) if journaled else None
+    writer = CSVBatchWriter(path, fsync=fsync, fsync_interval=1.0, journal=journal).start()
+    elapsed = append_load(writer, rows, args.threads, args.batch)
+    writer.close()
+    return {'fsync': fsync, 'journal': 'on' if journaled else 'off', 'fixes_per_s': int(len(rows) / elapsed),
+            'journal_mb': round(journal.size / 1e6, 2) if journal else None}
+
+
+def run_recovery(tmp, rows):
+    """Journal ``rows`` without writing them to the log, then time recover()"""
+    path = os.path.join(tmp, 'recover.csv')
+    sink = CSVLogFile(path)
+    sink.open()
+    journal = IngestJournal(os.path.join(tmp, 'recover.journal'))
+    journal.recover(sink)
+    for i in range(0, len(rows), 500):
+        journal.append(i, rows[i:i + 500])
+    journal.close()
+
+    journal = IngestJournal(journal.path)
+    started = time.perf_counter()
+    recovered = journal.recover(sink)
+    elapsed = time.perf_counter() - started
+    journal.close()
+    sink.close()
+    return {'recovered': recovered, 'seconds': round(elapsed, 3), 'fixes_per_s': int(recovered / elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8, help='Concurrent appenders')
+    parser.add_argument('--fixes', type=int, default=100000, help='Fixes per case')
+    parser.add_argument('--batch', type=int, default=50, help='Fixes per append (one request)')
+    parser.add_argument('--recover', type=int, default=100000, help='Unwritten fixes to recover')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    rows = list(synthetic_rows(args.fixes))
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for fsync in ('never', 'interval', 'always'):
+            for journaled in (False, True):
+                results.append(run_case(tmp, f'{fsync}_{journaled}', rows, args, fsync, journaled))
+        recovery = run_recovery(tmp, list(synthetic_rows(args.recover)))
+
+    print_results(f'Log writer throughput ({args.threads} appenders, {args.batch} fixes per append)',
+                  results, ['fsync', 'journal', 'fixes_per_s', 'journal_mb'])
+    print_results('Startup recovery of journaled fixes missing from the log', [recovery],
+                  ['recovered', 'seconds', 'fixes_per_s'])
+    write_json_results(args.json, {'writer': results, 'recovery': recovery})
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Proximity Scan Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Time per proximity scan for growing fleets: comparing every pair of vehicles
+against the spatial hash of gps_proximity.py. Vehicles are spread at a fixed
+density (about one per 400 m², an aisle every 20 m) and move in random
+directions, so the number of close pairs grows with the fleet like on a
+busy site. The all-pairs scan is skipped above --max-all-pairs vehicles.
+
+Usage:
+    python benchmarks/bench_proximity.py --vehicles 1000 5000 20000
+"""
+
+import argparse
+import math
+import random
+import time
+
+from bench_common import print_results, write_json_results
+
+from gps_proximity import ProximityDetector, METERS_PER_DEGREE
+
+SITE_LAT, SITE_LNG = 57.6870, 11.9755
+SPACING_M = 20.0
+
+
+def loaded_detector(vehicles, rng):
+    """Detector holding two fixes (one second apart) per vehicle"""
+    side_m = SPACING_M * math.sqrt(vehicles)
+    lng_scale = METERS_PER_DEGREE * math.cos(math.radians(SITE_LAT))
+    detector = ProximityDetector()
+    now = time.time()
+    for i in range(vehicles):
+        x, y = rng.uniform(0, side_m), rng.uniform(0, side_m)
+        direction = rng.uniform(0, 2 * math.pi)
+        speed_ms = rng.uniform(0, 4)
+        for dt in (0.0, 1.0):
+            detector.update(f'SIM_{i:05d}', SITE_LAT + (y + math.sin(direction) * speed_ms * dt) / METERS_PER_DEGREE,
+                            SITE_LNG + (x + math.cos(direction) * speed_ms * dt) / lng_scale, now - 1 + dt)
+    return detector, now
+
+
+def all_pairs(detector, now):
+    """Every pair checked, as a scan without the spatial hash would"""
+    positions = detector.recent(now)
+    pairs = []
+    for i, a in enumerate(positions):
+        for b in positions[i + 1:]:
+            detector._check(a, b, pairs)
+    return pairs
+
+
+def pair_keys(pairs):
+    return sorted((a[0], b[0], severity) for a, b, _, _, severity in pairs)
+
+
+def timed_ms(fn, *args, repeat=3):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return result, round(best, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vehicles', type=int, nargs='+', default=[500, 1000, 5000, 20000], help='Fleet sizes')
+    parser.add_argument('--max-all-pairs', type=int, default=5000, help='Largest fleet timed with all pairs')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    results = []
+    for vehicles in args.vehicles:
+        detector, now = loaded_detector(vehicles, rng)
+        pairs, grid_ms = timed_ms(detector.close_pairs, now)
+        result = {'vehicles': vehicles, 'flagged_pairs': len(pairs), 'grid_ms': grid_ms,
+                  'all_pairs_ms': None, 'speedup': None}
+        if vehicles <= args.max_all_pairs:
+            expected, all_ms = timed_ms(all_pairs, detector, now, repeat=1)
+            assert pair_keys(expected) == pair_keys(pairs)
+            result.update(all_pairs_ms=all_ms, speedup=round(all_ms / grid_ms, 1))
+        results.append(result)
+
+    print_results('Proximity scan over the latest positions: all pairs vs spatial hash (ms per scan)',
+                  results, ['vehicles', 'flagged_pairs', 'all_pairs_ms', 'grid_ms', 'speedup'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
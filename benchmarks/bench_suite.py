@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - End-to-End Benchmark Suite
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Starts run_gps_app_enhanced.py as a separate process on a synthetic,
+time-ordered log of --log-rows fixes (10k to 100M) and measures, in order:
+
+    startup   seconds until the server answers, i.e. the log scan that rebuilds
+              the latest-fix index and the fleet statistics
+    load      --duration seconds of concurrent tracker ingest (simulated fleets
+              posting gps_ingest_batch.php every --interval) and dashboard
+              polling (gps_latest, batch, devices, stats, trails), with
+              throughput and latency percentiles per endpoint
+    scan      requests that read the whole log: history, trip metrics of one
+              device and of the fleet, and a CSV export
+    memory    server RSS after startup and after the load, and its peak
+              (of the primary process with --processes above 1)
+
+Results can be written as JSON (--json) with the commit, Python version and
+settings, and compared with an earlier run (--baseline): throughput drops and
+latency or duration increases beyond --tolerance percent are listed and make
+the script exit with status 1.
+
+Usage:
+    python benchmarks/bench_suite.py --log-rows 1000000 --duration 30 --json results.json
+    python benchmarks/bench_suite.py --log-rows 1000000 --baseline results.json
+    python benchmarks/bench_suite.py --log-rows 1000000 --processes 4 --baseline results.json
+    python benchmarks/bench_suite.py --log-rows 100000000 --log-cache /data/bench --scans history,fleet_metrics
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from bench_common import REPO_ROOT, percentile, print_results, write_json_results, write_ordered_log
+
+from gps_fleet_sim import FleetSimulator
+from gps_ingest import API_KEY, MAX_BATCH_RECORDS
+
+START_EPOCH = 1759933800
+POLL_PATHS = [
+    ('latest', '/api/gps_latest.php?device_id=FORKLIFT_0001&limit=50'),
+    ('batch', '/api/dashboard_api.php?action=batch&device_ids=all&limit=10'),
+    ('devices', '/api/dashboard_api.php?action=devices'),
+    ('stats', '/api/dashboard_api.php?action=stats'),
+    ('trails', '/api/forklift_trails.php'),
+]
+SCANS = ('history', 'device_metrics', 'fleet_metrics', 'export')
+# (metric, True when higher is better) compared against a baseline
+COMPARED = (('per_s', True), ('p95_ms', False), ('seconds', False), ('peak_rss_mb', False))
+
+
+def iso(epoch):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(epoch))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def prepared_log(args, work_dir):
+    """Path of the synthetic log for this run and its last epoch (reused from --log-cache when present)"""
+    name = f'gps_log_{args.log_rows}_{args.devices}.csv'
+    path = os.path.join(work_dir, 'gps_log.csv')
+    last_epoch = START_EPOCH + (args.log_rows + args.devices - 1) // args.devices - 1
+    if args.log_cache:
+        os.makedirs(args.log_cache, exist_ok=True)
+        cached = os.path.join(args.log_cache, name)
+        if not os.path.exists(cached):
+            write_ordered_log(cached + '.tmp', args.log_rows, args.devices, START_EPOCH)
+            os.replace(cached + '.tmp', cached)
+        # Ingest appends to the log, so the server gets a copy
+        shutil.copyfile(cached, path)
+    else:
+        write_ordered_log(path, args.log_rows, args.devices, START_EPOCH)
+    return path, last_epoch
+
+
+def rss_mb(pid):
+    """(current, peak) resident memory of a process in MB from /proc, or (None, None) elsewhere"""
+    values = {}
+    try:
+        with open(f'/proc/{pid}/status') as fh:
+            for line in fh:
+                name, _, value = line.partition(':')
+                if name in ('VmRSS', 'VmHWM'):
+                    values[name] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+
+def request(conn, method, path, body=None, headers=None):
+    """Send one request on a keep-alive connection; returns (status, body bytes)"""
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+class ServerProcess:
+    """run_gps_app_enhanced.py in a child process with its output in a file"""
+
+    def __init__(self, log_path, work_dir, port, workers, processes=1):
+        self.port = port
+        env = dict(os.environ, PYTHONUNBUFFERED='1', GPS_CSV_PATH=log_path, GPS_ACCESS_LOG='off',
+                   GPS_METRICS='1', GPS_STATS_CHECKPOINT=os.path.join(work_dir, 'stats.json'))
+        self.output = open(os.path.join(work_dir, 'server.out'), 'w')
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.join(REPO_ROOT, 'run_gps_app_enhanced.py'), '--port', str(port),
+             '--mode', 'pool', '--workers', str(workers), '--processes', str(processes)],
+            cwd=REPO_ROOT, env=env, stdout=self.output, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, timeout):
+        """Seconds until /metrics answers"""
+        started = time.perf_counter()
+        while time.perf_counter() - started < timeout:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'server exited with status {self.process.returncode}, see {self.output.name}')
+            try:
+                conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+                status, _ = request(conn, 'GET', '/metrics')
+                conn.close()
+                if status == 200:
+                    return time.perf_counter() - started
+            except OSError:
+                pass
+            time.sleep(0.05)
+        raise RuntimeError(f'server not ready after {timeout}s, see {self.output.name}')
+
+    def metric(self, name):
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        _, body = request(conn, 'GET', '/metrics')
+        conn.close()
+        for line in body.decode().splitlines():
+            if line.startswith(name + ' '):
+                return float(line.split()[1])
+        return None
+
+    def stop(self):
+        """SIGTERM (the server flushes its writer) and wait"""
+        if self.process.poll() is None:
+            self.process.send_signal(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=60)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.output.close()
+
+
+class Recorder:
+    """Latencies and errors per endpoint, shared by the load threads"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.fixes = 0
+        self._lock = threading.Lock()
+
+    def add(self, name, latencies, errors, fixes=0):
+        with self._lock:
+            self.latencies.setdefault(name, []).extend(latencies)
+            self.errors[name] = self.errors.get(name, 0) + errors
+            self.fixes += fixes
+
+    def results(self, phase, elapsed):
+        rows = []
+        for name in sorted(self.latencies):
+            latencies = sorted(self.latencies[name])
+            rows.append({'phase': phase, 'name': name, 'requests': len(latencies), 'errors': self.errors[name],
+                         'per_s': round(len(latencies) / elapsed, 1),
+                         'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+                         'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+                         'p99_ms': round(percentile(latencies, 99) * 1000, 2)})
+        return rows
+
+
+def ingest_client(port, index, vehicles, interval, batch_size, deadline, recorder, seed):
+    """One tracker gateway: a simulated fleet posting its fixes every ``interval`` seconds"""
+    fleet = FleetSimulator(vehicles, seed=seed + index, prefix=f'LOAD{index}')
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Content-Type': 'application/json', 'X-API-Key': API_KEY}
+    latencies, errors, accepted = [], 0, 0
+    while time.monotonic() < deadline:
+        tick_started = time.monotonic()
+        fleet.step(interval or 1.0)
+        fixes = fleet.fixes()
+        for start in range(0, len(fixes), batch_size):
+            started = time.perf_counter()
+            try:
+                status, body = request(conn, 'POST', '/api/gps_ingest_batch.php',
+                                       json.dumps(fixes[start:start + batch_size]), headers)
+            except (OSError, http.client.HTTPException):
+                errors += 1
+                conn.close()
+                conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+                continue
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors += 1
+            else:
+                accepted += json.loads(body).get('accepted', 0)
+        time.sleep(max(0.0, min(interval - (time.monotonic() - tick_started), deadline - time.monotonic())))
+    conn.close()
+    recorder.add('ingest_batch', latencies, errors, accepted)
+
+
+def poll_client(port, index, think_s, deadline, recorder):
+    """One dashboard: cycles through the polled endpoints with gzip enabled"""
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Accept-Encoding': 'gzip'}
+    latencies = {name: [] for name, _ in POLL_PATHS}
+    errors = dict.fromkeys(latencies, 0)
+    i = index
+    while time.monotonic() < deadline:
+        name, path = POLL_PATHS[i % len(POLL_PATHS)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            status, _ = request(conn, 'GET', path, headers=headers)
+        except (OSError, http.client.HTTPException):
+            errors[name] += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+            continue
+        latencies[name].append(time.perf_counter() - started)
+        if status != 200:
+            errors[name] += 1
+        if think_s:
+            time.sleep(think_s)
+    conn.close()
+    for name in latencies:
+        recorder.add(name, latencies[name], errors[name])
+
+
+def run_load(server, args):
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+    per_client = max(1, args.vehicles // max(1, args.ingest_clients))
+    threads = [threading.Thread(target=ingest_client, daemon=True,
+                                args=(server.port, i, per_client, args.interval, args.batch_size, deadline,
+                                      recorder, args.seed))
+               for i in range(args.ingest_clients)]
+    threads += [threading.Thread(target=poll_client, args=(server.port, i, args.think, deadline, recorder),
+                                 daemon=True) for i in range(args.pollers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    results = recorder.results('load', elapsed)
+    for result in results:
+        if result['name'] == 'ingest_batch':
+            result['fixes_per_s'] = round(recorder.fixes / elapsed, 1)
+    return results
+
+
+def run_scans(server, args, last_epoch):
+    window = f'from={iso(START_EPOCH)}&to={iso(last_epoch)}'
+    paths = {
+        'history': f'/api/history.php?device_id=FORKLIFT_0001&{window}&max_points=500',
+        'device_metrics': f'/api/dashboard_api.php?action=device&device_id=FORKLIFT_0001&limit=50&{window}',
+        'fleet_metrics': f'/api/dashboard_api.php?action=metrics&{window}',
+        'export': f'/api/export.php?format=csv&{window}',
+    }
+    results = []
+    for name in args.scans:
+        best, size, status = None, 0, None
+        for _ in range(args.scan_repeat):
+            conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=args.startup_timeout)
+            started = time.perf_counter()
+            status, body = request(conn, 'GET', paths[name])
+            elapsed = time.perf_counter() - started
+            conn.close()
+            size = len(body)
+            best = elapsed if best is None else min(best, elapsed)
+        results.append({'phase': 'scan', 'name': name, 'errors': int(status != 200), 'seconds': round(best, 3),
+                        'rows_per_s': round(args.log_rows / best) if best else None,
+                        'response_mb': round(size / 1e6, 2)})
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Rows of metrics that got worse than the baseline by more than ``tolerance`` percent"""
+    previous = {(row['phase'], row['name']): row for row in baseline.get('results', [])}
+    regressions = []
+    for row in results:
+        before = previous.get((row['phase'], row['name']))
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED:
+            old, new = before.get(metric), row.get(metric)
+            if not old or new is None:
+                continue
+            change = 100.0 * (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append({'phase': row['phase'], 'name': row['name'], 'metric': metric,
+                                    'baseline': old, 'now': new, 'change_pct': round(change, 1)})
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--log-rows', type=int, default=100000, help='Fixes in the synthetic log (10k-100M)')
+    parser.add_argument('--devices', type=int, default=50, help='Devices in the synthetic log')
+    parser.add_argument('--log-cache', help='Keep generated logs in this directory and reuse them')
+    parser.add_argument('--workers', type=int, default=16, help='Server worker threads')
+    parser.add_argument('--processes', type=int, default=1, help='Server processes sharing the port')
+    parser.add_argument('--duration', type=float, default=20, help='Seconds of concurrent load')
+    parser.add_argument('--vehicles', type=int, default=2000, help='Simulated tracker vehicles across ingest clients')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='Seconds between fleet reports (0: post as fast as possible)')
+    parser.add_argument('--ingest-clients', type=int, default=4, help='Concurrent ingest connections')
+    parser.add_argument('--batch-size', type=int, default=500, help=f'Fixes per batch (max {MAX_BATCH_RECORDS})')
+    parser.add_argument('--pollers', type=int, default=8, help='Concurrent dashboard connections')
+    parser.add_argument('--think', type=float, default=0.0, help='Seconds a poller waits between requests')
+    parser.add_argument('--scans', default=','.join(SCANS), help=f'Whole-log requests to time ({",".join(SCANS)})')
+    parser.add_argument('--scan-repeat', type=int, default=3, help='Runs per scan (the fastest is reported)')
+    parser.add_argument('--startup-timeout', type=float, default=3600, help='Seconds to wait for the server')
+    parser.add_argument('--seed', type=int, default=7, help='Seed of the simulated fleets')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    parser.add_argument('--baseline', help='Earlier --json output to compare with')
+    parser.add_argument('--tolerance', type=float, default=20.0, help='Allowed regression in percent')
+    args = parser.parse_args()
+    args.scans = [name for name in args.scans.split(',') if name]
+    unknown = set(args.scans) - set(SCANS)
+    if unknown:
+        parser.error(f'unknown scans: {", ".join(sorted(unknown))}')
+    args.batch_size = max(1, min(args.batch_size, MAX_BATCH_RECORDS))
+    started_at = iso(time.time())
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        generate_started = time.perf_counter()
+        log_path, last_epoch = prepared_log(args, work_dir)
+        log_mb = round(os.path.getsize(log_path) / 1e6, 1)
+        print(f"🗃️  Log: {args.log_rows} fixes, {log_mb} MB ready in {time.perf_counter() - generate_started:.1f}s")
+
+        server = ServerProcess(log_path, work_dir, free_port(), args.workers, args.processes)
+        try:
+            startup_s = server.wait_ready(args.startup_timeout)
+            startup_rss, _ = rss_mb(server.process.pid)
+            results = [{'phase': 'startup', 'name': 'log_scan', 'seconds': round(startup_s, 3),
+                        'rows_per_s': round(args.log_rows / startup_s), 'log_mb': log_mb}]
+            print(f"🚀 Server ready in {startup_s:.2f}s, running {args.duration:g}s of load...")
+            results += run_load(server, args)
+            stored = server.metric('gps_ingest_fixes_total')
+            load_rss, _ = rss_mb(server.process.pid)
+            results += run_scans(server, args, last_epoch)
+            final_rss, peak_rss = rss_mb(server.process.pid)
+            results.append({'phase': 'memory', 'name': 'server_rss', 'startup_rss_mb': startup_rss,
+                            'load_rss_mb': load_rss, 'final_rss_mb': final_rss, 'peak_rss_mb': peak_rss})
+        finally:
+            server.stop()
+
+    print()
+    print_results('Startup (log scan)', [r for r in results if r['phase'] == 'startup'],
+                  ['name', 'seconds', 'rows_per_s', 'log_mb'])
+    print_results(f'Load: {args.ingest_clients} ingest clients ({args.vehicles} vehicles every {args.interval:g}s), '
+                  f'{args.pollers} pollers, {args.duration:g}s ({int(stored or 0)} fixes stored)',
+                  [r for r in results if r['phase'] == 'load'],
+                  ['name', 'requests', 'errors', 'per_s', 'fixes_per_s', 'p50_ms', 'p95_ms', 'p99_ms'])
+    print_results('Whole-log requests (fastest of %d)' % args.scan_repeat, [r for r in results if r['phase'] == 'scan'],
+                  ['name', 'seconds', 'rows_per_s', 'response_mb', 'errors'])
+    print_results('Server memory (MB)', [r for r in results if r['phase'] == 'memory'],
+                  ['startup_rss_mb', 'load_rss_mb', 'final_rss_mb', 'peak_rss_mb'])
+
+    meta = {'commit': git_commit(), 'python': platform.python_version(), 'platform': platform.platform(),
+            'cpus': os.cpu_count(), 'started': started_at, 'settings': vars(args)}
+    write_json_results(args.json, {'meta': meta, 'results': results})
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        if regressions:
+            print_results(f'Regressions beyond {args.tolerance:g}% against {args.baseline}', regressions,
+                          ['phase', 'name', 'metric', 'baseline', 'now', 'change_pct'])
+            sys.exit(1)
+        print(f"✅ No regressions beyond {args.tolerance:g}% against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
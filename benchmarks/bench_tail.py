@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Tail Reader Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Compares reading the most recent fixes with a top-down scan (what
+api/gps_latest.php and dashboard_api.php?action=devices do) against the
+reverse block reader in gps_tail.py on a synthetic log.
+
+Usage:
+    python benchmarks/bench_tail.py --size-mb 2048 --devices 200
+    python benchmarks/bench_tail.py --log data/gps_log.csv
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from bench_common import print_results, write_json_results, write_synthetic_log
+
+from gps_log import iter_csv_rows, record_from_row
+from gps_tail import tail_by_device
+
+
+def forward_last_n(path, per_device, device_ids=None):
+    """PHP-style: parse every row from the top and keep the tail per device"""
+    wanted = set(device_ids) if device_ids is not None else None
+    devices = {}
+    for row in iter_csv_rows(path):
+        if wanted is not None and row[1] not in wanted:
+            continue
+        devices.setdefault(row[1], []).append(record_from_row(row))
+    return {device_id: rows[-per_device:] for device_id, rows in devices.items()}
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, round((time.perf_counter() - started) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--log', help='Existing GPS log to read (default: generate one)')
+    parser.add_argument('--size-mb', type=int, default=256, help='Size of the generated log')
+    parser.add_argument('--devices', type=int, default=100, help='Devices in the generated log')
+    parser.add_argument('--limit', type=int, default=10, help='Fixes per device to fetch')
+    parser.add_argument('--skip-forward', action='store_true', help='Skip the slow top-down scans')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.log
+        if not path:
+            path = os.path.join(tmp, 'gps_log.csv')
+            print(f"🛠️  Generating ~{args.size_mb} MB synthetic log ...")
+            write_synthetic_log(path, size_mb=args.size_mb, devices=args.devices)
+        size_mb = round(os.path.getsize(path) / 1024 / 1024, 1)
+
+        all_devices = list(tail_by_device(path, 1, None, 1 << 20)) if args.log else \
+            [f'FORKLIFT_{i + 1:04d}' for i in range(args.devices)]
+        one = all_devices[:1]
+
+        cases = [
+            ('one device', one),
+            ('all devices', all_devices),
+        ]
+        results = []
+        for name, device_ids in cases:
+            tail, tail_ms = timed(tail_by_device, path, args.limit, device_ids)
+            row = {'query': f'last {args.limit}, {name}', 'log_mb': size_mb, 'tail_ms': tail_ms}
+            if not args.skip_forward:
+                forward, forward_ms = timed(forward_last_n, path, args.limit, device_ids)
+                assert forward == tail, 'tail reader disagrees with top-down scan'
+                row['forward_ms'] = forward_ms
+                row['speedup'] = round(forward_ms / tail_ms, 1) if tail_ms else None
+            results.append(row)
+
+    print_results('Most recent fixes: top-down scan vs reverse tail reader', results,
+                  ['query', 'log_mb', 'forward_ms', 'tail_ms', 'speedup'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
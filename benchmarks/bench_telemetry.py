@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Telemetry Overhead Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Requests/sec and latency of gps_latest.php in pool mode with the request
+log written synchronously per request (as BaseHTTPRequestHandler does on
+stderr) against the gps_telemetry.py access log thread, then with request
+metrics and with the sampling profiler running on top. The log goes to a
+line-buffered temporary file in every case.
+
+Usage:
+    python benchmarks/bench_telemetry.py --clients 16 --requests 500
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+
+from bench_common import print_results, run_http_load, write_json_results
+
+import run_gps_app_enhanced as enhanced
+from gps_http import create_server
+from gps_telemetry import AccessLog, MetricsRegistry, SamplingProfiler
+
+
+def handler_for(log_path, buffered, metrics):
+    """GPSRequestHandler subclass logging to ``log_path``"""
+    attributes = {'metrics': metrics, 'access_log': None}
+    if buffered:
+        attributes['access_log'] = AccessLog(open(log_path, 'a', buffering=1, encoding='utf-8')).start()
+    else:
+        fh = open(log_path, 'a', buffering=1, encoding='utf-8')
+
+        def log_message(self, format, *args):
+            fh.write('%s - - [%s] %s\n' % (self.address_string(), self.log_date_time_string(), format % args))
+
+        attributes['log_message'] = log_message
+    return type('BenchGPSRequestHandler', (enhanced.GPSRequestHandler,), attributes)
+
+
+def run_case(handler_class, args, profiler=None):
+    server = create_server(('127.0.0.1', 0), handler_class, 'pool', args.workers)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    if profiler is not None:
+        profiler.start()
+    try:
+        return run_http_load(server.server_address[1], args.path, clients=args.clients,
+                             requests_per_client=args.requests)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        server.shutdown()
+        server.server_close()
+        if handler_class.access_log is not None:
+            handler_class.access_log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent client connections')
+    parser.add_argument('--requests', type=int, default=300, help='Requests per client')
+    parser.add_argument('--workers', type=int, default=16, help='Worker threads')
+    parser.add_argument('--path', default='/api/gps_latest.php?device_id=FORKLIFT_001', help='Request path')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    enhanced.initialize_forklifts()
+
+    cases = [('sync log', False, False, False), ('buffered log', True, False, False),
+             ('buffered log + metrics', True, True, False), ('+ profiler sampling', True, True, True)]
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, buffered, with_metrics, with_profiler in cases:
+            log_path = os.path.join(tmp, name.replace(' ', '_') + '.log')
+            handler_class = handler_for(log_path, buffered, MetricsRegistry() if with_metrics else None)
+            result = run_case(handler_class, args, SamplingProfiler() if with_profiler else None)
+            with open(log_path) as fh:
+                result['log_lines'] = sum(1 for _ in fh)
+            result['case'] = name
+            results.append(result)
+
+    print_results(f"Access log and telemetry overhead ({args.clients} clients x {args.requests} requests)",
+                  results, ['case', 'requests_per_s', 'p50_ms', 'p95_ms', 'p99_ms', 'errors', 'log_lines'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
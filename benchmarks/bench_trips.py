@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Trip Metrics Benchmark
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Compares the per-pair Haversine loop of calculateDeviceMetrics() in
+api/dashboard_api.php (ported line by line) against gps_trips.py on one long
+track and on a mixed fleet log computed per device vs in one batch call.
+Run it with and without NumPy installed to see both code paths; with NumPy
+an extra case starts from ready-made arrays (as archive columns are) instead
+of Python lists.
+
+Usage:
+    python benchmarks/bench_trips.py --points 1000000 --devices 100
+"""
+
+import argparse
+import math
+import random
+import time
+
+from bench_common import print_results, write_json_results
+
+import gps_trips
+from gps_trips import fleet_metrics, haversine_km, track_metrics
+
+
+def scalar_metrics(times, lats, lngs, speeds):
+    """calculateDeviceMetrics() as written in PHP: one function call per pair"""
+    total_distance = 0
+    reported = []
+    for i in range(1, len(times)):
+        total_distance += haversine_km(lats[i - 1], lngs[i - 1], lats[i], lngs[i])
+        if speeds[i] is not None:
+            reported.append(speeds[i])
+    return {
+        'total_distance': round(total_distance, 2),
+        'max_speed': max(reported) if reported else 0,
+        'avg_speed': round(sum(reported) / len(reported), 2) if reported else 0,
+        'duration': times[-1] - times[0],
+    }
+
+
+def synthetic_track(points, seed=7):
+    """Random walk around the Göteborg facility at 1 Hz with regular stops"""
+    rng = random.Random(seed)
+    times, lats, lngs, speeds = [], [], [], []
+    lat, lng, t = 57.6870, 11.9755, 1759933800
+    for i in range(points):
+        moving = (i // 300) % 4 != 3
+        if moving:
+            lat += rng.uniform(-2e-5, 2e-5)
+            lng += rng.uniform(-2e-5, 2e-5)
+        times.append(t)
+        lats.append(lat)
+        lngs.append(lng)
+        speeds.append(round(rng.uniform(3, 15), 1) if moving else 0.0)
+        t += 1
+    return times, lats, lngs, speeds
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, round((time.perf_counter() - started) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1000000, help='Fixes in the generated track / fleet log')
+    parser.add_argument('--devices', type=int, default=100, help='Devices in the fleet case')
+    parser.add_argument('--json', help='Write results as JSON to this file')
+    args = parser.parse_args()
+
+    print(f"🛠️  Generating {args.points} fixes ...")
+    times, lats, lngs, speeds = synthetic_track(args.points)
+    device_ids = [f'FORKLIFT_{i % args.devices + 1:04d}' for i in range(args.points)]
+    engine = 'numpy' if gps_trips.np is not None else 'stdlib'
+    results = []
+
+    scalar, scalar_ms = timed(lambda: scalar_metrics(times, lats, lngs, speeds))
+    vector, vector_ms = timed(lambda: track_metrics(times, lats, lngs, speeds))
+    assert math.isclose(scalar['total_distance'], vector['total_distance'], abs_tol=0.02)
+    results.append({'case': f'one track, {args.points} fixes', 'scalar_ms': scalar_ms,
+                    f'{engine}_ms': vector_ms, 'speedup': round(scalar_ms / vector_ms, 1),
+                    'distance_km': vector['total_distance']})
+
+    if gps_trips.np is not None:
+        # Columns already in arrays, as read from a gps_archive.py file
+        arrays = [gps_trips.np.asarray(column, dtype=float) for column in (times, lats, lngs, speeds)]
+        vector, vector_ms = timed(lambda: track_metrics(*arrays))
+        results.append({'case': 'one track, from arrays', 'scalar_ms': scalar_ms,
+                        f'{engine}_ms': vector_ms, 'speedup': round(scalar_ms / vector_ms, 1),
+                        'distance_km': vector['total_distance']})
+
+    def per_device():
+        tracks = {}
+        for i, device_id in enumerate(device_ids):
+            tracks.setdefault(device_id, []).append(i)
+        return {device_id: scalar_metrics([times[i] for i in rows], [lats[i] for i in rows],
+                                          [lngs[i] for i in rows], [speeds[i] for i in rows])
+                for device_id, rows in tracks.items()}
+
+    scalar, scalar_ms = timed(per_device)
+    batch, batch_ms = timed(lambda: fleet_metrics(device_ids, times, lats, lngs, speeds))
+    first = device_ids[0]
+    assert math.isclose(scalar[first]['total_distance'], batch[first]['total_distance'], abs_tol=0.02)
+    results.append({'case': f'{args.devices} devices, one call', 'scalar_ms': scalar_ms,
+                    f'{engine}_ms': batch_ms, 'speedup': round(scalar_ms / batch_ms, 1),
+                    'distance_km': batch[first]['total_distance']})
+
+    print_results(f'Trip metrics: PHP-style loop vs gps_trips ({engine})', results,
+                  ['case', 'scalar_ms', f'{engine}_ms', 'speedup', 'distance_km'])
+    write_json_results(args.json, results)
+
+
+if __name__ == '__main__':
+    main()
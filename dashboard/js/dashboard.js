@@ -7,6 +7,10 @@ class GPSDashboard {
         this.deviceTrailLines = new Map(); // Store polyline objects for trails
         this.isAutoRefresh = true;
         this.refreshInterval = 3000; // 3 seconds for more fluid animation
+        this.eventSource = null; // Live push stream; polling is the fallback
+        this.streamFailed = false;
+        this.pollCursor = null; // since= cursor of the last incremental poll
+        this.pollETag = null; // { url, etag } of the last incremental poll
         this.maxTrailPoints = 25; // Last 25 points for each device
         this.showTrails = true;
         this.currentDeviceFilter = '';
@@ -25,7 +29,6 @@ class GPSDashboard {
         this.loadDevicesFromStorage();
         await this.refreshAllDevices();
         this.startAutoRefresh();
-        this.updateConnectionStatus('online');
         this.showLoading(false);
     }
 
@@ -201,8 +204,8 @@ class GPSDashboard {
         }
 
         try {
-            const promises = deviceIds.map(deviceId => this.fetchDeviceData(deviceId));
-            await Promise.all(promises);
+            // One round trip for the whole fleet, carrying only fixes newer than the last poll
+            await this.fetchDevicesData(deviceIds, 10, true);
             this.updateConnectionStatus('online');
             this.updateStats();
             this.updateLastUpdateTime();
@@ -212,26 +215,50 @@ class GPSDashboard {
         }
     }
 
-    async fetchDeviceData(deviceId, limit = 10) {
+    async fetchDevicesData(deviceIds, limit = 10, incremental = false) {
         try {
-            const response = await fetch(`api/gps_latest.php?device_id=${encodeURIComponent(deviceId)}&limit=${limit}`);
+            const ids = encodeURIComponent(deviceIds.join(','));
+            let url = `api/dashboard_api.php?action=batch&device_ids=${ids}&limit=${limit}`;
+            const headers = {};
+            if (incremental && this.pollCursor) {
+                url += `&since=${encodeURIComponent(this.pollCursor)}`;
+                if (this.pollETag && this.pollETag.url === url) {
+                    headers['If-None-Match'] = this.pollETag.etag;
+                }
+            }
+            
+            const response = await fetch(url, { headers, cache: 'no-store' });
             
+            if (response.status === 304) {
+                // Nothing moved since the last poll
+                return {};
+            }
             if (!response.ok) {
                 throw new Error(`HTTP ${response.status}`);
             }
             
             const data = await response.json();
+            const devices = (data.ok && data.devices) || {};
             
-            if (data.ok && data.data.length > 0) {
-                this.updateDeviceLocation(deviceId, data.data);
-                return data.data;
-            } else {
-                console.warn(`No data for device ${deviceId}`);
-                return [];
+            if (incremental) {
+                // The PHP API has no cursors and always answers in full
+                this.pollCursor = data.cursor || null;
+                const etag = response.headers.get('ETag');
+                this.pollETag = etag ? { url, etag } : null;
             }
+            
+            deviceIds.forEach(deviceId => {
+                const locations = devices[deviceId] || [];
+                if (locations.length > 0) {
+                    this.updateDeviceLocation(deviceId, locations);
+                } else if (!incremental) {
+                    console.warn(`No data for device ${deviceId}`);
+                }
+            });
+            return devices;
         } catch (error) {
-            console.error(`Error fetching data for device ${deviceId}:`, error);
-            this.markDeviceOffline(deviceId);
+            console.error('Error fetching device data:', error);
+            deviceIds.forEach(deviceId => this.markDeviceOffline(deviceId));
             throw error;
         }
     }
@@ -637,8 +664,13 @@ class GPSDashboard {
         this.updateDeviceList();
         this.hideAddDeviceModal();
 
+        // Subscribe the live stream to the new device as well
+        if (this.isAutoRefresh && !this.streamFailed) {
+            this.startAutoRefresh();
+        }
+
         // Try to fetch data for the new device
-        this.fetchDeviceData(deviceId).catch(() => {
+        this.fetchDevicesData([deviceId]).catch(() => {
             // Device might not have sent data yet
         });
     }
@@ -694,34 +726,103 @@ class GPSDashboard {
         this.deviceTrails.clear();
 
         if (this.showTrails) {
-            this.devices.forEach((device, deviceId) => {
-                if (device.lastLocation) {
-                    this.fetchDeviceData(deviceId, this.maxTrailPoints).then(data => {
-                        if (data.length > 1) {
-                            this.updateDeviceTrail(deviceId, data);
-                        }
-                    });
-                }
+            const deviceIds = Array.from(this.devices.keys())
+                .filter(deviceId => this.devices.get(deviceId).lastLocation);
+            if (deviceIds.length === 0) {
+                return;
+            }
+            this.fetchDevicesData(deviceIds, this.maxTrailPoints).then(devices => {
+                deviceIds.forEach(deviceId => {
+                    const data = devices[deviceId] || [];
+                    if (data.length > 1) {
+                        this.updateDeviceTrail(deviceId, data);
+                    }
+                });
+            }).catch(() => {
+                // Devices already marked offline
             });
         }
     }
 
     startAutoRefresh() {
         this.stopAutoRefresh();
-        if (this.isAutoRefresh) {
-            this.refreshTimer = setInterval(() => {
-                this.refreshAllDevices();
-            }, this.refreshInterval);
+        if (!this.isAutoRefresh) {
+            return;
+        }
+        if (window.EventSource && !this.streamFailed) {
+            this.startStream();
+        } else {
+            this.startPolling();
         }
     }
 
     stopAutoRefresh() {
+        this.stopStream();
         if (this.refreshTimer) {
             clearInterval(this.refreshTimer);
             this.refreshTimer = null;
         }
     }
 
+    startPolling() {
+        this.refreshTimer = setInterval(() => {
+            this.refreshAllDevices();
+        }, this.refreshInterval);
+    }
+
+    startStream() {
+        // One push connection for all devices instead of one request per device per tick
+        const deviceIds = Array.from(this.devices.keys());
+        if (deviceIds.length === 0) {
+            this.updateConnectionStatus('online');
+            return;
+        }
+
+        this.updateConnectionStatus('connecting');
+        const source = new EventSource(`api/gps_stream.php?device_ids=${encodeURIComponent(deviceIds.join(','))}`);
+        this.eventSource = source;
+
+        source.onopen = () => {
+            this.updateConnectionStatus('online');
+        };
+
+        source.addEventListener('fixes', (event) => {
+            const fixes = JSON.parse(event.data);
+            const byDevice = new Map();
+            fixes.forEach(fix => {
+                if (!byDevice.has(fix.device_id)) {
+                    byDevice.set(fix.device_id, []);
+                }
+                byDevice.get(fix.device_id).push(fix);
+            });
+            byDevice.forEach((locationData, deviceId) => {
+                this.updateDeviceLocation(deviceId, locationData);
+            });
+            this.updateStats();
+            this.updateLastUpdateTime();
+        });
+
+        source.onerror = () => {
+            if (source.readyState === EventSource.CLOSED) {
+                // Stream refused (e.g. single-threaded server or client limit): poll instead
+                console.warn('Live stream unavailable, falling back to polling');
+                this.stopStream();
+                this.streamFailed = true;
+                this.startPolling();
+            } else {
+                // The browser reconnects on its own
+                this.updateConnectionStatus('connecting');
+            }
+        };
+    }
+
+    stopStream() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+
     updateConnectionStatus(status) {
         const indicator = document.getElementById('connection-indicator');
         const text = document.getElementById('connection-text');
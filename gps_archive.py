@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Columnar Binary Archive for Sealed GPS Logs
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Stores a finished gps_log.csv (or a sealed partition segment) column by
+column in fixed-width binary arrays, so historical reads skip CSV parsing
+and float conversion entirely and the file is a fraction of the size:
+
+    ts_server   int64    epoch seconds (timestamp_server_utc)
+    ts_device   int64    epoch milliseconds (timestamp_utc), INT64_MIN if unparseable
+    lat, lng    int32    degrees * 1e7 (about 1 cm)
+    speed_kmh   float32  NaN when missing (also alt_m, hdop)
+    sats        int16    -1 when missing
+    device      uint16   index into the device_id dictionary (uint32 beyond 65535 ids)
+    ip          uint16   index into the ip dictionary
+
+File layout: a fixed header (magic, version, flags, row count, server time
+range, metadata length), a JSON metadata block with the column directory
+and both dictionaries, then the columns, each 8-byte aligned. Readers mmap
+the file and expose columns as memoryviews (or NumPy arrays when NumPy is
+installed) without copying. Columns are stored in little-endian order, the
+native order of the x86 and ARM hosts the server runs on.
+
+Timestamps are normalized on the way in: timestamp_utc comes back as
+'YYYY-MM-DDTHH:MM:SS[.mmm]Z' whatever offset notation the tracker sent. A
+timestamp_utc that does not parse is kept verbatim in the metadata
+('device_times', by row) and returned as it was logged. Rows with
+coordinates outside -90..90 / -180..180 (or not numbers at all) are left
+out, and satellite counts beyond the int16 range are clamped.
+
+    python gps_archive.py convert data/gps_log.csv data/gps_log.gpsc
+    python gps_archive.py info data/gps_log.gpsc
+"""
+
+import argparse
+import bisect
+import json
+import math
+import mmap
+import os
+import struct
+import time
+from array import array
+
+from gps_log import iter_csv_rows, parse_utc, utc_now_iso
+
+try:
+    import numpy as np
+except ImportError:  # optional, memoryviews are used instead
+    np = None
+
+MAGIC = b'GPSC'
+FORMAT_VERSION = 1
+FLAG_SORTED = 1
+HEADER = struct.Struct('<4sHHQqqI')
+ALIGNMENT = 8
+COORD_SCALE = 10_000_000
+MISSING_TIME = -(1 << 63)
+MISSING_SATS = -1
+MAX_LAT = 90 * COORD_SCALE
+MAX_LNG = 180 * COORD_SCALE
+SATS_RANGE = (-(1 << 15), (1 << 15) - 1)
+ARCHIVE_SUFFIX = '.gpsc'
+
+COLUMNS = [
+    ('ts_server', 'q'),
+    ('ts_device', 'q'),
+    ('lat', 'i'),
+    ('lng', 'i'),
+    ('speed_kmh', 'f'),
+    ('alt_m', 'f'),
+    ('sats', 'h'),
+    ('hdop', 'f'),
+    ('device', 'H'),
+    ('ip', 'H'),
+]
+NUMPY_TYPES = {'q': '<i8', 'i': '<i4', 'h': '<i2', 'f': '<f4', 'H': '<u2', 'I': '<u4'}
+
+
+def _optional_float(value):
+    return float(value) if value != '' else math.nan
+
+
+def _format_device_time(milliseconds):
+    if milliseconds == MISSING_TIME:
+        return ''
+    seconds, millis = divmod(milliseconds, 1000)
+    text = utc_now_iso(seconds)
+    return f'{text[:-1]}.{millis:03d}Z' if millis else text
+
+
+def write_archive(path, rows, rejected=None):
+    """Encode CSV rows (in log order) into a columnar archive; returns rows written.
+
+    Rows the columns cannot hold (bad coordinates or server time) are left
+    out, and appended to the ``rejected`` list when one is given.
+    """
+    columns = {name: array(code) for name, code in COLUMNS}
+    dictionaries = {'device': {}, 'ip': {}}
+    device_times = {}  # row -> timestamp_utc text that does not parse
+    ts_server, ts_device = columns['ts_server'], columns['ts_device']
+    last_text, last_epoch = None, None
+    sorted_rows = True
+
+    for row in rows:
+        try:
+            lat = round(float(row[3]) * COORD_SCALE)
+            lng = round(float(row[4]) * COORD_SCALE)
+            speed, alt, hdop = _optional_float(row[5]), _optional_float(row[6]), _optional_float(row[8])
+            sats = int(float(row[7])) if row[7] != '' else MISSING_SATS
+        except (ValueError, OverflowError):
+            if rejected is not None:
+                rejected.append(row)
+            continue
+        if not (-MAX_LAT <= lat <= MAX_LAT and -MAX_LNG <= lng <= MAX_LNG):
+            if rejected is not None:
+                rejected.append(row)
+            continue
+        sats = max(SATS_RANGE[0], min(SATS_RANGE[1], sats))
+        if row[0] != last_text:
+            epoch = parse_utc(row[0])
+            if epoch is None:
+                if rejected is not None:
+                    rejected.append(row)
+                continue
+            last_text = row[0]
+            if last_epoch is not None and epoch < last_epoch:
+                sorted_rows = False
+            last_epoch = int(epoch)
+        device_time = parse_utc(row[2])
+        if device_time is None and row[2] != '':
+            device_times[str(len(ts_server))] = row[2]
+
+        ts_server.append(last_epoch)
+        ts_device.append(round(device_time * 1000) if device_time is not None else MISSING_TIME)
+        columns['lat'].append(lat)
+        columns['lng'].append(lng)
+        columns['speed_kmh'].append(speed)
+        columns['alt_m'].append(alt)
+        columns['sats'].append(sats)
+        columns['hdop'].append(hdop)
+        for name, value in (('device', row[1]), ('ip', row[9])):
+            codes = dictionaries[name]
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(codes)
+            columns[name].append(code)
+
+    for name in ('device', 'ip'):
+        if len(dictionaries[name]) > 0xFFFF:
+            columns[name] = array('I', columns[name])
+
+    count = len(ts_server)
+    directory = []
+    offset = 0
+    for name, _ in COLUMNS:
+        directory.append([name, columns[name].typecode, offset])
+        offset += -(-len(columns[name]) * columns[name].itemsize // ALIGNMENT) * ALIGNMENT
+    metadata = json.dumps({
+        'columns': directory,
+        'devices': list(dictionaries['device']),
+        'ips': list(dictionaries['ip']),
+        'device_times': device_times,
+    }, separators=(',', ':')).encode()
+    data_start = -(-(HEADER.size + len(metadata)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as fh:
+        fh.write(HEADER.pack(MAGIC, FORMAT_VERSION, FLAG_SORTED if sorted_rows else 0, count,
+                             min(ts_server) if count else 0, max(ts_server) if count else 0,
+                             len(metadata)))
+        fh.write(metadata)
+        for name, _, column_offset in directory:
+            fh.seek(data_start + column_offset)
+            columns[name].tofile(fh)
+        fh.truncate(data_start + offset)
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+def convert_csv(csv_path, archive_path):
+    """Archive a whole gps_log.csv; returns rows written"""
+    return write_archive(archive_path, iter_csv_rows(csv_path))
+
+
+class GPSArchive:
+    """Memory-mapped reader for a columnar archive.
+
+    ``column(name)`` returns a zero-copy view of one column. Views (and NumPy
+    arrays made from them) must not be used after ``close()``.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._views = {}
+        self._buffer = None
+        self._fh = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._fh.close()
+            raise ValueError(f'{path} is not a GPS archive')
+        magic, version, flags, rows, ts_min, ts_max, metadata_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f'{path} is not a GPS archive')
+        metadata = json.loads(self._map[HEADER.size:HEADER.size + metadata_length])
+        data_start = -(-(HEADER.size + metadata_length) // ALIGNMENT) * ALIGNMENT
+
+        self.rows = rows
+        self.sorted = bool(flags & FLAG_SORTED)
+        self.ts_min, self.ts_max = ts_min, ts_max
+        self.devices = metadata['devices']
+        self.ips = metadata['ips']
+        self._device_times = {int(row): text for row, text in metadata.get('device_times', {}).items()}
+        self._device_codes = {device_id: code for code, device_id in enumerate(self.devices)}
+        self._buffer = memoryview(self._map)
+        for name, code, offset in metadata['columns']:
+            start = data_start + offset
+            length = rows * struct.calcsize(code)
+            self._views[name] = self._buffer[start:start + length].cast(code)
+
+    def __len__(self):
+        return self.rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        try:
+            for view in self._views.values():
+                view.release()
+            if self._buffer is not None:
+                self._buffer.release()
+            self._map.close()
+        except BufferError:
+            # A NumPy array still references the map; it is unmapped once collected
+            pass
+        self._views = {}
+        self._buffer = None
+        self._fh.close()
+
+    def column(self, name, numpy=False):
+        """Zero-copy view of a column (a NumPy array with ``numpy=True``)"""
+        view = self._views[name]
+        if numpy:
+            if np is None:
+                raise RuntimeError('NumPy is not installed')
+            return np.frombuffer(view, dtype=NUMPY_TYPES[view.format])
+        return view
+
+    def _time_slice(self, start, end):
+        """Row range for server times in [start, end] (epoch seconds or ISO)"""
+        lower = None if start in (None, '') else math.ceil(parse_utc(start))
+        upper = None if end in (None, '') else math.floor(parse_utc(end))
+        if not self.sorted:
+            return 0, self.rows, lower, upper
+        ts = self._views['ts_server']
+        lo = bisect.bisect_left(ts, lower) if lower is not None else 0
+        hi = bisect.bisect_right(ts, upper) if upper is not None else self.rows
+        return lo, hi, None, None
+
+    def row_indexes(self, device_id=None, start=None, end=None, reverse=False):
+        """Indexes of matching rows in log order (newest first with ``reverse``)"""
+        lo, hi, lower, upper = self._time_slice(start, end)
+        code = None
+        if device_id is not None:
+            code = self._device_codes.get(device_id)
+            if code is None:
+                return []
+        if np is not None and (code is not None or lower is not None or upper is not None):
+            mask = np.ones(hi - lo, dtype=bool)
+            if code is not None:
+                mask &= self.column('device', numpy=True)[lo:hi] == code
+            ts = self.column('ts_server', numpy=True)[lo:hi]
+            if lower is not None:
+                mask &= ts >= lower
+            if upper is not None:
+                mask &= ts <= upper
+            indexes = (np.nonzero(mask)[0] + lo).tolist()
+        else:
+            devices, ts = self._views['device'], self._views['ts_server']
+            indexes = [i for i in range(lo, hi)
+                       if (code is None or devices[i] == code)
+                       and (lower is None or ts[i] >= lower)
+                       and (upper is None or ts[i] <= upper)]
+        if reverse:
+            indexes.reverse()
+        return indexes
+
+    def records(self, device_id=None, start=None, end=None, reverse=False):
+        """Yield JSON records in the api/gps_latest.php shape"""
+        indexes = self.row_indexes(device_id, start, end, reverse)
+        if not indexes:
+            return
+        lo, hi = min(indexes[0], indexes[-1]), max(indexes[0], indexes[-1]) + 1
+        if len(indexes) * 8 >= hi - lo:
+            # Dense selection: convert whole column slices at C speed
+            columns = {name: view[lo:hi].tolist() for name, view in self._views.items()}
+        else:
+            lo, columns = 0, self._views
+
+        ts_server, ts_device = columns['ts_server'], columns['ts_device']
+        lat, lng, sats = columns['lat'], columns['lng'], columns['sats']
+        speed, alt, hdop = columns['speed_kmh'], columns['alt_m'], columns['hdop']
+        devices, ips = columns['device'], columns['ip']
+        server_times, device_times = {}, {}
+
+        for row in indexes:
+            i = row - lo
+            epoch = ts_server[i]
+            server_time = server_times.get(epoch)
+            if server_time is None:
+                server_time = server_times[epoch] = utc_now_iso(epoch)
+            millis = ts_device[i]
+            device_time = device_times.get(millis)
+            if millis == MISSING_TIME:
+                device_time = self._device_times.get(row, '')
+            elif device_time is None:
+                if len(device_times) > 4096:
+                    device_times.clear()
+                device_time = device_times[millis] = _format_device_time(millis)
+            s, a, h, n = speed[i], alt[i], hdop[i], sats[i]
+            yield {
+                'timestamp_server_utc': server_time,
+                'device_id': self.devices[devices[i]],
+                'timestamp_utc': device_time,
+                'lat': lat[i] / COORD_SCALE,
+                'lng': lng[i] / COORD_SCALE,
+                'speed_kmh': None if s != s else round(s, 3),
+                'alt_m': None if a != a else round(a, 3),
+                'sats': None if n == MISSING_SATS else n,
+                'hdop': None if h != h else round(h, 3),
+                'ip': self.ips[ips[i]],
+            }
+
+    def iter_rows(self):
+        """Rows as CSV text fields, for consumers of gps_log.csv rows"""
+        for record in self.records():
+            yield [
+                record['timestamp_server_utc'], record['device_id'], record['timestamp_utc'],
+                repr(record['lat']), repr(record['lng']),
+                '' if record['speed_kmh'] is None else repr(record['speed_kmh']),
+                '' if record['alt_m'] is None else repr(record['alt_m']),
+                '' if record['sats'] is None else str(record['sats']),
+                '' if record['hdop'] is None else repr(record['hdop']),
+                record['ip'],
+            ]
+
+    def device_summary(self):
+        """{device_id: [points, first_seen, last_seen]} with ISO server times"""
+        summary = {}
+        devices, ts = self._views['device'], self._views['ts_server']
+        if np is not None and self.sorted and self.rows:
+            codes = self.column('device', numpy=True)
+            times = self.column('ts_server', numpy=True)
+            unique, first, counts = np.unique(codes, return_index=True, return_counts=True)
+            last = self.rows - 1 - np.unique(codes[::-1], return_index=True)[1]
+            return {self.devices[code]: [points, utc_now_iso(times[i]), utc_now_iso(times[j])]
+                    for code, points, i, j in zip(unique.tolist(), counts.tolist(),
+                                                  first.tolist(), last.tolist())}
+        for i in range(self.rows):
+            entry = summary.get(devices[i])
+            if entry is None:
+                summary[devices[i]] = [1, ts[i], ts[i]]
+            else:
+                entry[0] += 1
+                entry[1] = min(entry[1], ts[i])
+                entry[2] = max(entry[2], ts[i])
+        return {self.devices[code]: [points, utc_now_iso(first), utc_now_iso(last)]
+                for code, (points, first, last) in summary.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Columnar binary archive for GPS logs')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    convert = commands.add_parser('convert', help='Convert a gps_log.csv into an archive')
+    convert.add_argument('csv', help='GPS log, e.g. data/gps_log.csv')
+    convert.add_argument('archive', nargs='?', help='Output file (default: <csv>.gpsc)')
+
+    info = commands.add_parser('info', help='Describe an archive')
+    info.add_argument('archive')
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        out = args.archive or os.path.splitext(args.csv)[0] + ARCHIVE_SUFFIX
+        started = time.time()
+        rows = convert_csv(args.csv, out)
+        csv_size, archive_size = os.path.getsize(args.csv), os.path.getsize(out)
+        print(f"✅ Archived {rows} fixes to {out} in {time.time() - started:.1f}s")
+        print(f"   {csv_size / 1024:.0f} KB CSV -> {archive_size / 1024:.0f} KB "
+              f"({archive_size / max(csv_size, 1):.0%})")
+
+    elif args.command == 'info':
+        with GPSArchive(args.archive) as archive:
+            print(f"📦 {args.archive}: {archive.rows} fixes, {len(archive.devices)} devices, "
+                  f"{len(archive.ips)} IPs")
+            if archive.rows:
+                print(f"   {utc_now_iso(archive.ts_min)} .. {utc_now_iso(archive.ts_max)}"
+                      f"{'' if archive.sorted else ' (unsorted)'}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Response Snapshot Cache
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Position responses only change when the movement simulator completes a pass
+or a fix is ingested, and every dashboard polls the same few URLs. Instead of
+rebuilding, serializing and compressing the payload for each client, the
+server keeps the JSON bytes (and their gzip copy) per request path together
+with the ETag they were built for, and serves them until the ETag moves on.
+
+Environment:
+    GPS_RESPONSE_CACHE   cached request paths, least recently used evicted (default 256, 0 disables)
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from gps_http import gzip_body
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+class CachedResponse:
+    """Serialized response body and its gzip copy (None when too small to compress)"""
+
+    __slots__ = ('etag', 'body', 'gzipped')
+
+    def __init__(self, etag, body):
+        self.etag = etag
+        self.body = body
+        self.gzipped = gzip_body(body)
+
+
+class ResponseCache:
+    """Serialized responses keyed by request path, valid while their ETag is current"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(int(os.environ.get('GPS_RESPONSE_CACHE', DEFAULT_MAX_ENTRIES)))
+
+    def get(self, key, etag, build):
+        """Cached response for ``key`` at ``etag``; calls ``build()`` for the payload on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.etag == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Concurrent misses may build the same snapshot twice; the last one wins
+        entry = CachedResponse(etag, json.dumps(build()).encode())
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def status(self):
+        return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                'hits': self.hits, 'misses': self.misses}
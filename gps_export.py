@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Streaming Export
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Exports logged fixes of one device (or all) between two server times as CSV
+(the gps_log.csv columns), a GeoJSON FeatureCollection of Point features or
+newline-delimited JSON. Records are pulled one at a time from the log
+store's query() generator, serialized into chunks of about CHUNK_BYTES and
+written out with HTTP chunked transfer encoding (optionally through a
+streaming gzip compressor), so memory stays flat whatever the range.
+
+    /api/export.php?format=geojson&device_id=FORKLIFT_001&from=2025-10-01&to=2025-10-08
+
+From the command line, against a log file or partition directory:
+
+    python gps_export.py data/gps_log.csv --format ndjson --from 2025-10-01 > fixes.ndjson
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import zlib
+
+from gps_http import GZIP_LEVEL
+from gps_ingest import CSVLogFile
+from gps_log import CSV_COLUMNS, CSV_HEADER, normalize_time
+from gps_partitions import PartitionedLogStore
+
+CHUNK_BYTES = 64 * 1024
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'geojson': ('application/geo+json', 'geojson'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+_PROPERTY_COLUMNS = [column for column in CSV_COLUMNS if column not in ('lat', 'lng')]
+
+
+def _csv_pieces(records):
+    yield CSV_HEADER
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator='\n')
+    for record in records:
+        writer.writerow(['' if record[column] is None else record[column] for column in CSV_COLUMNS])
+        if buf.tell() >= CHUNK_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _geojson_pieces(records):
+    yield '{"type":"FeatureCollection","features":['
+    separator = ''
+    for record in records:
+        feature = {'type': 'Feature',
+                   'geometry': {'type': 'Point', 'coordinates': [record['lng'], record['lat']]},
+                   'properties': {column: record[column] for column in _PROPERTY_COLUMNS}}
+        yield separator + json.dumps(feature, separators=(',', ':'))
+        separator = ','
+    yield ']}\n'
+
+
+def _ndjson_pieces(records):
+    for record in records:
+        yield json.dumps(record, separators=(',', ':')) + '\n'
+
+
+def export_chunks(records, fmt, chunk_bytes=CHUNK_BYTES):
+    """Serialize ``records`` (oldest first) in ``fmt``, yielding byte chunks of about ``chunk_bytes``"""
+    pieces = {'csv': _csv_pieces, 'geojson': _geojson_pieces, 'ndjson': _ndjson_pieces}[fmt](records)
+    pending, size = [], 0
+    for piece in pieces:
+        pending.append(piece)
+        size += len(piece)
+        if size >= chunk_bytes:
+            yield ''.join(pending).encode()
+            pending, size = [], 0
+    if pending:
+        yield ''.join(pending).encode()
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """Compress a chunk stream into one gzip member as it goes"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def write_chunked(wfile, chunks):
+    """Write chunks with HTTP/1.1 chunked transfer encoding; returns the payload bytes sent"""
+    sent = 0
+    for chunk in chunks:
+        if chunk:
+            wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            sent += len(chunk)
+    wfile.write(b'0\r\n\r\n')
+    wfile.flush()
+    return sent
+
+
+def filtered_records(store, device_ids=None, start=None, end=None):
+    """Records of the listed devices (all when empty) from ``store.query()``, oldest first"""
+    if device_ids and len(device_ids) == 1:
+        return store.query(device_ids[0], start, end)
+    records = store.query(None, start, end)
+    if not device_ids:
+        return records
+    wanted = set(device_ids)
+    return (record for record in records if record['device_id'] in wanted)
+
+
+def export_filename(fmt, device_ids=None, start=None, end=None):
+    parts = ['gps_export'] + (device_ids[:1] if device_ids and len(device_ids) == 1 else [])
+    parts += [value[:10] for value in (start, end) if value]
+    return '_'.join(parts) + '.' + FORMATS[fmt][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export logged GPS fixes as CSV, GeoJSON or NDJSON')
+    parser.add_argument('log', help='gps_log.csv or a partitioned log directory')
+    parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+    parser.add_argument('--device', action='append', help='Device id (repeat for several; default all)')
+    parser.add_argument('--from', dest='start', help='First server time (ISO-8601 or epoch)')
+    parser.add_argument('--to', dest='end', help='Last server time (ISO-8601 or epoch)')
+    args = parser.parse_args()
+
+    store = PartitionedLogStore(args.log) if os.path.isdir(args.log) else CSVLogFile(args.log)
+    if isinstance(store, PartitionedLogStore):
+        store.open()
+    records = filtered_records(store, args.device, normalize_time(args.start), normalize_time(args.end))
+    out = sys.stdout.buffer
+    for chunk in export_chunks(records, args.format):
+        out.write(chunk)
+    out.flush()
+
+
+if __name__ == '__main__':
+    main()
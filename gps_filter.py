@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Fix Quality Filter
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Ingest pipeline stage that keeps noisy fixes out of the log, in this order:
+
+    quality      fixes with hdop above GPS_FILTER_MAX_HDOP or fewer than
+                 GPS_FILTER_MIN_SATS satellites are dropped (missing values pass)
+    jump         a fix further from the device's previous fix than its speed
+                 allows (the larger of the reported speeds, or GPS_FILTER_MAX_SPEED_KMH
+                 without one, plus the hdop accuracy of both fixes) is dropped;
+                 after MAX_JUMP_REJECTS in a row the new position is accepted, so a
+                 tracker that really moved while off is not lost
+    smoothing    optional: a per-device constant-velocity Kalman filter (in its
+                 alpha-beta form), with the measurement noise taken from hdop, so
+                 poor fixes are down-weighted instead of dropped
+    stationary   a fix within GPS_FILTER_STATIONARY_M of the last stored one with
+                 speed below STATIONARY_SPEED_KMH is not stored, except one every
+                 GPS_FILTER_HEARTBEAT seconds so the device stays online
+
+Filtered fixes still count as accepted by the ingest endpoints (trackers must
+not resend them); the counters in status() show what was left out.
+
+Environment:
+    GPS_INGEST_FILTER           1 enables the stage (default 0)
+    GPS_FILTER_MAX_HDOP         default 5.0
+    GPS_FILTER_MIN_SATS         default 4
+    GPS_FILTER_MAX_SPEED_KMH    plausibility limit without a reported speed (default 60)
+    GPS_FILTER_SMOOTH           1 enables Kalman smoothing (default 0)
+    GPS_FILTER_STATIONARY_M     default 3.0 (0 disables suppression)
+    GPS_FILTER_HEARTBEAT        seconds between stored stationary fixes (default 60)
+"""
+
+import math
+import os
+
+from gps_log import parse_utc
+
+DEFAULT_MAX_HDOP = 5.0
+DEFAULT_MIN_SATS = 4
+DEFAULT_MAX_SPEED_KMH = 60.0
+DEFAULT_STATIONARY_M = 3.0
+DEFAULT_HEARTBEAT_S = 60.0
+STATIONARY_SPEED_KMH = 1.0
+MAX_JUMP_REJECTS = 3
+JUMP_SPEED_FACTOR = 1.5
+JUMP_MARGIN_KMH = 15.0
+ACCURACY_M_PER_HDOP = 5.0
+PROCESS_NOISE_M2_S = 1.0
+VELOCITY_NOISE = 2.0  # process noise per second grows with (VELOCITY_NOISE * speed)^2
+METERS_PER_DEGREE = 111320.0
+COUNTERS = ('received', 'stored', 'dropped_quality', 'dropped_jump', 'dropped_stationary', 'smoothed')
+
+
+class DeviceTrack:
+    """Filter state of one device: last accepted raw fix, last stored fix and the Kalman estimate"""
+
+    __slots__ = ('lat', 'lng', 'epoch', 'speed', 'hdop', 'rejects',
+                 'stored_lat', 'stored_lng', 'stored_epoch', 'est_lat', 'est_lng', 'vel_lat', 'vel_lng', 'variance')
+
+    def __init__(self, lat, lng, epoch, speed, hdop):
+        self.lat, self.lng, self.epoch, self.speed, self.hdop = lat, lng, epoch, speed, hdop
+        self.rejects = 0
+        self.stored_lat = self.stored_lng = self.stored_epoch = None
+        self.est_lat, self.est_lng = lat, lng
+        self.vel_lat = self.vel_lng = 0.0
+        self.variance = _measurement_variance(hdop)
+
+
+def _measurement_variance(hdop):
+    return (ACCURACY_M_PER_HDOP * (hdop or 1.0)) ** 2
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """Equirectangular distance, accurate to well under a metre at site scale"""
+    d_lat = (lat2 - lat1) * METERS_PER_DEGREE
+    d_lng = (lng2 - lng1) * METERS_PER_DEGREE * math.cos(math.radians((lat1 + lat2) / 2))
+    return math.hypot(d_lat, d_lng)
+
+
+class FixFilter:
+    """Per-device quality, plausibility, smoothing and de-duplication of ingested rows"""
+
+    def __init__(self, max_hdop=DEFAULT_MAX_HDOP, min_sats=DEFAULT_MIN_SATS, max_speed_kmh=DEFAULT_MAX_SPEED_KMH,
+                 smooth=False, stationary_m=DEFAULT_STATIONARY_M, heartbeat_s=DEFAULT_HEARTBEAT_S):
+        self.max_hdop = max_hdop
+        self.min_sats = min_sats
+        self.max_speed_kmh = max_speed_kmh
+        self.smooth = smooth
+        self.stationary_m = stationary_m
+        self.heartbeat_s = heartbeat_s
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self._tracks = {}
+        self._times = {}
+
+    @classmethod
+    def from_env(cls):
+        """The configured filter, or None when GPS_INGEST_FILTER is off"""
+        if os.environ.get('GPS_INGEST_FILTER', '0').lower() not in ('1', 'true', 'yes', 'on'):
+            return None
+        return cls(float(os.environ.get('GPS_FILTER_MAX_HDOP', DEFAULT_MAX_HDOP)),
+                   int(os.environ.get('GPS_FILTER_MIN_SATS', DEFAULT_MIN_SATS)),
+                   float(os.environ.get('GPS_FILTER_MAX_SPEED_KMH', DEFAULT_MAX_SPEED_KMH)),
+                   os.environ.get('GPS_FILTER_SMOOTH', '0').lower() in ('1', 'true', 'yes', 'on'),
+                   float(os.environ.get('GPS_FILTER_STATIONARY_M', DEFAULT_STATIONARY_M)),
+                   float(os.environ.get('GPS_FILTER_HEARTBEAT', DEFAULT_HEARTBEAT_S)))
+
+    def __call__(self, rows):
+        """Ingest pipeline filter: the rows worth storing, smoothed when enabled"""
+        kept = [row for row in rows if self._keep(row)]
+        self.counters['received'] += len(rows)
+        self.counters['stored'] += len(kept)
+        # Batches mostly share a handful of timestamps; don't let the cache grow
+        self._times.clear()
+        return kept
+
+    def _epoch(self, value):
+        epoch = self._times.get(value)
+        if epoch is None:
+            epoch = self._times[value] = parse_utc(value)
+        return epoch
+
+    def _keep(self, row):
+        device_id, lat, lng, speed, sats, hdop = row[1], row[3], row[4], row[5], row[7], row[8]
+        if (hdop is not None and hdop > self.max_hdop) or (sats is not None and sats < self.min_sats):
+            self.counters['dropped_quality'] += 1
+            return False
+
+        epoch = self._epoch(row[2])
+        if epoch is None:
+            epoch = self._epoch(row[0])
+        track = self._tracks.get(device_id)
+        if track is None:
+            track = self._tracks[device_id] = DeviceTrack(lat, lng, epoch, speed, hdop)
+        elif self._implausible(track, lat, lng, epoch, speed, hdop):
+            track.rejects += 1
+            if track.rejects <= MAX_JUMP_REJECTS:
+                self.counters['dropped_jump'] += 1
+                return False
+            # The device really is somewhere else now: restart its track there
+            self._tracks[device_id] = track = DeviceTrack(lat, lng, epoch, speed, hdop)
+        else:
+            dt = max(0.0, epoch - track.epoch)
+            track.lat, track.lng, track.epoch, track.speed, track.hdop, track.rejects = \
+                lat, lng, max(epoch, track.epoch), speed, hdop, 0
+            if self.smooth:
+                lat, lng = row[3], row[4] = self._smoothed(track, lat, lng, dt, speed, hdop)
+
+        if self.stationary_m > 0 and track.stored_epoch is not None and (speed or 0.0) < STATIONARY_SPEED_KMH:
+            if (distance_m(track.stored_lat, track.stored_lng, lat, lng) < self.stationary_m
+                    and epoch - track.stored_epoch < self.heartbeat_s):
+                self.counters['dropped_stationary'] += 1
+                return False
+        track.stored_lat, track.stored_lng, track.stored_epoch = lat, lng, epoch
+        return True
+
+    def _implausible(self, track, lat, lng, epoch, speed, hdop):
+        speeds = [s for s in (speed, track.speed) if s is not None]
+        limit_kmh = max(speeds) * JUMP_SPEED_FACTOR + JUMP_MARGIN_KMH if speeds else self.max_speed_kmh
+        # Fixes stamped within the same second still get a second of travel
+        dt = max(1.0, epoch - track.epoch)
+        allowed = limit_kmh / 3.6 * dt + ACCURACY_M_PER_HDOP * ((hdop or 1.0) + (track.hdop or 1.0))
+        return distance_m(track.lat, track.lng, lat, lng) > allowed
+
+    def _smoothed(self, track, lat, lng, dt, speed, hdop):
+        """Constant-velocity Kalman step (alpha-beta form); a device reporting no speed is held still"""
+        dt = max(dt, 1.0)
+        speed_ms = (speed or 0.0) / 3.6
+        if speed_ms * 3.6 < STATIONARY_SPEED_KMH:
+            track.vel_lat = track.vel_lng = 0.0
+        track.est_lat += track.vel_lat * dt
+        track.est_lng += track.vel_lng * dt
+        track.variance += (PROCESS_NOISE_M2_S + (VELOCITY_NOISE * speed_ms) ** 2) * dt
+        gain = track.variance / (track.variance + _measurement_variance(hdop))
+        beta = gain * gain / (2.0 - gain)
+        r_lat, r_lng = lat - track.est_lat, lng - track.est_lng
+        track.est_lat += gain * r_lat
+        track.est_lng += gain * r_lng
+        track.vel_lat += beta * r_lat / dt
+        track.vel_lng += beta * r_lng / dt
+        track.variance *= 1.0 - gain
+        self.counters['smoothed'] += 1
+        return round(track.est_lat, 7), round(track.est_lng, 7)
+
+    def status(self):
+        received = self.counters['received']
+        return dict(self.counters, devices=len(self._tracks),
+                    stored_pct=round(100.0 * self.counters['stored'] / received, 1) if received else None)
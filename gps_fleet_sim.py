@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Fleet Load Simulator
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Simulates thousands of vehicles driving between waypoints around the site to
+soak-test the ingest and dashboard paths at realistic fleet sizes. State is
+kept as struct-of-arrays (one array per attribute, one slot per vehicle) and
+each tick moves the whole fleet in a single vectorized step with NumPy, or a
+flat stdlib loop over the same columns without it. Vehicles dwell at a
+waypoint for a number of ticks instead of sleeping, so no vehicle ever
+delays another.
+
+Movement follows update_forklift_position() in run_gps_app_enhanced.py:
+each tick a vehicle covers ``speed_factor * 0.00008`` degrees towards its
+current waypoint (per 2 s tick) with a little jitter.
+
+Inside the server the fleet is fed straight into the ingest pipeline, see
+GPS_SIM_* in DOCKER-README.md. Standalone, it posts each tick to a running
+server's batch endpoint:
+
+    python gps_fleet_sim.py --vehicles 5000 --url http://localhost:8000 --duration 300
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import time
+from urllib.parse import urlparse
+
+from gps_ingest import API_KEY, MAX_BATCH_RECORDS
+from gps_log import utc_now_iso
+
+try:
+    import numpy as np
+except ImportError:  # optional, the stdlib loop is used instead
+    np = None
+
+SITE_CENTER = (57.6870, 11.9755)
+SITE_RADIUS_DEG = 0.001
+WAYPOINTS_PER_VEHICLE = 4
+ARRIVAL_DEG = 0.0001  # about 10 metres, as in update_forklift_position()
+STEP_DEG = 0.00008  # per unit of speed factor and 2 s tick
+JITTER_DEG = 0.00002
+TICK_S = 2.0
+DEFAULT_INTERVAL = 2.0
+MAX_DWELL_TICKS = 5
+
+
+class FleetSimulator:
+    """Struct-of-arrays state of a simulated fleet, advanced one tick at a time"""
+
+    def __init__(self, vehicles, seed=None, prefix='SIM', center=SITE_CENTER, radius=SITE_RADIUS_DEG,
+                 waypoints=WAYPOINTS_PER_VEHICLE):
+        self.vehicles = vehicles
+        self.device_ids = [f'{prefix}_{i + 1:05d}' for i in range(vehicles)]
+        self.ips = [f'10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}' for i in range(1, vehicles + 1)]
+        self.ticks = 0
+        rng = random.Random(seed)
+
+        # route[v][k] = (lat, lng) of waypoint k of vehicle v
+        routes = [[(center[0] + rng.uniform(-radius, radius), center[1] + rng.uniform(-radius, radius))
+                   for _ in range(waypoints)] for _ in range(vehicles)]
+        speed_factor = [rng.uniform(0.5, 1.5) for _ in range(vehicles)]
+        if np is not None:
+            self._rng = np.random.default_rng(seed)
+            self.route = np.array(routes, dtype=float).reshape(vehicles, waypoints, 2)
+            self.lat = self.route[:, 0, 0].copy()
+            self.lng = self.route[:, 0, 1].copy()
+            self.target = np.ones(vehicles, dtype=np.int64) % waypoints
+            self.speed_factor = np.array(speed_factor)
+            self.speed_kmh = np.zeros(vehicles)
+            self.heading = np.zeros(vehicles)
+            self.dwell = np.zeros(vehicles, dtype=np.int64)
+        else:
+            self._rng = rng
+            self.route = routes
+            self.lat = [route[0][0] for route in routes]
+            self.lng = [route[0][1] for route in routes]
+            self.target = [1 % waypoints] * vehicles
+            self.speed_factor = speed_factor
+            self.speed_kmh = [0.0] * vehicles
+            self.heading = [0.0] * vehicles
+            self.dwell = [0] * vehicles
+
+    def step(self, dt=TICK_S):
+        """Advance every vehicle by ``dt`` seconds"""
+        if np is not None:
+            self._step_numpy(dt)
+        else:
+            self._step_loop(dt)
+        self.ticks += 1
+
+    def _step_numpy(self, dt):
+        n, waypoints = self.vehicles, self.route.shape[1]
+        rows = np.arange(n)
+        dwelling = self.dwell > 0
+        self.dwell[dwelling] -= 1
+
+        d_lat = self.route[rows, self.target, 0] - self.lat
+        d_lng = self.route[rows, self.target, 1] - self.lng
+        arrived = ~dwelling & (np.hypot(d_lat, d_lng) < ARRIVAL_DEG)
+        if arrived.any():
+            self.target[arrived] = (self.target[arrived] + 1) % waypoints
+            self.dwell[arrived] = self._rng.integers(0, MAX_DWELL_TICKS + 1, int(arrived.sum()))
+            d_lat = self.route[rows, self.target, 0] - self.lat
+            d_lng = self.route[rows, self.target, 1] - self.lng
+
+        moving = ~dwelling
+        distance = np.hypot(d_lat, d_lng)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(distance > 0, np.minimum(self.speed_factor * STEP_DEG * dt / TICK_S / distance, 1.0), 0.0)
+        jitter = self._rng.uniform(-JITTER_DEG, JITTER_DEG, (2, n))
+        self.lat = np.where(moving, self.lat + d_lat * ratio + jitter[0], self.lat)
+        self.lng = np.where(moving, self.lng + d_lng * ratio + jitter[1], self.lng)
+        self.heading = np.where(moving, (np.degrees(np.arctan2(d_lng, d_lat)) + 90) % 360, self.heading)
+        speed = 8 + self.speed_factor * 5 + self._rng.uniform(-3, 3, n)
+        self.speed_kmh = np.where(moving, speed, 0.0)
+
+    def _step_loop(self, dt):
+        rng, route, waypoints = self._rng, self.route, len(self.route[0]) if self.route else 0
+        lat, lng, target, dwell = self.lat, self.lng, self.target, self.dwell
+        for v in range(self.vehicles):
+            if dwell[v] > 0:
+                dwell[v] -= 1
+                self.speed_kmh[v] = 0.0
+                continue
+            t_lat, t_lng = route[v][target[v]]
+            d_lat, d_lng = t_lat - lat[v], t_lng - lng[v]
+            if math.hypot(d_lat, d_lng) < ARRIVAL_DEG:
+                target[v] = (target[v] + 1) % waypoints
+                dwell[v] = rng.randint(0, MAX_DWELL_TICKS)
+                t_lat, t_lng = route[v][target[v]]
+                d_lat, d_lng = t_lat - lat[v], t_lng - lng[v]
+            distance = math.hypot(d_lat, d_lng)
+            ratio = min(self.speed_factor[v] * STEP_DEG * dt / TICK_S / distance, 1.0) if distance > 0 else 0.0
+            lat[v] += d_lat * ratio + rng.uniform(-JITTER_DEG, JITTER_DEG)
+            lng[v] += d_lng * ratio + rng.uniform(-JITTER_DEG, JITTER_DEG)
+            self.heading[v] = (math.degrees(math.atan2(d_lng, d_lat)) + 90) % 360
+            self.speed_kmh[v] = 8 + self.speed_factor[v] * 5 + rng.uniform(-3, 3)
+
+    def _columns(self):
+        if np is not None:
+            return (np.round(self.lat, 7).tolist(), np.round(self.lng, 7).tolist(),
+                    np.round(self.speed_kmh, 1).tolist())
+        return ([round(v, 7) for v in self.lat], [round(v, 7) for v in self.lng],
+                [round(v, 1) for v in self.speed_kmh])
+
+    def rows(self, now=None):
+        """Current position of every vehicle as gps_log.csv rows (the ingest pipeline's input)"""
+        timestamp = utc_now_iso(now)
+        lats, lngs, speeds = self._columns()
+        return [[timestamp, device_id, timestamp, lat, lng, speed, 102.0, 9, 1.0, ip]
+                for device_id, lat, lng, speed, ip in zip(self.device_ids, lats, lngs, speeds, self.ips)]
+
+    def fixes(self, now=None):
+        """Current position of every vehicle as tracker JSON payloads (gps_ingest_batch.php)"""
+        timestamp = utc_now_iso(now)
+        lats, lngs, speeds = self._columns()
+        return [{'device_id': device_id, 'timestamp_utc': timestamp, 'lat': lat, 'lng': lng,
+                 'speed_kmh': speed, 'alt_m': 102.0, 'sats': 9, 'hdop': 1.0}
+                for device_id, lat, lng, speed in zip(self.device_ids, lats, lngs, speeds)]
+
+
+def settings_from_env():
+    """(vehicles, interval, seed) of the in-server load generator; 0 vehicles means off"""
+    vehicles = int(os.environ.get('GPS_SIM_VEHICLES', 0))
+    interval = float(os.environ.get('GPS_SIM_INTERVAL', DEFAULT_INTERVAL))
+    seed = os.environ.get('GPS_SIM_SEED')
+    return vehicles, interval, int(seed) if seed else None
+
+
+def post_batches(url, fixes, api_key=API_KEY, connection=None):
+    """POST fixes to gps_ingest_batch.php in MAX_BATCH_RECORDS chunks; returns (accepted, connection)"""
+    parsed = urlparse(url)
+    if connection is None:
+        connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    accepted = 0
+    for start in range(0, len(fixes), MAX_BATCH_RECORDS):
+        body = json.dumps(fixes[start:start + MAX_BATCH_RECORDS]).encode()
+        connection.request('POST', parsed.path.rstrip('/') + '/api/gps_ingest_batch.php', body,
+                           {'Content-Type': 'application/json', 'X-API-Key': api_key})
+        response = connection.getresponse()
+        result = json.loads(response.read() or b'{}')
+        accepted += result.get('accepted', 0)
+    return accepted, connection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--vehicles', type=int, default=1000, help='Simulated vehicles')
+    parser.add_argument('--url', default='http://localhost:8000', help='Server to post fixes to')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help='Seconds between ticks')
+    parser.add_argument('--duration', type=float, default=60, help='Seconds to run (0: until Ctrl+C)')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for reproducible routes')
+    args = parser.parse_args()
+
+    fleet = FleetSimulator(args.vehicles, seed=args.seed)
+    print(f"🚜 Simulating {args.vehicles} vehicles ({'numpy' if np is not None else 'stdlib'} step), "
+          f"one tick every {args.interval}s -> {args.url}")
+    connection = None
+    started = time.monotonic()
+    sent = 0
+    try:
+        while not args.duration or time.monotonic() - started < args.duration:
+            tick_started = time.monotonic()
+            fleet.step(args.interval)
+            step_ms = (time.monotonic() - tick_started) * 1000
+            accepted, connection = post_batches(args.url, fleet.fixes(), connection=connection)
+            sent += accepted
+            elapsed = time.monotonic() - tick_started
+            print(f"   tick {fleet.ticks}: step {step_ms:.1f} ms, {accepted} fixes accepted in "
+                  f"{elapsed * 1000:.0f} ms ({sent / (time.monotonic() - started):.0f} fixes/s overall)")
+            time.sleep(max(0.0, args.interval - elapsed))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if connection is not None:
+            connection.close()
+    print(f"✅ {sent} fixes accepted in {time.monotonic() - started:.0f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Geofence Engine
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Classifies fixes against polygon zones ("Loading Dock", "Cold Storage", ...)
+and turns zone changes into events:
+
+    enter   the device's fix is inside a zone its previous fix was not in
+    exit    the device left a zone (with the time spent inside)
+    dwell   the device has stayed in a zone for GPS_GEOFENCE_DWELL seconds
+
+Zones are indexed in a uniform grid: each cell lists the zones whose bounding
+box overlaps it, so a fix is tested against the handful of zones near it
+instead of every zone. Zones spanning more than MAX_CELLS_PER_ZONE cells are
+kept in a short list checked by bounding box first.
+
+Zones are read from a GeoJSON FeatureCollection of Polygon features (name in
+``properties.name``); without one, a square around each named destination of
+the simulated forklifts is used. Events are kept in memory with sequence
+numbers, so pollers can ask for events after a "<epoch>-<seq>" cursor like
+gps_latest.php.
+
+Environment:
+    GPS_ZONES_FILE          GeoJSON zones (default: squares around the forklift destinations)
+    GPS_GEOFENCE_DWELL      seconds inside a zone before a dwell event (default 300)
+    GPS_GEOFENCE_EVENTS     events kept in memory (default 10000)
+"""
+
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from gps_index import parse_cursor
+from gps_log import parse_utc
+
+DEFAULT_DWELL_S = 300
+DEFAULT_MAX_EVENTS = 10000
+DESTINATION_ZONE_M = 15
+MAX_CELLS_PER_ZONE = 64
+METERS_PER_DEGREE = 111320.0
+EVENT_TYPES = ('enter', 'exit', 'dwell')
+
+
+class Zone:
+    """Polygon zone; ``rings`` are (lats, lngs) lists, the first the outline, the rest holes"""
+
+    __slots__ = ('zone_id', 'name', 'rings', 'bbox')
+
+    def __init__(self, zone_id, name, outline, holes=()):
+        self.zone_id = zone_id
+        self.name = name
+        self.rings = [([lat for lat, _ in ring], [lng for _, lng in ring]) for ring in (outline, *holes)]
+        lats, lngs = self.rings[0]
+        self.bbox = (min(lats), min(lngs), max(lats), max(lngs))
+
+    def contains(self, lat, lng):
+        min_lat, min_lng, max_lat, max_lng = self.bbox
+        if lat < min_lat or lat > max_lat or lng < min_lng or lng > max_lng:
+            return False
+        inside = _ring_contains(self.rings[0], lat, lng)
+        if inside:
+            for hole in self.rings[1:]:
+                if _ring_contains(hole, lat, lng):
+                    return False
+        return inside
+
+    def to_dict(self):
+        return {'id': self.zone_id, 'name': self.name,
+                'polygon': [[lat, lng] for lat, lng in zip(*self.rings[0])],
+                'bbox': list(self.bbox)}
+
+
+def _ring_contains(ring, lat, lng):
+    """Even-odd ray casting along the longitude axis"""
+    lats, lngs = ring
+    inside = False
+    j = len(lats) - 1
+    for i in range(len(lats)):
+        lat_i, lat_j = lats[i], lats[j]
+        if (lat_i > lat) != (lat_j > lat):
+            if lng < lngs[i] + (lat - lat_i) * (lngs[j] - lngs[i]) / (lat_j - lat_i):
+                inside = not inside
+        j = i
+    return inside
+
+
+def zones_from_geojson(data):
+    """Zones of a GeoJSON FeatureCollection (Polygon and MultiPolygon features)"""
+    zones = []
+    for number, feature in enumerate(data.get('features', []), 1):
+        geometry = feature.get('geometry') or {}
+        properties = feature.get('properties') or {}
+        name = properties.get('name') or f'Zone {number}'
+        zone_id = str(properties.get('id') or feature.get('id') or name)
+        if geometry.get('type') == 'Polygon':
+            polygons = [geometry['coordinates']]
+        elif geometry.get('type') == 'MultiPolygon':
+            polygons = geometry['coordinates']
+        else:
+            continue
+        for polygon in polygons:
+            # GeoJSON positions are [lng, lat]
+            outline, *holes = [[(point[1], point[0]) for point in ring] for ring in polygon]
+            zones.append(Zone(zone_id, name, outline, holes))
+    return zones
+
+
+def zones_from_destinations(forklift_config, half_size_m=DESTINATION_ZONE_M):
+    """A square zone around each named destination of the simulated forklifts"""
+    zones = {}
+    for config in forklift_config.values():
+        for dest in config['destinations']:
+            if dest['name'] in zones:
+                continue
+            d_lat = half_size_m / METERS_PER_DEGREE
+            d_lng = half_size_m / (METERS_PER_DEGREE * math.cos(math.radians(dest['lat'])))
+            lat, lng = dest['lat'], dest['lng']
+            zones[dest['name']] = Zone(dest['name'], dest['name'], [
+                (lat - d_lat, lng - d_lng), (lat - d_lat, lng + d_lng),
+                (lat + d_lat, lng + d_lng), (lat + d_lat, lng - d_lng)])
+    return list(zones.values())
+
+
+def load_zones(path=None, forklift_config=None):
+    """Zones from GPS_ZONES_FILE (or ``path``), else around the forklift destinations"""
+    path = path or os.environ.get('GPS_ZONES_FILE')
+    if path:
+        with open(path, encoding='utf-8') as fh:
+            return zones_from_geojson(json.load(fh))
+    return zones_from_destinations(forklift_config or {})
+
+
+class ZoneIndex:
+    """Uniform grid over the zones' bounding boxes"""
+
+    def __init__(self, zones, cell_deg=None):
+        self.zones = list(zones)
+        self.cell_deg = cell_deg or self._default_cell(self.zones)
+        self.cells = {}
+        self.large = []
+        for zone in self.zones:
+            min_lat, min_lng, max_lat, max_lng = zone.bbox
+            lat0, lng0 = self._cell(min_lat, min_lng)
+            lat1, lng1 = self._cell(max_lat, max_lng)
+            if (lat1 - lat0 + 1) * (lng1 - lng0 + 1) > MAX_CELLS_PER_ZONE:
+                self.large.append(zone)
+                continue
+            for i in range(lat0, lat1 + 1):
+                for j in range(lng0, lng1 + 1):
+                    self.cells.setdefault((i, j), []).append(zone)
+
+    @staticmethod
+    def _default_cell(zones):
+        """Median zone extent, so a zone covers a few cells and a cell holds a few zones"""
+        extents = sorted(max(zone.bbox[2] - zone.bbox[0], zone.bbox[3] - zone.bbox[1]) for zone in zones)
+        extent = extents[len(extents) // 2] if extents else 0
+        return extent or 0.001
+
+    def _cell(self, lat, lng):
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def classify(self, lat, lng):
+        """Zones containing the point (none for NaN or infinite coordinates)"""
+        if not (math.isfinite(lat) and math.isfinite(lng)):
+            return []
+        size = self.cell_deg
+        found = [zone for zone in self.cells.get((math.floor(lat / size), math.floor(lng / size)), ())
+                 if zone.contains(lat, lng)]
+        if self.large:
+            found.extend(zone for zone in self.large if zone.contains(lat, lng))
+        return found
+
+    def status(self):
+        return {'zones': len(self.zones), 'cells': len(self.cells), 'large_zones': len(self.large),
+                'cell_deg': self.cell_deg}
+
+
+class GeofenceTracker:
+    """Zone membership of every device and the enter/exit/dwell events it produced"""
+
+    def __init__(self, index, dwell_s=DEFAULT_DWELL_S, max_events=DEFAULT_MAX_EVENTS):
+        self.index = index
+        self.dwell_s = dwell_s
+        self.seq = 0
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self.events = deque(maxlen=max_events)
+        self.fixes = 0
+        self._inside = {}  # device_id -> {zone_id: [entered_at, entered_ts, dwell_reported]}
+        self._lock = threading.Lock()
+        self._last_ts = (None, None)
+
+    @classmethod
+    def from_env(cls, forklift_config=None):
+        return cls(ZoneIndex(load_zones(forklift_config=forklift_config)),
+                   float(os.environ.get('GPS_GEOFENCE_DWELL', DEFAULT_DWELL_S)),
+                   int(os.environ.get('GPS_GEOFENCE_EVENTS', DEFAULT_MAX_EVENTS)))
+
+    def add_rows(self, rows):
+        """Ingest pipeline listener: classify freshly accepted rows (server time, lat, lng)"""
+        with self._lock:
+            for row in rows:
+                self._observe(row[1], row[3], row[4], row[0])
+
+    def observe(self, device_id, lat, lng, timestamp):
+        """Classify one fix of a device that does not go through the ingest pipeline"""
+        with self._lock:
+            self._observe(device_id, lat, lng, timestamp)
+
+    def _seconds(self, timestamp):
+        # Rows of one batch share their server timestamp, parse it once
+        if self._last_ts[0] != timestamp:
+            seconds = parse_utc(timestamp)
+            self._last_ts = (timestamp, time.time() if seconds is None else seconds)
+        return self._last_ts[1]
+
+    def _observe(self, device_id, lat, lng, timestamp):
+        self.fixes += 1
+        zones = self.index.classify(lat, lng)
+        inside = self._inside.get(device_id)
+        if not zones and not inside:
+            return
+        now = self._seconds(timestamp)
+        if inside is None:
+            inside = self._inside[device_id] = {}
+        current = {zone.zone_id: zone for zone in zones}
+
+        for zone_id in [zone_id for zone_id in inside if zone_id not in current]:
+            entered_at, _, _ = inside.pop(zone_id)
+            self._emit('exit', device_id, zone_id, timestamp, lat, lng, now - entered_at)
+        for zone_id, visit in inside.items():
+            if not visit[2] and now - visit[0] >= self.dwell_s:
+                visit[2] = True
+                self._emit('dwell', device_id, zone_id, timestamp, lat, lng, now - visit[0])
+        for zone_id, zone in current.items():
+            if zone_id not in inside:
+                inside[zone_id] = [now, timestamp, False]
+                self._emit('enter', device_id, zone_id, timestamp, lat, lng, 0.0)
+        if not inside:
+            del self._inside[device_id]
+
+    def _emit(self, event_type, device_id, zone_id, timestamp, lat, lng, dwell_s):
+        self.seq += 1
+        self.events.append({'seq': self.seq, 'type': event_type, 'device_id': device_id, 'zone': zone_id,
+                            'timestamp': timestamp, 'lat': lat, 'lng': lng, 'dwell_s': round(dwell_s, 1)})
+
+    def cursor(self):
+        return f'{self.epoch}-{self.seq}'
+
+    def parse_cursor(self, value):
+        seq = parse_cursor(value, self.epoch)
+        return seq if seq is not None and seq <= self.seq else None
+
+    def events_since(self, seq=None, device_id=None, zone=None, event_type=None, limit=100):
+        """Newest ``limit`` matching events (after ``seq`` if given), oldest first"""
+        with self._lock:
+            events = list(self.events)
+        matched = []
+        for event in reversed(events):
+            if seq is not None and event['seq'] <= seq:
+                break
+            if ((device_id and event['device_id'] != device_id) or (zone and event['zone'] != zone)
+                    or (event_type and event['type'] != event_type)):
+                continue
+            matched.append(event)
+            if len(matched) >= limit:
+                break
+        matched.reverse()
+        return matched
+
+    def occupancy(self, now=None):
+        """zone_id -> devices currently inside with their entry time and dwell so far"""
+        now = time.time() if now is None else now
+        with self._lock:
+            visits = [(device_id, zone_id, visit[0], visit[1])
+                      for device_id, zones in self._inside.items() for zone_id, visit in zones.items()]
+        result = {zone.zone_id: [] for zone in self.index.zones}
+        for device_id, zone_id, entered_at, entered_ts in visits:
+            result[zone_id].append({'device_id': device_id, 'since': entered_ts,
+                                    'dwell_s': round(max(0.0, now - entered_at), 1)})
+        return result
+
+    def status(self):
+        return dict(self.index.status(), fixes=self.fixes, events=self.seq,
+                    devices_inside=len(self._inside), dwell_s=self.dwell_s)
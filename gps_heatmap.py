@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Traffic Heatmaps
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Bins logged fixes into Web Mercator map tiles (the x/y/zoom grid of slippy
+map tiles, with quadkeys) so operations can see where vehicles congregate
+and where they speed, without the browser aggregating raw points. Per tile:
+
+    count          fixes in the tile
+    dwell_s        seconds spent in the tile: the time from each fix to the
+                   device's next one, unless that gap exceeds GPS_HEATMAP_MAX_GAP
+    avg/max speed  of the fixes reporting speed_kmh
+    speeding       fixes at or above GPS_HEATMAP_SPEEDING_KMH
+
+Aggregates are kept at GPS_HEATMAP_ZOOM (the finest zoom served) in hourly
+and daily rollups keyed by server receive time, updated from the ingest
+pipeline and rebuilt during the startup log scan. A query at a coarser zoom
+merges tiles by shifting their coordinates, and a range uses the daily
+rollup for whole days and hourly ones for the partial days at its ends, so a
+week is a handful of dictionary merges. Ranges are widened to whole hours,
+or to whole days beyond the hourly retention.
+
+Environment:
+    GPS_HEATMAP                   0 disables heatmaps (default 1)
+    GPS_HEATMAP_ZOOM              finest tile zoom, about 10 m at zoom 21 on a site at 57° N (default 21)
+    GPS_HEATMAP_MAX_GAP           longest gap between two fixes counted as dwell, seconds (default 60)
+    GPS_HEATMAP_SPEEDING_KMH      speed counted as speeding (default 15)
+    GPS_HEATMAP_HOURLY_DAYS       days of hourly rollups kept (default 14)
+    GPS_HEATMAP_DAILY_DAYS        days of daily rollups kept (default 400)
+"""
+
+import math
+import os
+import threading
+
+from gps_log import parse_utc, utc_now_iso
+from gps_partitions import UNDATED_KEY, period_key
+
+DEFAULT_ZOOM = 21
+MAX_ZOOM = 24
+DEFAULT_MAX_GAP_S = 60.0
+DEFAULT_SPEEDING_KMH = 15.0
+DEFAULT_HOURLY_DAYS = 14
+DEFAULT_DAILY_DAYS = 400
+MAX_LATITUDE = 85.05112878
+DAY_S = 86400
+# Tile keys pack x and y of the finest zoom into one int
+TILE_BITS = MAX_ZOOM
+TILE_MASK = (1 << TILE_BITS) - 1
+# Per-tile aggregate: [fixes, dwell seconds, speed sum, fixes with speed, max speed, speeding fixes]
+COUNT, DWELL, SPEED_SUM, SPEED_FIXES, SPEED_MAX, SPEEDING = range(6)
+
+
+def tile_xy(lat, lng, zoom):
+    """Web Mercator tile containing a position; raises ValueError for NaN or infinite coordinates"""
+    if not (math.isfinite(lat) and math.isfinite(lng)):
+        raise ValueError('Position is not finite')
+    n = 1 << zoom
+    lat = math.radians(max(-MAX_LATITUDE, min(MAX_LATITUDE, lat)))
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(x, y, zoom):
+    """(south, west, north, east) of a tile in degrees"""
+    n = 1 << zoom
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return latitude(y + 1), x / n * 360.0 - 180.0, latitude(y), (x + 1) / n * 360.0 - 180.0
+
+
+def quadkey(x, y, zoom):
+    """Bing Maps quadkey of a tile ('' at zoom 0)"""
+    digits = []
+    for level in range(zoom, 0, -1):
+        mask = 1 << (level - 1)
+        digits.append(str((1 if x & mask else 0) + (2 if y & mask else 0)))
+    return ''.join(digits)
+
+
+def parse_bbox(value):
+    """(south, west, north, east) from 'south,west,north,east', None if empty"""
+    if not value:
+        return None
+    try:
+        south, west, north, east = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError(f"Invalid bbox '{value}'")
+    if not all(math.isfinite(edge) for edge in (south, west, north, east)) or south > north or west > east:
+        raise ValueError(f"Invalid bbox '{value}'")
+    return south, west, north, east
+
+
+def _aggregate(tiles, tile):
+    aggregate = tiles.get(tile)
+    if aggregate is None:
+        aggregate = tiles[tile] = [0, 0.0, 0.0, 0, 0.0, 0]
+    return aggregate
+
+
+def _merge_tiles(merged, tiles, shift):
+    """Add per-tile aggregates into ``merged``, ``shift`` zoom levels coarser"""
+    for tile, aggregate in tiles.items():
+        if shift:
+            tile = ((tile >> TILE_BITS) >> shift) << TILE_BITS | (tile & TILE_MASK) >> shift
+        total = merged.get(tile)
+        if total is None:
+            merged[tile] = list(aggregate)
+            continue
+        total[COUNT] += aggregate[COUNT]
+        total[DWELL] += aggregate[DWELL]
+        total[SPEED_SUM] += aggregate[SPEED_SUM]
+        total[SPEED_FIXES] += aggregate[SPEED_FIXES]
+        total[SPEEDING] += aggregate[SPEEDING]
+        if aggregate[SPEED_MAX] > total[SPEED_MAX]:
+            total[SPEED_MAX] = aggregate[SPEED_MAX]
+
+
+def _speed(value):
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TrafficHeatmap:
+    """Hourly and daily per-tile rollups of the logged fixes"""
+
+    def __init__(self, zoom=DEFAULT_ZOOM, max_gap_s=DEFAULT_MAX_GAP_S, speeding_kmh=DEFAULT_SPEEDING_KMH,
+                 hourly_days=DEFAULT_HOURLY_DAYS, daily_days=DEFAULT_DAILY_DAYS):
+        if not 0 <= zoom <= MAX_ZOOM:
+            raise ValueError(f'Heatmap zoom must be between 0 and {MAX_ZOOM}')
+        self.zoom = zoom
+        self.max_gap_s = max_gap_s
+        self.speeding_kmh = speeding_kmh
+        self.hourly_days = hourly_days
+        self.daily_days = daily_days
+        self.rows = 0
+        self.skipped = 0
+        self._hours = {}   # '2025-10-08T14' -> {tile key: aggregate}
+        self._days = {}    # '2025-10-08' -> {tile key: aggregate}
+        self._hourly_from = ''
+        self._newest_hour = ''
+        self._last = {}    # device -> (hour, tile key, fix epoch) of its previous fix
+        self._last_time = (None, None)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """The heatmap, or None with GPS_HEATMAP=0"""
+        if os.environ.get('GPS_HEATMAP', '1') == '0':
+            return None
+        return cls(int(os.environ.get('GPS_HEATMAP_ZOOM', DEFAULT_ZOOM)),
+                   float(os.environ.get('GPS_HEATMAP_MAX_GAP', DEFAULT_MAX_GAP_S)),
+                   float(os.environ.get('GPS_HEATMAP_SPEEDING_KMH', DEFAULT_SPEEDING_KMH)),
+                   int(os.environ.get('GPS_HEATMAP_HOURLY_DAYS', DEFAULT_HOURLY_DAYS)),
+                   int(os.environ.get('GPS_HEATMAP_DAILY_DAYS', DEFAULT_DAILY_DAYS)))
+
+    def add_rows(self, rows):
+        """Ingest pipeline listener: add freshly accepted rows"""
+        with self._lock:
+            for row in rows:
+                self._add(row)
+
+    def observe(self, rows):
+        """Pass logged rows (oldest first) through, adding each; used on the startup log scan"""
+        for row in rows:
+            with self._lock:
+                self._add(row)
+            yield row
+
+    def _add(self, row):
+        try:
+            x, y = tile_xy(float(row[3]), float(row[4]), self.zoom)
+        except (TypeError, ValueError):
+            self.skipped += 1
+            return
+        hour = period_key(row[0], 'hour')
+        if hour == UNDATED_KEY:
+            self.skipped += 1
+            return
+        tile = x << TILE_BITS | y
+        fix_time = self._fix_time(row[2])
+        self.rows += 1
+
+        # Dwell: the time until this fix is spent in the tile (and hour) of the previous one
+        previous = self._last.get(row[1])
+        self._last[row[1]] = (hour, tile, fix_time)
+        if previous is not None and fix_time is not None and previous[2] is not None:
+            gap = fix_time - previous[2]
+            if 0 < gap <= self.max_gap_s:
+                for aggregate in self._aggregates(previous[0], previous[1]):
+                    aggregate[DWELL] += gap
+
+        speed = _speed(row[5])
+        for aggregate in self._aggregates(hour, tile):
+            aggregate[COUNT] += 1
+            if speed is not None:
+                aggregate[SPEED_SUM] += speed
+                aggregate[SPEED_FIXES] += 1
+                if speed > aggregate[SPEED_MAX]:
+                    aggregate[SPEED_MAX] = speed
+                if speed >= self.speeding_kmh:
+                    aggregate[SPEEDING] += 1
+
+    def _fix_time(self, timestamp):
+        # Fixes of a fleet often share their timestamp: reuse the last parse
+        if timestamp != self._last_time[0]:
+            self._last_time = (timestamp, parse_utc(timestamp))
+        return self._last_time[1]
+
+    def _aggregates(self, hour, tile):
+        """Aggregates of a tile to update: the hour's, and the day's once that day is rolled up"""
+        day = hour[:10]
+        daily = self._days.get(day)
+        if day < self._hourly_from:
+            # Beyond the hourly retention (a late fix): daily rollup only
+            if daily is None:
+                daily = self._days[day] = {}
+            return (_aggregate(daily, tile),)
+        tiles = self._hours.get(hour)
+        if tiles is None:
+            tiles = self._hours[hour] = {}
+            if hour > self._newest_hour:
+                self._newest_hour = hour
+                self._prune()
+        if daily is None:
+            return (_aggregate(tiles, tile),)
+        return _aggregate(tiles, tile), _aggregate(daily, tile)
+
+    def _roll_up(self, day):
+        """Daily rollup of a day, merged from its hours"""
+        daily = self._days.get(day)
+        if daily is None:
+            daily = self._days[day] = {}
+            for hour in range(24):
+                _merge_tiles(daily, self._hours.get(f'{day}T{hour:02d}', {}), 0)
+        return daily
+
+    def _prune(self):
+        """Roll up and drop hours past the retention, counted back from the newest hour seen"""
+        newest = parse_utc(self._newest_hour + ':00:00Z')
+        if newest is None:
+            return
+        hourly_from = utc_now_iso(newest - self.hourly_days * DAY_S)[:10]
+        if hourly_from <= self._hourly_from:
+            return
+        for day in sorted({hour[:10] for hour in self._hours if hour[:10] < hourly_from}):
+            self._roll_up(day)
+            for hour in range(24):
+                self._hours.pop(f'{day}T{hour:02d}', None)
+        self._hourly_from = hourly_from
+        daily_from = utc_now_iso(newest - self.daily_days * DAY_S)[:10]
+        for day in [day for day in self._days if day < daily_from]:
+            del self._days[day]
+
+    def _rollups(self, start, end):
+        """Tile dicts covering [start, end]: a day's rollup where the whole day is in range and over"""
+        first_hour = start[:13] if start else ''
+        last_hour = end[:13] if end else '~'
+        # Days before yesterday (of the newest data) take no more fixes but late ones
+        finished = utc_now_iso(parse_utc(self._newest_hour[:10] + 'T00:00:00Z') - DAY_S)[:10] \
+            if self._newest_hour else ''
+        rollups = []
+        for day in sorted(set(self._days) | {hour[:10] for hour in self._hours}):
+            if not first_hour[:10] <= day <= last_hour[:10]:
+                continue
+            whole = first_hour <= day + 'T00' and day + 'T23' <= last_hour
+            if day < self._hourly_from or (whole and day < finished):
+                rollups.append(self._roll_up(day))
+                continue
+            for hour in range(24):
+                key = f'{day}T{hour:02d}'
+                if first_hour <= key <= last_hour and key in self._hours:
+                    rollups.append(self._hours[key])
+        return rollups
+
+    def cells(self, zoom, start=None, end=None, bbox=None, limit=None):
+        """Aggregates per tile at ``zoom`` over server times [start, end]; returns (cells, total).
+
+        ``cells`` are sorted by fix count, busiest first, and cut to ``limit``.
+        """
+        if not 0 <= zoom <= self.zoom:
+            raise ValueError(f'zoom must be between 0 and {self.zoom}')
+        merged = {}
+        with self._lock:
+            for tiles in self._rollups(start, end):
+                _merge_tiles(merged, tiles, self.zoom - zoom)
+
+        if bbox is not None:
+            # Tile ranges of the box corners (y grows southwards)
+            west_x, north_y = tile_xy(bbox[2], bbox[1], zoom)
+            east_x, south_y = tile_xy(bbox[0], bbox[3], zoom)
+            merged = {tile: aggregate for tile, aggregate in merged.items()
+                      if west_x <= tile >> TILE_BITS <= east_x and north_y <= tile & TILE_MASK <= south_y}
+        busiest = sorted(merged.items(), key=lambda item: item[1][COUNT], reverse=True)[:limit]
+        cells = []
+        for tile, aggregate in busiest:
+            x, y = tile >> TILE_BITS, tile & TILE_MASK
+            with_speed = aggregate[SPEED_FIXES]
+            cells.append({
+                'quadkey': quadkey(x, y, zoom),
+                'x': x,
+                'y': y,
+                'bounds': [round(value, 7) for value in tile_bounds(x, y, zoom)],
+                'count': aggregate[COUNT],
+                'dwell_s': round(aggregate[DWELL], 1),
+                'avg_speed_kmh': round(aggregate[SPEED_SUM] / with_speed, 1) if with_speed else None,
+                'max_speed_kmh': aggregate[SPEED_MAX] if with_speed else None,
+                'speeding': aggregate[SPEEDING],
+            })
+        return cells, len(merged)
+
+    def status(self):
+        with self._lock:
+            return {'zoom': self.zoom, 'rows': self.rows, 'skipped': self.skipped, 'hours': len(self._hours),
+                    'days': len(self._days), 'hourly_from': self._hourly_from or None,
+                    'max_gap_s': self.max_gap_s, 'speeding_kmh': self.speeding_kmh}
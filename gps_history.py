@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Track History with Server-Side Downsampling
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Backs /api/history.php: all logged fixes of one device in a server time
+window, reduced to at most ``max_points`` with largest-triangle-three-buckets
+(LTTB), so replaying a full shift sends a few hundred points instead of tens
+of thousands.
+
+LTTB keeps the first and last fix and, for every bucket in between, the fix
+spanning the largest triangle with the previously kept fix and the average
+of the next bucket. Triangles are measured on the track in metres plus the
+speed as a third axis (1 km/h counts as 1 m), so both corners of the route
+and speed peaks survive the reduction.
+"""
+
+import math
+
+DEFAULT_MAX_POINTS = 500
+MAX_POINTS_LIMIT = 5000
+MIN_POINTS = 3
+DEFAULT_WINDOW_S = 24 * 3600
+METERS_PER_DEGREE = 111320.0
+
+
+def track_points(records):
+    """(x, y, z) per record: local east/north metres and speed"""
+    if not records:
+        return []
+    lat0 = records[0]['lat']
+    scale_x = METERS_PER_DEGREE * math.cos(math.radians(lat0))
+    lng0 = records[0]['lng']
+    return [((r['lng'] - lng0) * scale_x, (r['lat'] - lat0) * METERS_PER_DEGREE, r.get('speed_kmh') or 0.0)
+            for r in records]
+
+
+def _triangle_area(a, b, c):
+    abx, aby, abz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    acx, acy, acz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    cx = aby * acz - abz * acy
+    cy = abz * acx - abx * acz
+    cz = abx * acy - aby * acx
+    return cx * cx + cy * cy + cz * cz  # squared, only compared
+
+
+def lttb_indexes(points, threshold):
+    """Indexes of the points LTTB keeps, in order"""
+    count = len(points)
+    if threshold >= count or threshold < MIN_POINTS:
+        return list(range(count))
+
+    every = (count - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for bucket in range(threshold - 2):
+        next_start = int((bucket + 1) * every) + 1
+        next_end = min(int((bucket + 2) * every) + 1, count)
+        span = next_end - next_start
+        average = (sum(p[0] for p in points[next_start:next_end]) / span,
+                   sum(p[1] for p in points[next_start:next_end]) / span,
+                   sum(p[2] for p in points[next_start:next_end]) / span)
+
+        best, best_area = next_start - 1, -1.0
+        for i in range(int(bucket * every) + 1, next_start):
+            area = _triangle_area(points[a], points[i], average)
+            if area > best_area:
+                best, best_area = i, area
+        selected.append(best)
+        a = best
+    selected.append(count - 1)
+    return selected
+
+
+def downsample_track(records, max_points=DEFAULT_MAX_POINTS):
+    """At most ``max_points`` records of a track, keeping its shape"""
+    if len(records) <= max_points:
+        return records
+    return [records[i] for i in lttb_indexes(track_points(records), max_points)]
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - HTTP Server Modes
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Shared server plumbing for the Python development servers: a JSON-aware
+request handler base class and a factory that builds the listening server in
+one of several serving modes:
+
+- single:   one request at a time (the original socketserver.TCPServer)
+- threaded: one thread per connection (http.server.ThreadingHTTPServer)
+- pool:     bounded pool of worker threads with HTTP/1.1 keep-alive
+
+In pool mode a keep-alive connection waiting for its next request gives its
+worker back whenever other connections are queued for one. Long-lived event
+streams are capped below the worker count by their broadcasters instead
+(GPS_STREAM_MAX_CLIENTS defaults to half the workers in pool mode).
+
+JSON responses of GZIP_MIN_BYTES or more are gzip-compressed for clients
+that accept it. When a gps_telemetry registry and access log are attached to
+the handler class, every request is timed and counted per route and its log
+line is queued for the access log thread instead of written to stderr.
+"""
+
+import gzip
+import http.server
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SERVER_MODES = ('single', 'threaded', 'pool')
+DEFAULT_SERVER_MODE = 'pool'
+DEFAULT_WORKERS = 16
+DEFAULT_KEEPALIVE_TIMEOUT = 15
+GZIP_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+
+
+def gzip_body(body):
+    """Gzip-compressed copy of a response body, or None when it is too small to bother"""
+    if len(body) < GZIP_MIN_BYTES:
+        return None
+    return gzip.compress(body, GZIP_LEVEL, mtime=0)
+
+
+class BoundedReader:
+    """File-like view of a request body limited to its Content-Length"""
+
+    def __init__(self, rfile, length):
+        self._rfile = rfile
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self._rfile.read(size) if size else b''
+        self.remaining -= len(data)
+        if not data:
+            self.remaining = 0
+        return data
+
+    def readline(self, limit=65536):
+        if self.remaining <= 0:
+            return b''
+        data = self._rfile.readline(min(limit, self.remaining))
+        self.remaining -= len(data)
+        if not data:
+            self.remaining = 0
+        return data
+
+    def __iter__(self):
+        while True:
+            line = self.readline()
+            if not line:
+                return
+            yield line
+
+    def drain(self):
+        while self.remaining > 0 and self.read(65536):
+            pass
+
+
+class CountingWriter:
+    """Write-through wrapper of a connection's wfile that counts the bytes sent"""
+
+    def __init__(self, wfile):
+        self._wfile = wfile
+        self.sent = 0
+
+    def write(self, data):
+        self.sent += len(data)
+        return self._wfile.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self._wfile, name)
+
+
+class JSONRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """Request handler base with keep-alive aware JSON responses"""
+
+    # Optional gps_telemetry MetricsRegistry and AccessLog, attached by the server
+    metrics = None
+    access_log = None
+
+    # Body length of the current request, validated by parse_request()
+    content_length = 0
+
+    # Idle keep-alive connections are dropped after this many seconds so a
+    # silent client cannot hold a worker forever
+    timeout = DEFAULT_KEEPALIVE_TIMEOUT
+
+    # Set once the connection has had a turn, so only keep-alive waits yield the worker
+    _kept_alive = False
+
+    # Headers and body go out in separate writes; without TCP_NODELAY a
+    # keep-alive client waits out the delayed-ACK timer on every response
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        # The server decides whether persistent connections are allowed
+        self.protocol_version = getattr(self.server, 'protocol_version', 'HTTP/1.0')
+        super().setup()
+        if self.metrics is not None:
+            self.wfile = CountingWriter(self.wfile)
+
+    def handle_one_request(self):
+        idle = getattr(self.server, 'connection_idle', None)
+        if idle is not None and not idle(self.connection, self._kept_alive):
+            # Other connections are waiting for a worker: free this one rather than wait on the client
+            self.close_connection = True
+            return
+        self._kept_alive = True
+        if self.metrics is None:
+            super().handle_one_request()
+            return
+        self._started = None
+        self._status = 0
+        sent = self.wfile.sent
+        super().handle_one_request()
+        # No request on the connection (idle keep-alive close) or a malformed one
+        if self._started is not None:
+            self.metrics.observe_request(self.route_label(), self.command, self._status,
+                                         time.perf_counter() - self._started, self.wfile.sent - sent)
+
+    def parse_request(self):
+        busy = getattr(self.server, 'connection_busy', None)
+        if busy is not None:
+            busy(self.connection)
+        if not super().parse_request():
+            return False
+        length = self.headers.get('Content-Length', '0').strip()
+        if not (length.isascii() and length.isdigit()):
+            # Not a number, or negative: the body cannot be framed, so neither can the next request
+            self.close_connection = True
+            self.send_error(400, 'Invalid Content-Length')
+            return False
+        self.content_length = int(length)
+        # Requests relayed by a worker process (gps_workers.py) carry the real client address
+        forwarded = self.headers.get('X-Forwarded-For') if getattr(self.server, 'trust_forwarded_for', False) else None
+        if forwarded:
+            self.client_address = (forwarded.split(',')[-1].strip(), self.client_address[1])
+        # Timed from here so keep-alive idle time before the request is not counted
+        self._started = time.perf_counter()
+        return True
+
+    def send_response_only(self, code, message=None):
+        self._status = code
+        super().send_response_only(code, message)
+
+    def route_label(self):
+        """Metrics label of the current request; subclasses name their endpoints"""
+        return 'static'
+
+    def log_message(self, format, *args):
+        if self.access_log is None:
+            super().log_message(format, *args)
+            return
+        self.access_log.write('%s - - [%s] %s\n' % (self.address_string(), self.log_date_time_string(),
+                                                    format % args))
+
+    def read_body(self, max_bytes):
+        """Read the request body; returns None (and drains it) when it exceeds max_bytes"""
+        length = self.content_length
+        if length > max_bytes:
+            self.discard_body()
+            return None
+        return self.rfile.read(length) if length > 0 else b''
+
+    def body_reader(self):
+        """Streaming reader over the request body (None for chunked uploads)"""
+        if 'chunked' in self.headers.get('Transfer-Encoding', '').lower():
+            self.close_connection = True
+            return None
+        return BoundedReader(self.rfile, self.content_length)
+
+    def discard_body(self):
+        """Consume an unused request body so the next keep-alive request parses cleanly"""
+        length = self.content_length
+        while length > 0:
+            chunk = self.rfile.read(min(length, 65536))
+            if not chunk:
+                break
+            length -= len(chunk)
+
+    def not_modified(self, etag):
+        """Reply 304 when the client's If-None-Match names ``etag``; True if it did"""
+        tags = [tag.strip().removeprefix('W/') for tag in self.headers.get('If-None-Match', '').split(',')]
+        if etag not in tags and '*' not in tags:
+            return False
+        self.send_response(304)
+        self.send_header('ETag', etag)
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        return True
+
+    def accepts_gzip(self):
+        """True when the request's Accept-Encoding allows gzip"""
+        for coding in self.headers.get('Accept-Encoding', '').split(','):
+            name, _, params = coding.partition(';')
+            if name.strip().lower() in ('gzip', 'x-gzip', '*'):
+                quality = params.replace(' ', '').removeprefix('q=')
+                try:
+                    return not quality or float(quality) > 0
+                except ValueError:
+                    return False
+        return False
+
+    def send_json(self, response, status=200, headers=None):
+        """Serialize and send a JSON response with an explicit Content-Length"""
+        self.send_body(json.dumps(response).encode(), status=status, headers=headers)
+
+    def send_body(self, body, gzipped=None, status=200, headers=None, content_type='application/json'):
+        """Send serialized JSON (or other text), gzip-encoded when large enough and the client accepts it.
+
+        ``gzipped`` is a precompressed copy of ``body`` (e.g. from a response
+        cache); without it the body is compressed on demand.
+        """
+        self.send_response(status)
+        self.send_header('Content-type', content_type)
+        self.send_header('Access-Control-Allow-Origin', '*')
+        if len(body) >= GZIP_MIN_BYTES:
+            self.send_header('Vary', 'Accept-Encoding')
+            if self.accepts_gzip():
+                body = gzipped if gzipped is not None else gzip_body(body)
+                self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class SingleHTTPServer(socketserver.TCPServer):
+    """Original single-threaded server: one request at a time, HTTP/1.0"""
+
+    allow_reuse_address = True
+    protocol_version = 'HTTP/1.0'
+
+
+class ThreadedHTTPServer(http.server.ThreadingHTTPServer):
+    """One thread per connection with HTTP/1.1 keep-alive"""
+
+    allow_reuse_address = True
+    protocol_version = 'HTTP/1.1'
+
+
+class ThreadPoolHTTPServer(socketserver.TCPServer):
+    """Serve connections from a bounded pool of worker threads.
+
+    At most ``workers`` connections are handled concurrently and at most
+    ``backlog`` more wait for a free worker; beyond that the accept loop
+    blocks and further clients queue in the kernel listen backlog instead of
+    spawning unbounded threads.
+
+    A worker blocked on an idle keep-alive connection is released as soon as
+    another connection is waiting: the oldest idle connection is shut for
+    reading, so its handler sees end-of-stream and closes it. Handlers that
+    stream for a connection's lifetime (server-sent events) are not idle and
+    must be capped below ``workers`` by their caller.
+    """
+
+    allow_reuse_address = True
+    protocol_version = 'HTTP/1.1'
+
+    def __init__(self, server_address, RequestHandlerClass, workers=DEFAULT_WORKERS,
+                 backlog=None, bind_and_activate=True):
+        self.workers = workers
+        self.connections = 0
+        self._connections_lock = threading.Lock()
+        self._idle = {}
+        self.request_queue_size = max(self.request_queue_size, workers * 4)
+        self._slots = threading.BoundedSemaphore(workers + (backlog if backlog is not None else workers * 4))
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='gps-http')
+        super().__init__(server_address, RequestHandlerClass, bind_and_activate)
+
+    def process_request(self, request, client_address):
+        self._slots.acquire()
+        with self._connections_lock:
+            self.connections += 1
+            idle = next(iter(self._idle), None) if self.connections > self.workers else None
+            if idle is not None:
+                del self._idle[idle]
+        if idle is not None:
+            try:
+                idle.shutdown(socket.SHUT_RD)
+            except OSError:
+                pass
+        try:
+            self._pool.submit(self._process_request_worker, request, client_address)
+        except RuntimeError:
+            # Pool already shut down
+            with self._connections_lock:
+                self.connections -= 1
+            self._slots.release()
+            self.shutdown_request(request)
+
+    def _process_request_worker(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self._connections_lock:
+                self._idle.pop(request, None)
+            self.shutdown_request(request)
+            with self._connections_lock:
+                self.connections -= 1
+            self._slots.release()
+
+    def connection_idle(self, request, kept_alive):
+        """Park a connection waiting for its next request; False when it should close instead"""
+        with self._connections_lock:
+            if kept_alive and self.connections > self.workers:
+                return False
+            self._idle[request] = True
+            return True
+
+    def connection_busy(self, request):
+        """A request arrived on a parked connection: it can no longer be evicted"""
+        with self._connections_lock:
+            self._idle.pop(request, None)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False)
+
+
+def server_settings_from_env(mode=None, workers=None):
+    """Resolve serving mode and worker count from arguments or environment"""
+    if mode is None:
+        mode = os.environ.get('GPS_SERVER_MODE', DEFAULT_SERVER_MODE)
+    mode = mode.lower()
+    if mode not in SERVER_MODES:
+        raise ValueError(f"Unknown server mode '{mode}' (expected one of: {', '.join(SERVER_MODES)})")
+
+    if workers is None:
+        workers = int(os.environ.get('GPS_SERVER_WORKERS', DEFAULT_WORKERS))
+    if workers < 1:
+        raise ValueError('Worker count must be at least 1')
+
+    return mode, workers
+
+
+def create_server(server_address, handler_class, mode=DEFAULT_SERVER_MODE, workers=DEFAULT_WORKERS,
+                  reuse_port=False):
+    """Build a listening server for the requested serving mode.
+
+    With ``reuse_port`` several processes can listen on the same port
+    (SO_REUSEPORT) and the kernel spreads connections over them.
+    """
+    if mode == 'single':
+        server = SingleHTTPServer(server_address, handler_class, bind_and_activate=False)
+    elif mode == 'threaded':
+        server = ThreadedHTTPServer(server_address, handler_class, bind_and_activate=False)
+    elif mode == 'pool':
+        server = ThreadPoolHTTPServer(server_address, handler_class, workers=workers, bind_and_activate=False)
+    else:
+        raise ValueError(f"Unknown server mode '{mode}'")
+    server.allow_reuse_port = reuse_port
+    try:
+        server.server_bind()
+        server.server_activate()
+    except BaseException:
+        server.server_close()
+        raise
+    return server
+
+
+def add_server_arguments(parser):
+    """Register the shared --port/--mode/--workers command line options"""
+    parser.add_argument('--port', type=int, default=None,
+                        help='Port to listen on (default: $PORT or 8000)')
+    parser.add_argument('--mode', choices=SERVER_MODES, default=None,
+                        help=f'Serving mode (default: $GPS_SERVER_MODE or {DEFAULT_SERVER_MODE})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f'Worker threads in pool mode (default: $GPS_SERVER_WORKERS or {DEFAULT_WORKERS})')
+    return parser
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Latest Position Index
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Keeps the most recent fixes of every device in memory so gps_latest.php can
+answer in O(limit) instead of re-reading the whole gps_log.csv on every poll
+like api/gps_latest.php does. The index is rebuilt from the CSV once at
+startup and then updated from the ingest pipeline.
+
+Every indexed fix gets the next value of a sequence number (total_fixes), so
+pollers can ask for fixes newer than a cursor. Cursors are "<epoch>-<seq>"
+strings; the epoch identifies this index instance, so a cursor handed out
+before a restart is recognised as stale instead of silently skipping fixes.
+
+Environment:
+    GPS_INDEX_DEPTH   fixes kept per device (default 200, the dashboard's max trail length)
+"""
+
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+from gps_log import iter_csv_rows, record_from_row, record_from_values
+
+DEFAULT_INDEX_DEPTH = 200
+
+
+def parse_cursor(value, epoch):
+    """Sequence number of a "<epoch>-<seq>" cursor; None if blank, malformed or from another epoch"""
+    cursor_epoch, _, seq = (value or '').partition('-')
+    if cursor_epoch != epoch or not seq.isdigit():
+        return None
+    return int(seq)
+
+
+class LatestFixIndex:
+    """Ring buffer of the last ``depth`` fixes per device_id"""
+
+    def __init__(self, depth=DEFAULT_INDEX_DEPTH):
+        self.depth = depth
+        self.total_fixes = 0
+        self.device_counts = {}
+        self.device_seq = {}
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self._devices = {}
+        self._seqs = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(int(os.environ.get('GPS_INDEX_DEPTH', DEFAULT_INDEX_DEPTH)))
+
+    def __getstate__(self):
+        # Pickled for worker processes (gps_workers.py); the lock stays behind
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def copy(self):
+        """Independent copy (sharing the records, which are never modified), e.g. to pickle without the lock"""
+        with self._lock:
+            clone = self.__getstate__()
+            clone['_devices'] = {device_id: deque(ring, self.depth) for device_id, ring in self._devices.items()}
+            clone['_seqs'] = {device_id: deque(seqs, self.depth) for device_id, seqs in self._seqs.items()}
+            clone['device_counts'] = dict(self.device_counts)
+            clone['device_seq'] = dict(self.device_seq)
+        index = LatestFixIndex.__new__(LatestFixIndex)
+        index.__setstate__(clone)
+        return index
+
+    def load_csv(self, path):
+        """Rebuild the index from an existing GPS log; returns rows loaded"""
+        return self.load_rows(iter_csv_rows(path))
+
+    def load_rows(self, rows):
+        """Rebuild the index from logged CSV rows (oldest first); returns rows loaded"""
+        loaded = 0
+        for row in rows:
+            try:
+                record = record_from_row(row)
+            except ValueError:
+                continue
+            self._append(record)
+            loaded += 1
+        return loaded
+
+    def add_rows(self, rows):
+        """Ingest pipeline listener: index freshly accepted rows"""
+        records = [record_from_values(row) for row in rows]
+        with self._lock:
+            for record in records:
+                self._append(record)
+
+    def _append(self, record):
+        device_id = record['device_id']
+        ring = self._devices.get(device_id)
+        if ring is None:
+            ring = self._devices[device_id] = deque(maxlen=self.depth)
+            self._seqs[device_id] = deque(maxlen=self.depth)
+        ring.append(record)
+        self.device_counts[device_id] = self.device_counts.get(device_id, 0) + 1
+        self.total_fixes += 1
+        self._seqs[device_id].append(self.total_fixes)
+        self.device_seq[device_id] = self.total_fixes
+
+    @property
+    def seq(self):
+        """Sequence number of the newest indexed fix"""
+        return self.total_fixes
+
+    def cursor(self, device_id=None):
+        """Cursor covering every fix indexed so far (or every fix of one device)"""
+        seq = self.total_fixes if device_id is None else self.device_seq.get(device_id, 0)
+        return f'{self.epoch}-{seq}'
+
+    def parse_cursor(self, value):
+        """Sequence number of a cursor issued by this index, else None (client needs a full reload)"""
+        seq = parse_cursor(value, self.epoch)
+        return seq if seq is not None and seq <= self.total_fixes else None
+
+    def has_device(self, device_id):
+        return device_id in self._devices
+
+    def device_ids(self):
+        with self._lock:
+            return list(self._devices)
+
+    def latest(self, device_id, limit=1):
+        """Last ``limit`` fixes of a device, oldest first"""
+        with self._lock:
+            ring = self._devices.get(device_id)
+            if not ring:
+                return []
+            newest = list(islice(reversed(ring), min(limit, len(ring))))
+        newest.reverse()
+        return newest
+
+    def latest_many(self, device_ids, limit=1):
+        """Last ``limit`` fixes of each listed device under a single lock acquisition"""
+        result = {}
+        with self._lock:
+            for device_id in device_ids:
+                ring = self._devices.get(device_id)
+                newest = list(islice(reversed(ring), min(limit, len(ring)))) if ring else []
+                newest.reverse()
+                result[device_id] = newest
+        return result
+
+    def since(self, device_id, seq, limit=None):
+        """Fixes of a device indexed after sequence number ``seq`` (at most the
+        newest ``limit``), oldest first"""
+        with self._lock:
+            if self.device_seq.get(device_id, 0) <= seq:
+                return []
+            ring, seqs = self._devices[device_id], self._seqs[device_id]
+            newer = []
+            for fix_seq, record in zip(reversed(seqs), reversed(ring)):
+                if fix_seq <= seq or (limit is not None and len(newer) == limit):
+                    break
+                newer.append(record)
+        newer.reverse()
+        return newer
+
+    def changed_since(self, seq):
+        """Devices with fixes indexed after sequence number ``seq``"""
+        with self._lock:
+            return [device_id for device_id, last in self.device_seq.items() if last > seq]
+
+    def between(self, device_id, start=None, end=None):
+        """Fixes of a device received between two normalized server times, oldest first.
+
+        Returns None when older fixes have already been evicted from the ring
+        and it may not reach back to ``start``.
+        """
+        with self._lock:
+            ring = self._devices.get(device_id)
+            if not ring:
+                return []
+            evicted = self.device_counts[device_id] > len(ring)
+            if evicted and (start is None or ring[0]['timestamp_server_utc'] >= start):
+                return None
+            return [record for record in ring
+                    if (start is None or record['timestamp_server_utc'] >= start)
+                    and (end is None or record['timestamp_server_utc'] <= end)]
@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Python Ingest Path
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Validates GPS fixes the same way api/gps_ingest.php does (and also rejects
+non-finite numbers and coordinates out of range) and appends them to
+data/gps_log.csv through a single batching writer. Instead of one
+open/flock/write/close cycle per fix, fixes are buffered in memory and
+flushed in batches when either the batch size or the flush interval is
+reached.
+
+Environment:
+    API_KEY                     shared ingest key (same default as api/config.php)
+    GPS_CSV_PATH                log location (default data/gps_log.csv)
+    GPS_INGEST_BATCH            flush once this many fixes are pending (default 500)
+    GPS_INGEST_FLUSH_INTERVAL   flush pending fixes at least this often, seconds (default 1.0)
+    GPS_INGEST_FSYNC            always | interval | never (default interval)
+    GPS_INGEST_FSYNC_INTERVAL   seconds between fsyncs in interval mode (default 5.0)
+    GPS_INGEST_ACK              buffered (reply once queued) | flushed (reply once written)
+    GPS_STORAGE                 csv (one gps_log.csv, default) | partitioned (see gps_partitions.py)
+    GPS_JOURNAL                 1 journals fixes before they are queued (see gps_journal.py)
+
+Batches (gps_ingest_batch.php) are either a JSON array of fixes or, with an
+application/x-ndjson Content-Type, one JSON fix per line. Each record is
+validated on its own and all valid records are appended in one write.
+"""
+
+import json
+import math
+import os
+import re
+import threading
+import time
+
+from gps_journal import IngestJournal
+from gps_log import csv_path_from_env, ensure_csv, format_rows, iter_csv_rows, row_lines, unwritten, utc_now_iso
+from gps_partitions import PartitionedLogStore
+from gps_tail import iter_records_between, records_between, tail_by_device
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locking, the writer is the only appender
+    fcntl = None
+
+API_KEY = os.environ.get('API_KEY', 'test_forklift_demo_2024')
+REQUIRED_KEYS = ('device_id', 'timestamp_utc', 'lat', 'lng')
+FSYNC_POLICIES = ('always', 'interval', 'never')
+ACK_MODES = ('buffered', 'flushed')
+STORAGE_BACKENDS = ('csv', 'partitioned')
+MAX_INGEST_BODY = 64 * 1024
+MAX_BATCH_BODY = 16 * 1024 * 1024
+MAX_BATCH_RECORDS = 10000
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl',
+                        'application/x-jsonlines')
+
+_DEVICE_ID_STRIP = re.compile(r'[^A-Za-z0-9_\-.]')
+
+
+class IngestError(ValueError):
+    """Rejected fix; ``code`` is the error string returned to the client"""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+def _optional(data, key, convert, low=None, high=None):
+    value = data.get(key)
+    if value is None:
+        return None
+    try:
+        value = convert(value)
+    except (TypeError, ValueError, OverflowError):
+        raise IngestError(f'invalid_{key}')
+    # NaN and infinities would be logged as tokens that are not valid JSON
+    if not math.isfinite(value) or (low is not None and not low <= value <= high):
+        raise IngestError(f'invalid_{key}')
+    return value
+
+
+def build_row(data, ip='', received_at=None):
+    """Validate one decoded fix and return it as a gps_log.csv row"""
+    if not isinstance(data, dict) or not data:
+        raise IngestError('invalid_json')
+    for key in REQUIRED_KEYS:
+        if data.get(key) is None:
+            raise IngestError(f'missing_{key}')
+
+    device_id = _DEVICE_ID_STRIP.sub('', str(data['device_id']))
+    if not device_id:
+        raise IngestError('invalid_device_id')
+
+    return [
+        utc_now_iso(received_at),
+        device_id,
+        str(data['timestamp_utc']),
+        _optional(data, 'lat', float, -90.0, 90.0),
+        _optional(data, 'lng', float, -180.0, 180.0),
+        _optional(data, 'speed_kmh', float),
+        _optional(data, 'alt_m', float),
+        _optional(data, 'sats', lambda v: int(float(v))),
+        _optional(data, 'hdop', float),
+        ip,
+    ]
+
+
+def process_ingest(raw_body, api_key, ip, sink):
+    """Handle a single-fix ingest request; returns (status, response).
+
+    ``sink`` is a CSVBatchWriter or IngestPipeline.
+    """
+    if api_key != API_KEY:
+        return 401, {'ok': False, 'error': 'unauthorized'}
+    if sink is None:
+        return 503, {'ok': False, 'error': 'ingest_unavailable'}
+
+    try:
+        data = json.loads(raw_body or b'null')
+    except ValueError:
+        return 400, {'ok': False, 'error': 'invalid_json'}
+
+    try:
+        row = build_row(data, ip)
+    except IngestError as e:
+        return 400, {'ok': False, 'error': e.code}
+
+    try:
+        sink.append([row])
+    except OSError:
+        return 500, {'ok': False, 'error': 'cannot_open_csv'}
+    return 200, {'ok': True, 'stored': True}
+
+
+def iter_batch_records(reader, content_type):
+    """Yield (index, decoded record or IngestError) from a batch body.
+
+    NDJSON bodies are decoded line by line as they are read from the socket;
+    JSON bodies must hold an array (or a single object) and are read whole.
+    """
+    if content_type.split(';')[0].strip().lower() in NDJSON_CONTENT_TYPES:
+        index = 0
+        for line in reader:
+            line = line.strip()
+            if not line:
+                continue
+            if index >= MAX_BATCH_RECORDS:
+                raise IngestError('too_many_records')
+            try:
+                yield index, json.loads(line)
+            except ValueError:
+                yield index, IngestError('invalid_json')
+            index += 1
+        return
+
+    if reader.remaining > MAX_BATCH_BODY:
+        raise IngestError('payload_too_large')
+    try:
+        data = json.loads(reader.read() or b'null')
+    except ValueError:
+        raise IngestError('invalid_json')
+    if isinstance(data, dict):
+        data = [data]
+    if not isinstance(data, list):
+        raise IngestError('invalid_json')
+    if len(data) > MAX_BATCH_RECORDS:
+        raise IngestError('too_many_records')
+    yield from enumerate(data)
+
+
+def process_ingest_batch(records, api_key, ip, sink):
+    """Validate a batch of fixes and append the valid ones in one write.
+
+    ``records`` is an iterable as produced by iter_batch_records(); returns
+    (status, response) with a per-record error list.
+    """
+    if api_key != API_KEY:
+        return 401, {'ok': False, 'error': 'unauthorized'}
+    if sink is None:
+        return 503, {'ok': False, 'error': 'ingest_unavailable'}
+
+    received_at = time.time()
+    rows = []
+    errors = []
+    try:
+        for index, data in records:
+            if isinstance(data, IngestError):
+                errors.append({'index': index, 'error': data.code})
+                continue
+            try:
+                rows.append(build_row(data, ip, received_at))
+            except IngestError as e:
+                errors.append({'index': index, 'error': e.code})
+    except IngestError as e:
+        status = 413 if e.code in ('too_many_records', 'payload_too_large') else 400
+        return status, {'ok': False, 'error': e.code}
+
+    if not rows and not errors:
+        return 400, {'ok': False, 'error': 'empty_batch'}
+
+    try:
+        sink.append(rows)
+    except OSError:
+        return 500, {'ok': False, 'error': 'cannot_open_csv'}
+    return 200, {
+        'ok': True,
+        'stored': bool(rows),
+        'accepted': len(rows),
+        'rejected': len(errors),
+        'errors': errors,
+    }
+
+
+class IngestPipeline:
+    """Fan-out point for accepted fixes.
+
+    Rows first pass the registered filters (see gps_filter.py), then are
+    queued on the CSV writer and handed to every registered listener
+    (in-memory indexes, statistics, ...) under one lock, so all consumers
+    see fixes in the same order as the log. A listener that raises is
+    logged and counted; the rows are stored and reach the other listeners.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.filters = []
+        self.listeners = []
+        self.listener_errors = 0
+        self._lock = threading.Lock()
+
+    def add_filter(self, fix_filter):
+        """Register ``fix_filter(rows) -> rows``, which may drop or adjust rows before they are stored"""
+        self.filters.append(fix_filter)
+
+    def add_listener(self, listener):
+        """Register ``listener(rows)``, called with each batch of accepted rows"""
+        self.listeners.append(listener)
+
+    def paused(self):
+        """Lock holding off appends, e.g. while a copy of the listeners' state is taken"""
+        return self._lock
+
+    def append(self, rows):
+        if not rows:
+            return
+        with self._lock:
+            for fix_filter in self.filters:
+                rows = fix_filter(rows)
+            if not rows:
+                return
+            ticket = self.writer.enqueue(rows)
+            for listener in self.listeners:
+                try:
+                    listener(rows)
+                except Exception as e:
+                    self.listener_errors += 1
+                    name = getattr(listener, '__qualname__', repr(listener))
+                    print(f"⚠️  Ingest listener {name} failed on {len(rows)} fixes: {e!r}")
+        self.writer.wait(ticket)
+
+
+class CSVLogFile:
+    """Single gps_log.csv shared with api/gps_ingest.php (flock'ed appends)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def open(self):
+        ensure_csv(self.path)
+        self._file = open(self.path, 'a', newline='')
+
+    def write_rows(self, rows):
+        """Append rows in one write; returns the log size after it"""
+        fh = self._file
+        if fcntl:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            fh.write(format_rows(rows))
+            fh.flush()
+            return fh.tell()
+        finally:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def sync(self):
+        os.fsync(self._file.fileno())
+
+    def position(self):
+        """Log size, recorded by journal checkpoints"""
+        return os.fstat(self._file.fileno()).st_size
+
+    def recover(self, rows, position):
+        """Append the journaled ``rows`` that never reached the log; returns how many.
+
+        Lines after ``position`` (the log end at the last checkpoint) are
+        matched against the rows; torn prefixes of one are dropped.
+        """
+        journaled = row_lines(rows)
+        fh = self._file
+        if fcntl:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        try:
+            with open(self.path, 'r+b') as log:
+                size = log.seek(0, os.SEEK_END)
+                if position is None or position > size:
+                    # Log replaced since the checkpoint: only skip rows found anywhere in it
+                    log.seek(0)
+                    missing = unwritten(journaled, (line for line in log if line.endswith(b'\n')))
+                    log.seek(0, os.SEEK_END)
+                    log.write(b''.join(journaled[i] for i in missing))
+                    return len(missing)
+                log.seek(position)
+                lines = log.read().splitlines(keepends=True)
+                known = set(journaled)
+                kept = [line for line in lines
+                        if line in known or not any(j.startswith(line.rstrip(b'\n')) for j in known)]
+                missing = unwritten(journaled, kept)
+                log.seek(position)
+                log.truncate()
+                log.write(b''.join(kept) + b''.join(journaled[i] for i in missing))
+                return len(missing)
+        finally:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def iter_rows(self):
+        return iter_csv_rows(self.path)
+
+    def tail(self, device_id, limit):
+        return tail_by_device(self.path, limit, [device_id])[device_id]
+
+    def tail_many(self, device_ids, limit):
+        return tail_by_device(self.path, limit, device_ids)
+
+    def query(self, device_id=None, start=None, end=None, reverse=False):
+        if not reverse:
+            return iter_records_between(self.path, device_id, start, end)
+        return reversed(records_between(self.path, device_id, start, end))
+
+
+class CSVBatchWriter:
+    """Single appender for the GPS log with batched, group-committed writes.
+
+    ``append()`` queues rows and returns immediately in ``buffered`` ack mode;
+    in ``flushed`` mode it blocks until a flush containing the rows has been
+    written, so concurrent requests share one write (and one fsync).
+
+    Batches go to ``sink`` (a CSVLogFile for ``path`` unless given), which
+    can be swapped for a PartitionedLogStore. With a ``journal`` rows are
+    journaled before they are queued and checkpointed once the log is synced;
+    after a failed write checkpoints stop short of it, so the failed rows stay
+    in the journal and are recovered at the next start.
+    """
+
+    def __init__(self, path, max_batch=500, flush_interval=1.0, fsync='interval',
+                 fsync_interval=5.0, ack='buffered', sink=None, journal=None):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}'")
+        if ack not in ACK_MODES:
+            raise ValueError(f"Unknown ack mode '{ack}'")
+
+        self.sink = sink or CSVLogFile(path)
+        self.path = self.sink.path
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.ack = ack
+        self.journal = journal
+
+        self.rows_written = 0
+        self.flushes = 0
+        self.last_error = None
+        self.listener_errors = 0
+
+        self._pending = []
+        self._pending_since = None
+        self._queued = 0
+        self._flushed = 0
+        self._written = 0
+        self._urgent = False
+        self._closing = False
+        self._last_fsync = time.monotonic()
+        self._dirty = False
+        self._failed = (0, 0)
+        self._failed_at = None  # sequence of the first row of the first failed batch
+        self._cond = threading.Condition()
+        self._thread = None
+        self._flush_listeners = []
+
+    @classmethod
+    def from_env(cls, path=None):
+        path = path or csv_path_from_env()
+        storage = os.environ.get('GPS_STORAGE', 'csv')
+        if storage not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage backend '{storage}'")
+        sink = PartitionedLogStore.from_env(path) if storage == 'partitioned' else None
+        fsync = os.environ.get('GPS_INGEST_FSYNC', 'interval')
+        return cls(
+            path,
+            max_batch=int(os.environ.get('GPS_INGEST_BATCH', 500)),
+            flush_interval=float(os.environ.get('GPS_INGEST_FLUSH_INTERVAL', 1.0)),
+            fsync=fsync,
+            fsync_interval=float(os.environ.get('GPS_INGEST_FSYNC_INTERVAL', 5.0)),
+            ack=os.environ.get('GPS_INGEST_ACK', 'buffered'),
+            sink=sink,
+            journal=IngestJournal.from_env(path, fsync),
+        )
+
+    def add_flush_listener(self, listener):
+        """Register ``listener(rows, end_offset)``, called from the writer thread
+        after each batch reaches the log; ``end_offset`` is the sink position after it"""
+        self._flush_listeners.append(listener)
+
+    @property
+    def pending(self):
+        return len(self._pending)
+
+    def start(self):
+        """Open the log (recovering journaled fixes it is missing) and start the background flusher"""
+        self.sink.open()
+        if self.journal is not None:
+            self.journal.recover(self.sink)
+        self._thread = threading.Thread(target=self._run, name='gps-csv-writer', daemon=True)
+        self._thread.start()
+        return self
+
+    def append(self, rows):
+        """Queue rows for the next batch (and wait for it in flushed ack mode)"""
+        self.wait(self.enqueue(rows))
+
+    def enqueue(self, rows):
+        """Queue rows without waiting; returns a ticket for wait()"""
+        with self._cond:
+            if self._closing:
+                raise OSError('writer is closed')
+            if self.journal is not None:
+                self.journal.append(self._queued, rows)
+            wake = not self._pending
+            if wake:
+                self._pending_since = time.monotonic()
+            self._pending.extend(rows)
+            self._queued += len(rows)
+            if len(self._pending) >= self.max_batch or self.ack == 'flushed':
+                self._urgent = True
+                wake = True
+            if wake:
+                self._cond.notify_all()
+            return self._queued
+
+    def wait(self, ticket):
+        """Block until the rows behind ``ticket`` are written (flushed ack mode only)"""
+        if self.ack != 'flushed':
+            return
+        with self._cond:
+            while self._flushed < ticket and self._thread.is_alive():
+                self._cond.wait(0.5)
+            if self._flushed < ticket:
+                raise OSError('writer closed before flush')
+            if self._failed[0] < ticket <= self._failed[1]:
+                raise OSError(self.last_error)
+
+    def flush(self):
+        """Write everything pending now and wait for it"""
+        with self._cond:
+            target = self._queued
+            self._urgent = True
+            self._cond.notify_all()
+            while self._flushed < target and self._thread and self._thread.is_alive():
+                self._cond.wait(0.1)
+
+    def close(self):
+        """Flush remaining rows and stop the flusher"""
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+        if self.journal is not None:
+            self.journal.close()
+        self.sink.close()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closing:
+                    if self._dirty and self.fsync == 'interval':
+                        idle = self._last_fsync + self.fsync_interval - time.monotonic()
+                        if idle <= 0:
+                            break
+                        self._cond.wait(idle)
+                    else:
+                        self._cond.wait()
+                while self._pending and not self._urgent and not self._closing:
+                    remaining = self._pending_since + self.flush_interval - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._urgent = False
+                closing = self._closing
+                first = self._flushed
+
+            if batch:
+                try:
+                    end_offset = self._write_batch(batch)
+                    self.last_error = None
+                except OSError as e:
+                    self.last_error = str(e)
+                    self._failed = (first, first + len(batch))
+                    if self.journal is None:
+                        print(f"❌ GPS log write failed, {len(batch)} fixes dropped: {e}")
+                    else:
+                        if self._failed_at is None:
+                            self._failed_at = first
+                        print(f"❌ GPS log write failed, {len(batch)} fixes kept in the journal "
+                              f"for recovery at the next start: {e}")
+                else:
+                    self._written = first + len(batch)
+                    self._notify_flushed(batch, end_offset)
+            if self._dirty and (closing or self._fsync_due()):
+                self._sync()
+            elif batch and self.journal is not None and self.fsync == 'never':
+                self._checkpoint()
+
+            with self._cond:
+                self._flushed += len(batch)
+                self._cond.notify_all()
+                if closing and not self._pending:
+                    return
+
+    def _notify_flushed(self, batch, end_offset):
+        # A failing listener must not stop the writer thread (and every ingest waiting on it)
+        for listener in self._flush_listeners:
+            try:
+                listener(batch, end_offset)
+            except Exception as e:
+                self.listener_errors += 1
+                name = getattr(listener, '__qualname__', repr(listener))
+                print(f"⚠️  Flush listener {name} failed on {len(batch)} fixes: {e!r}")
+
+    def _fsync_due(self):
+        if self.fsync == 'always':
+            return True
+        return self.fsync == 'interval' and time.monotonic() - self._last_fsync >= self.fsync_interval
+
+    def _sync(self):
+        try:
+            self.sink.sync()
+        except OSError as e:
+            self.last_error = str(e)
+        else:
+            if self.journal is not None:
+                self._checkpoint()
+        self._last_fsync = time.monotonic()
+        self._dirty = False
+
+    def _checkpoint(self):
+        """Journal checkpoint for every row written so far, none once a batch failed:
+        the last checkpoint then precedes the failed rows, which recover() appends"""
+        if self._failed_at is not None:
+            return
+        try:
+            self.journal.checkpoint(self._written, self.sink.position())
+            self.journal.sync()
+        except OSError as e:
+            self.last_error = str(e)
+
+    def _write_batch(self, batch):
+        end_offset = self.sink.write_rows(batch)
+        self._dirty = True
+        self.rows_written += len(batch)
+        self.flushes += 1
+        return end_offset
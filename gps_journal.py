@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Write-Ahead Ingest Journal
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+With GPS_JOURNAL=1 the batching log writer appends every batch of accepted
+fixes to an append-only journal (data/gps_log.journal) before queueing it,
+so fixes still waiting for the next flush, or caught in a log write torn by
+a crash, are not lost:
+
+- each record is length-prefixed and CRC32-checked; a torn or corrupt record
+  ends the journal and is cut off on recovery
+- after the log is fsynced the writer appends a checkpoint: the number of
+  fixes that are now safely in the log and the log's position at that point
+- on startup, before the log is scanned into the in-memory indexes, the
+  fixes journaled after the last checkpoint are compared with what reached
+  the log after that position; torn lines are dropped and the missing fixes
+  appended, then the journal starts over
+- once the journal grows beyond GPS_JOURNAL_MAX_MB, a checkpoint rewrites it
+  with just the fixes not yet checkpointed
+
+Journal writes follow GPS_INGEST_FSYNC: with always each append is fsynced
+before the request is answered (fixes survive power loss), with interval the
+journal is fsynced with the log (a process crash loses nothing), never
+leaves both to the OS.
+
+File layout (little endian): the magic b'GPSJRNL1', then records of
+
+    u32 payload length | u32 CRC32 of the payload | payload
+
+where the payload is b'R' + u64 sequence of the first fix + JSON array of
+log rows, or b'C' + u64 checkpointed fix count + JSON log position.
+
+Environment:
+    GPS_JOURNAL           1 enables the journal (default 0)
+    GPS_JOURNAL_PATH      journal file (default: the log path with .journal)
+    GPS_JOURNAL_MAX_MB    size that triggers a rewrite at the next checkpoint (default 64)
+
+Inspect a journal (e.g. after a crash, before restarting):
+    python gps_journal.py data/gps_log.journal
+"""
+
+import argparse
+import json
+import os
+import struct
+import threading
+import zlib
+from collections import deque
+
+MAGIC = b'GPSJRNL1'
+HEADER = struct.Struct('<II')
+SEQUENCE = struct.Struct('<Q')
+ROWS = b'R'
+CHECKPOINT = b'C'
+DEFAULT_MAX_MB = 64
+MAX_RECORD_BYTES = 256 * 1024 * 1024
+
+
+def journal_path_from_env(log_path):
+    return os.environ.get('GPS_JOURNAL_PATH') or os.path.splitext(log_path)[0] + '.journal'
+
+
+def _frame(kind, sequence, body):
+    payload = kind + SEQUENCE.pack(sequence) + json.dumps(body, separators=(',', ':')).encode()
+    return HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(path):
+    """Valid (kind, sequence, body) records of a journal and the offset where they end"""
+    records = []
+    with open(path, 'rb') as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            return records, 0
+        end = len(MAGIC)
+        while True:
+            header = fh.read(HEADER.size)
+            if len(header) < HEADER.size:
+                break
+            length, crc = HEADER.unpack(header)
+            if length < 1 + SEQUENCE.size or length > MAX_RECORD_BYTES:
+                break
+            payload = fh.read(length)
+            if len(payload) < length or zlib.crc32(payload) != crc:
+                break
+            try:
+                body = json.loads(payload[1 + SEQUENCE.size:])
+            except ValueError:
+                break
+            records.append((payload[:1], SEQUENCE.unpack_from(payload, 1)[0], body))
+            end += HEADER.size + length
+    return records, end
+
+
+def unapplied_rows(records):
+    """Rows journaled after the last checkpoint, and that checkpoint's log position"""
+    checkpointed, position = 0, None
+    for kind, sequence, body in records:
+        if kind == CHECKPOINT:
+            checkpointed, position = sequence, body
+    rows = []
+    for kind, sequence, body in records:
+        if kind == ROWS and sequence + len(body) > checkpointed:
+            rows.extend(body[max(0, checkpointed - sequence):])
+    return rows, position
+
+
+class IngestJournal:
+    """Write-ahead journal of the fixes queued on a CSVBatchWriter"""
+
+    def __init__(self, path, fsync='interval', max_bytes=DEFAULT_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.checkpoints = 0
+        self.rewrites = 0
+        self.recovered = 0
+        self.torn_bytes = 0
+        self._fd = None
+        self._unapplied = deque()  # (end sequence, record) of rows not covered by a checkpoint yet
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, log_path, fsync='interval'):
+        """The journal for ``log_path``, or None unless GPS_JOURNAL=1"""
+        if os.environ.get('GPS_JOURNAL', '0') != '1':
+            return None
+        max_mb = float(os.environ.get('GPS_JOURNAL_MAX_MB', DEFAULT_MAX_MB))
+        return cls(journal_path_from_env(log_path), fsync, int(max_mb * 1024 * 1024))
+
+    def recover(self, sink):
+        """Bring ``sink`` (opened) up to date with the journal, then start a new one; returns the fixes appended"""
+        rows, position = [], None
+        if os.path.exists(self.path):
+            records, end = read_records(self.path)
+            self.torn_bytes = os.path.getsize(self.path) - end
+            rows, position = unapplied_rows(records)
+        if rows:
+            self.recovered = sink.recover(rows, position)
+            sink.sync()
+        self._rewrite(0, sink.position(), [])
+        return self.recovered
+
+    def _rewrite(self, sequence, position, records):
+        """Atomically replace the journal with a checkpoint followed by ``records``"""
+        data = MAGIC + _frame(CHECKPOINT, sequence, position) + b''.join(records)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, self.path)
+        if self._fd is not None:
+            os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        self.size = len(data)
+
+    def _write(self, record):
+        view = memoryview(record)
+        while view:
+            view = view[os.write(self._fd, view):]
+        self.size += len(record)
+
+    def append(self, sequence, rows):
+        """Journal ``rows``, the fixes numbered from ``sequence`` on (before they are queued)"""
+        record = _frame(ROWS, sequence, rows)
+        with self._lock:
+            self._write(record)
+            self._unapplied.append((sequence + len(rows), record))
+            if self.fsync == 'always':
+                os.fsync(self._fd)
+
+    def checkpoint(self, sequence, position):
+        """Record that the first ``sequence`` fixes are in the log, which now ends at ``position``"""
+        with self._lock:
+            while self._unapplied and self._unapplied[0][0] <= sequence:
+                self._unapplied.popleft()
+            if self.size > self.max_bytes:
+                self._rewrite(sequence, position, [record for _, record in self._unapplied])
+                self.rewrites += 1
+            else:
+                self._write(_frame(CHECKPOINT, sequence, position))
+            self.checkpoints += 1
+
+    def sync(self):
+        with self._lock:
+            if self._fd is not None and self.fsync != 'never':
+                os.fsync(self._fd)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+    def status(self):
+        return {'path': self.path, 'bytes': self.size, 'checkpoints': self.checkpoints,
+                'rewrites': self.rewrites, 'recovered': self.recovered, 'torn_bytes': self.torn_bytes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize a GPS ingest journal')
+    parser.add_argument('path', help='Journal file, e.g. data/gps_log.journal')
+    args = parser.parse_args()
+
+    records, end = read_records(args.path)
+    rows, position = unapplied_rows(records)
+    checkpoints = sum(1 for kind, _, _ in records if kind == CHECKPOINT)
+    print(f"📓 {args.path}: {len(records)} records ({checkpoints} checkpoints), {end} valid bytes")
+    if os.path.getsize(args.path) > end:
+        print(f"✂️  {os.path.getsize(args.path) - end} bytes after the last valid record (torn write)")
+    print(f"🔁 {len(rows)} fixes after the last checkpoint (log position {position}) would be recovered")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - GPS Log Schema
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Python side of the data/gps_log.csv format written by api/gps_ingest.php:
+
+    timestamp_server_utc,device_id,timestamp_utc,lat,lng,speed_kmh,alt_m,sats,hdop,ip
+"""
+
+import csv
+import io
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+CSV_COLUMNS = ['timestamp_server_utc', 'device_id', 'timestamp_utc', 'lat', 'lng',
+               'speed_kmh', 'alt_m', 'sats', 'hdop', 'ip']
+CSV_HEADER = ','.join(CSV_COLUMNS) + '\n'
+
+DEFAULT_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gps_log.csv')
+
+
+def csv_path_from_env():
+    """Location of the GPS log (GPS_CSV_PATH, defaults to data/gps_log.csv)"""
+    return os.environ.get('GPS_CSV_PATH', DEFAULT_CSV_PATH)
+
+
+def ensure_csv(path):
+    """Create the CSV with its header if missing, like api/config.php.
+
+    An existing log whose last line has no newline gets one, so the next
+    append starts on a fresh line instead of extending that row.
+    """
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a+b') as fh:
+        if fh.tell() == 0:
+            fh.write(CSV_HEADER.encode())
+            return
+        fh.seek(-1, os.SEEK_END)
+        if fh.read(1) != b'\n':
+            fh.write(b'\n')
+
+
+def utc_now_iso(now=None):
+    """Server timestamp in the same format as PHP gmdate('Y-m-d\\TH:i:s\\Z')"""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now))
+
+
+def parse_utc(value):
+    """Epoch seconds for an ISO-8601 timestamp (or epoch number), None if unparseable"""
+    if value is None or value == '':
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def normalize_time(value):
+    """Comparable timestamp string for a query bound (ISO or epoch), None if unset"""
+    if value is None or value == '':
+        return None
+    seconds = parse_utc(value)
+    if seconds is None:
+        raise ValueError(f"Invalid timestamp '{value}'")
+    return utc_now_iso(seconds)
+
+
+def _float_or_none(value):
+    return float(value) if value != '' else None
+
+
+def _int_or_none(value):
+    return int(float(value)) if value != '' else None
+
+
+def record_from_row(row):
+    """Convert a CSV row into the JSON record shape returned by the PHP APIs"""
+    return {
+        'timestamp_server_utc': row[0],
+        'device_id': row[1],
+        'timestamp_utc': row[2],
+        'lat': float(row[3]),
+        'lng': float(row[4]),
+        'speed_kmh': _float_or_none(row[5]),
+        'alt_m': _float_or_none(row[6]),
+        'sats': _int_or_none(row[7]),
+        'hdop': _float_or_none(row[8]),
+        'ip': row[9],
+    }
+
+
+def record_from_values(row):
+    """JSON record for a freshly ingested row whose fields are already typed"""
+    return dict(zip(CSV_COLUMNS, row))
+
+
+def parse_line(line):
+    """Parse one raw log line (bytes, no newline) into a row; None if malformed or the header"""
+    try:
+        text = line.decode('utf-8').rstrip('\r')
+        # Only lines with quoted fields need the csv module
+        row = next(csv.reader([text])) if '"' in text else text.split(',')
+    except (UnicodeDecodeError, csv.Error, StopIteration):
+        return None
+    if len(row) != len(CSV_COLUMNS) or row[0] == CSV_COLUMNS[0]:
+        return None
+    return row
+
+
+def format_rows(rows):
+    """Serialize rows as CSV lines the way fputcsv() writes them"""
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator='\n').writerows(rows)
+    return buf.getvalue()
+
+
+class _Echo:
+    def write(self, text):
+        return text
+
+
+def row_lines(rows):
+    """Each row's CSV line as bytes, exactly as format_rows() writes it"""
+    writer = csv.writer(_Echo(), lineterminator='\n')
+    return [writer.writerow(row).encode() for row in rows]
+
+
+def unwritten(lines, present):
+    """Indexes of the ``lines`` not among the ``present`` lines (raw bytes, counted with multiplicity)"""
+    present = Counter(present)
+    missing = []
+    for index, line in enumerate(lines):
+        if present[line]:
+            present[line] -= 1
+        else:
+            missing.append(index)
+    return missing
+
+
+def iter_complete_rows(path, offset=0):
+    """Yield (row, end_offset) from ``offset`` on, stopping at an unterminated last line"""
+    with open(path, 'rb') as fh:
+        fh.seek(offset)
+        for line in fh:
+            if not line.endswith(b'\n'):
+                # Partial line still being appended
+                break
+            offset += len(line)
+            row = parse_line(line.rstrip(b'\n'))
+            if row is not None:
+                yield row, offset
+
+
+def iter_csv_rows(path):
+    """Yield the data rows of a GPS log from the top, skipping malformed lines"""
+    if not os.path.exists(path):
+        return
+    with open(path, newline='') as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        if header is not None and header[:1] != CSV_COLUMNS[:1]:
+            # Headerless log: the first line is data
+            if len(header) == len(CSV_COLUMNS):
+                yield header
+        for row in reader:
+            if len(row) == len(CSV_COLUMNS):
+                yield row
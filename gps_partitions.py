@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Time-Partitioned GPS Log Storage
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Stores fixes in hourly or daily CSV segments (optionally one file per device
+and period) instead of one ever-growing gps_log.csv, so reads only open the
+segments that overlap the requested time range and device.
+
+    data/gps_log/2025-10/2025-10-08.csv                 daily
+    data/gps_log/2025-10/2025-10-08T14.csv              hourly
+    data/gps_log/2025-10/2025-10-08T14.FORKLIFT_001.csv hourly, per device
+
+Segments have the normal gps_log.csv header and columns and are keyed by
+the server receive time (timestamp_server_utc), so every segment except the
+current one stops changing once its period is over. manifest.json records
+each segment's time range, row count, size and devices (with their point
+count and first/last seen). The manifest is saved every few seconds and on
+close, and checked against the segment sizes on open, so a crash in between
+only costs a rescan of the segments that were still being written.
+
+Segments of finished periods can be sealed into the columnar archive format
+of gps_archive.py (2025-10-08T14.gpsc), which is smaller and read through
+mmap without parsing. Sealing runs offline (the seal command) or on startup
+with GPS_PARTITION_SEAL=1, never while the server is writing. Rows the
+archive columns cannot hold (coordinates out of range, a server time that
+does not parse) are moved to <segment>.csv.rejected next to the archive.
+
+Environment:
+    GPS_STORAGE                   partitioned to use this store for the ingest writer
+    GPS_PARTITION_DIR             segment directory (default <log path without .csv>)
+    GPS_PARTITION_GRANULARITY     hour | day (default day)
+    GPS_PARTITION_PER_DEVICE      1 to write one segment per device and period
+    GPS_PARTITION_SEAL            1 to seal finished segments when the store is opened
+
+Split an existing log (the original file is left untouched):
+    python gps_partitions.py split data/gps_log.csv --granularity hour
+    python gps_partitions.py info data/gps_log
+    python gps_partitions.py seal data/gps_log
+    python gps_partitions.py prune data/gps_log --keep-days 90
+"""
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+
+from gps_archive import ARCHIVE_SUFFIX, GPSArchive, write_archive
+from gps_log import (CSV_HEADER, format_rows, iter_complete_rows, iter_csv_rows, normalize_time,
+                     parse_utc, record_from_row, row_lines, unwritten, utc_now_iso)
+from gps_tail import iter_records_reversed
+
+GRANULARITIES = {'hour': 13, 'day': 10}
+DEFAULT_GRANULARITY = 'day'
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+MANIFEST_INTERVAL = 5.0
+MAX_OPEN_SEGMENTS = 64
+REJECTED_SUFFIX = '.rejected'
+UNDATED_KEY = 'undated'
+
+_PERIOD_PREFIX = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}')
+_UNSAFE_FILENAME = re.compile(r'[^A-Za-z0-9_\-.]')
+
+
+def period_key(timestamp, granularity=DEFAULT_GRANULARITY):
+    """Partition key of a server timestamp: '2025-10-08T14' (hour) or '2025-10-08' (day)"""
+    if not _PERIOD_PREFIX.match(timestamp or ''):
+        # Not in the writer's own format (old or hand-edited rows)
+        seconds = parse_utc(timestamp)
+        if seconds is None:
+            return UNDATED_KEY
+        timestamp = utc_now_iso(seconds)
+    return timestamp[:GRANULARITIES[granularity]]
+
+
+def segment_period(name):
+    """Period key of a segment name ('2025-10/2025-10-08T14.FORKLIFT_001.csv' -> '2025-10-08T14')"""
+    return name.rsplit('/', 1)[-1].split('.', 1)[0]
+
+
+class PartitionedLogStore:
+    """Append-only GPS log split into time (and optionally device) segments.
+
+    Implements the same sink interface as gps_ingest.CSVLogFile (open,
+    write_rows, sync, close, iter_rows, tail, position, recover), so
+    CSVBatchWriter can write to it directly.
+    """
+
+    def __init__(self, path, granularity=DEFAULT_GRANULARITY, per_device=False,
+                 manifest_interval=MANIFEST_INTERVAL, seal_on_open=False):
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Unknown partition granularity '{granularity}'")
+        self.path = path
+        self.granularity = granularity
+        self.per_device = per_device
+        self.manifest_interval = manifest_interval
+        self.seal_on_open = seal_on_open
+        self.manifest_path = os.path.join(path, MANIFEST_NAME)
+        self.segments = {}
+        self._handles = OrderedDict()
+        self._dirty_handles = set()
+        self._manifest_dirty = False
+        self._manifest_saved = time.monotonic()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, log_path):
+        return cls(
+            os.environ.get('GPS_PARTITION_DIR') or os.path.splitext(log_path)[0],
+            granularity=os.environ.get('GPS_PARTITION_GRANULARITY', DEFAULT_GRANULARITY),
+            per_device=os.environ.get('GPS_PARTITION_PER_DEVICE', '0') == '1',
+            seal_on_open=os.environ.get('GPS_PARTITION_SEAL', '0') == '1',
+        )
+
+    # -- writing -------------------------------------------------------------
+
+    def open(self):
+        """Load the manifest and reconcile it with the segments on disk"""
+        os.makedirs(self.path, exist_ok=True)
+        manifest = self._read_manifest()
+        if manifest:
+            self.granularity = manifest['granularity']
+            self.per_device = manifest['per_device']
+            self.segments = manifest['segments']
+
+        on_disk = set(self._segment_files())
+        for name in list(self.segments):
+            if name not in on_disk:
+                del self.segments[name]
+                self._manifest_dirty = True
+        for name in on_disk:
+            entry = self.segments.get(name)
+            if entry is None or entry['bytes'] != os.path.getsize(os.path.join(self.path, name)):
+                self._rescan(name)
+        if self.seal_on_open:
+            self.seal()
+        if self._manifest_dirty:
+            self.save_manifest()
+        return self
+
+    def _read_manifest(self):
+        try:
+            with open(self.manifest_path) as fh:
+                manifest = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if manifest.get('version') != MANIFEST_VERSION:
+            return None
+        return manifest
+
+    def _segment_files(self):
+        for month in sorted(os.listdir(self.path)):
+            month_dir = os.path.join(self.path, month)
+            if not os.path.isdir(month_dir):
+                continue
+            for name in sorted(os.listdir(month_dir)):
+                if name.endswith(('.csv', ARCHIVE_SUFFIX)):
+                    yield f'{month}/{name}'
+
+    def _rescan(self, name):
+        """Rebuild one manifest entry from the segment file"""
+        path = os.path.join(self.path, name)
+        if name.endswith(ARCHIVE_SUFFIX):
+            with GPSArchive(path) as archive:
+                entry = self._new_entry(segment_period(name))
+                entry['devices'] = archive.device_summary()
+                entry['rows'] = archive.rows
+                if archive.rows:
+                    entry['start'], entry['end'] = utc_now_iso(archive.ts_min), utc_now_iso(archive.ts_max)
+            entry['bytes'] = os.path.getsize(path)
+            self.segments[name] = entry
+            self._manifest_dirty = True
+            return
+        with open(path, 'r+b') as fh:
+            size = fh.seek(0, os.SEEK_END)
+            tail_start = fh.seek(max(0, size - 65536))
+            complete = tail_start + fh.read().rfind(b'\n') + 1
+            if complete < size:
+                # Torn last line from a crash: cut it so appends start on a fresh line
+                fh.truncate(complete)
+        entry = self._new_entry(segment_period(name))
+        for row, _ in iter_complete_rows(path):
+            self._count(entry, row)
+        entry['bytes'] = os.path.getsize(path)
+        self.segments[name] = entry
+        self._manifest_dirty = True
+
+    @staticmethod
+    def _new_entry(key):
+        return {'period': key, 'start': None, 'end': None, 'rows': 0, 'bytes': 0, 'devices': {}}
+
+    @staticmethod
+    def _count(entry, row):
+        timestamp, device_id = row[0], row[1]
+        entry['rows'] += 1
+        if entry['start'] is None or timestamp < entry['start']:
+            entry['start'] = timestamp
+        if entry['end'] is None or timestamp > entry['end']:
+            entry['end'] = timestamp
+        device = entry['devices'].get(device_id)
+        if device is None:
+            entry['devices'][device_id] = [1, timestamp, timestamp]
+        else:
+            device[0] += 1
+            device[2] = timestamp
+
+    def segment_name(self, row):
+        key = period_key(row[0], self.granularity)
+        month = key[:7] if key != UNDATED_KEY else UNDATED_KEY
+        if self.per_device:
+            return f'{month}/{key}.{_UNSAFE_FILENAME.sub("_", row[1])}.csv'
+        return f'{month}/{key}.csv'
+
+    def write_rows(self, rows):
+        """Append rows to their segments; returns the total size of all segments"""
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.segment_name(row), []).append(row)
+
+        with self._lock:
+            for name, group in groups.items():
+                entry = self.segments.get(name)
+                if entry is None:
+                    entry = self.segments[name] = self._new_entry(segment_period(name))
+                fh = self._handle(name)
+                fh.write(format_rows(group))
+                fh.flush()
+                entry['bytes'] = fh.tell()
+                for row in group:
+                    self._count(entry, row)
+                self._dirty_handles.add(name)
+            self._manifest_dirty = True
+            position = sum(entry['bytes'] for entry in self.segments.values())
+
+        if time.monotonic() - self._manifest_saved >= self.manifest_interval:
+            self.save_manifest()
+        return position
+
+    def _handle(self, name):
+        fh = self._handles.get(name)
+        if fh is not None:
+            self._handles.move_to_end(name)
+            return fh
+        path = os.path.join(self.path, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fh = open(path, 'a', newline='')
+        if fh.tell() == 0:
+            fh.write(CSV_HEADER)
+        self._handles[name] = fh
+        while len(self._handles) > MAX_OPEN_SEGMENTS:
+            old_name, old = self._handles.popitem(last=False)
+            if old_name in self._dirty_handles:
+                os.fsync(old.fileno())
+                self._dirty_handles.discard(old_name)
+            old.close()
+        return fh
+
+    def sync(self):
+        """fsync every segment written since the last sync, then the manifest"""
+        with self._lock:
+            for name in self._dirty_handles:
+                fh = self._handles.get(name)
+                if fh is not None:
+                    os.fsync(fh.fileno())
+            self._dirty_handles.clear()
+        self.save_manifest()
+
+    def position(self):
+        """Sizes of the open segments, recorded by journal checkpoints"""
+        with self._lock:
+            return {name: self.segments[name]['bytes'] for name in self._handles}
+
+    def recover(self, rows, position):
+        """Append the journaled ``rows`` that never reached their segments; returns how many.
+
+        Torn lines were already cut by open(). Segments open at the last
+        checkpoint are compared from their size then, others as a whole.
+        """
+        position = position or {}
+        groups = {}
+        for row in rows:
+            groups.setdefault(self.segment_name(row), []).append(row)
+        missing = []
+        for name, group in groups.items():
+            path = os.path.join(self.path, name)
+            if not os.path.exists(path):
+                missing.extend(group)
+                continue
+            with open(path, 'rb') as fh:
+                fh.seek(min(position.get(name, 0), os.path.getsize(path)))
+                present = [line for line in fh if line.endswith(b'\n')]
+            missing.extend(group[i] for i in unwritten(row_lines(group), present))
+        if missing:
+            self.write_rows(missing)
+        return len(missing)
+
+    def save_manifest(self):
+        """Atomically write the manifest if anything changed"""
+        with self._lock:
+            if not self._manifest_dirty:
+                return
+            data = json.dumps({
+                'version': MANIFEST_VERSION,
+                'granularity': self.granularity,
+                'per_device': self.per_device,
+                'segments': self.segments,
+            }, separators=(',', ':'))
+            self._manifest_dirty = False
+            self._manifest_saved = time.monotonic()
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as fh:
+            fh.write(data)
+        os.replace(tmp_path, self.manifest_path)
+
+    def close(self):
+        with self._lock:
+            for fh in self._handles.values():
+                fh.close()
+            self._handles.clear()
+            self._dirty_handles.clear()
+        self.save_manifest()
+
+    def seal(self, before=None):
+        """Convert CSV segments of periods before ``before`` (default: the
+        current period) into columnar archives; returns the sealed names.
+
+        Not safe while another process is appending to the store.
+        """
+        before = before or period_key(utc_now_iso(), self.granularity)
+        sealed = []
+        for name in [name for name in self.segments
+                     if name.endswith('.csv') and segment_period(name) < before]:
+            csv_path = os.path.join(self.path, name)
+            archive_name = name[:-len('.csv')] + ARCHIVE_SUFFIX
+            archive_path = os.path.join(self.path, archive_name)
+            with self._lock:
+                fh = self._handles.pop(name, None)
+                if fh is not None:
+                    fh.close()
+                self._dirty_handles.discard(name)
+
+            expected = sum(1 for _ in iter_complete_rows(csv_path))
+            rows = (row for row, _ in iter_complete_rows(csv_path))
+            if archive_name in self.segments:
+                # Late rows for an already sealed period: merge them in
+                with GPSArchive(archive_path) as archive:
+                    old_rows = list(archive.iter_rows())
+                expected += len(old_rows)
+                rows = chain(old_rows, rows)
+            rejected = []
+            sealing_path = archive_path + '.sealing'
+            written = write_archive(sealing_path, rows, rejected)
+            if written + len(rejected) != expected:
+                # The segment changed while it was read: keep it for the next seal
+                os.remove(sealing_path)
+                print(f"⚠️  Not sealing {name}: {written + len(rejected)} of {expected} rows accounted for")
+                continue
+            if rejected:
+                # Rows the archive columns cannot hold are kept next to it, never just dropped
+                rejected_path = csv_path + REJECTED_SUFFIX
+                with open(rejected_path, 'a', newline='') as fh:
+                    if fh.tell() == 0:
+                        fh.write(CSV_HEADER)
+                    fh.write(format_rows(rejected))
+                    fh.flush()
+                    os.fsync(fh.fileno())
+                print(f"⚠️  {len(rejected)} rows of {name} cannot be archived, kept in {rejected_path}")
+            os.replace(sealing_path, archive_path)
+
+            with self._lock:
+                del self.segments[name]
+            self._rescan(archive_name)
+            os.remove(csv_path)
+            sealed.append(archive_name)
+        if sealed:
+            self.save_manifest()
+        return sealed
+
+    # -- reading -------------------------------------------------------------
+
+    def select(self, device_id=None, start=None, end=None):
+        """Names of the segments that may hold matching rows, oldest first"""
+        start, end = normalize_time(start), normalize_time(end)
+        with self._lock:
+            selected = []
+            for name, entry in self.segments.items():
+                if not entry['rows']:
+                    continue
+                if device_id is not None and device_id not in entry['devices']:
+                    continue
+                if start is not None and entry['end'] < start:
+                    continue
+                if end is not None and entry['start'] > end:
+                    continue
+                selected.append((entry['start'], name))
+        selected.sort()
+        return [name for _, name in selected]
+
+    def _segment_records(self, name, device_id, lower, upper, reverse):
+        path = os.path.join(self.path, name)
+        if name.endswith(ARCHIVE_SUFFIX):
+            with GPSArchive(path) as archive:
+                yield from archive.records(device_id, lower, upper, reverse)
+            return
+
+        if reverse:
+            records = iter_records_reversed(path, [device_id] if device_id is not None else None)
+        else:
+            records = self._csv_records(path, device_id)
+        for record in records:
+            timestamp = record['timestamp_server_utc']
+            if (lower is not None and timestamp < lower) or (upper is not None and timestamp > upper):
+                continue
+            yield record
+
+    @staticmethod
+    def _csv_records(path, device_id):
+        for row, _ in iter_complete_rows(path):
+            if device_id is not None and row[1] != device_id:
+                continue
+            try:
+                yield record_from_row(row)
+            except ValueError:
+                continue
+
+    def query(self, device_id=None, start=None, end=None, reverse=False):
+        """Yield JSON records for one device (or all) received between two server times.
+
+        Segments are read oldest first (newest first with ``reverse``), so
+        each device's records come out in log order.
+        """
+        lower, upper = normalize_time(start), normalize_time(end)
+        names = self.select(device_id, lower, upper)
+        for name in (reversed(names) if reverse else names):
+            yield from self._segment_records(name, device_id, lower, upper, reverse)
+
+    def iter_rows(self):
+        """Every row of every segment, oldest segment first"""
+        for name in self.select():
+            path = os.path.join(self.path, name)
+            if name.endswith(ARCHIVE_SUFFIX):
+                with GPSArchive(path) as archive:
+                    yield from archive.iter_rows()
+            else:
+                for row, _ in iter_complete_rows(path):
+                    yield row
+
+    def tail(self, device_id, limit):
+        """Last ``limit`` fixes of a device, oldest first, reading only its newest segments"""
+        newest = []
+        for record in self.query(device_id, reverse=True):
+            newest.append(record)
+            if len(newest) == limit:
+                break
+        newest.reverse()
+        return newest
+
+    def tail_many(self, device_ids, limit):
+        """Last ``limit`` fixes of each listed device in one newest-first pass over the segments"""
+        result = {device_id: [] for device_id in device_ids}
+        waiting = set(result)
+        for name in reversed(self.select()):
+            with self._lock:
+                holds_waiting = not waiting.isdisjoint(self.segments[name]['devices'])
+            if not holds_waiting:
+                continue
+            for record in self._segment_records(name, None, None, None, True):
+                rows = result.get(record['device_id'])
+                if rows is None or len(rows) >= limit:
+                    continue
+                rows.append(record)
+                if len(rows) == limit:
+                    waiting.discard(record['device_id'])
+                    if not waiting:
+                        break
+            if not waiting:
+                break
+        for rows in result.values():
+            rows.reverse()
+        return result
+
+    def device_summary(self):
+        """Per-device points and first/last seen across all segments, from the manifest"""
+        devices = {}
+        with self._lock:
+            entries = sorted(self.segments.values(), key=lambda entry: entry['start'] or '')
+            for entry in entries:
+                for device_id, (points, first, last) in entry['devices'].items():
+                    device = devices.get(device_id)
+                    if device is None:
+                        devices[device_id] = {'points': points, 'first_seen': first, 'last_seen': last}
+                    else:
+                        device['points'] += points
+                        device['first_seen'] = min(device['first_seen'], first)
+                        device['last_seen'] = max(device['last_seen'], last)
+        return devices
+
+    def remove_before(self, cutoff):
+        """Delete segments whose newest row is older than ``cutoff``; returns their names"""
+        cutoff = normalize_time(cutoff)
+        removed = []
+        with self._lock:
+            for name, entry in list(self.segments.items()):
+                if entry['end'] is None or entry['end'] >= cutoff:
+                    continue
+                fh = self._handles.pop(name, None)
+                if fh is not None:
+                    fh.close()
+                self._dirty_handles.discard(name)
+                os.remove(os.path.join(self.path, name))
+                del self.segments[name]
+                removed.append(name)
+            self._manifest_dirty = self._manifest_dirty or bool(removed)
+        self.save_manifest()
+        return removed
+
+
+def split_log(csv_path, store, batch_size=10000):
+    """Copy an existing gps_log.csv into a partitioned store; returns rows copied"""
+    copied = 0
+    batch = []
+    for row in iter_csv_rows(csv_path):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            store.write_rows(batch)
+            copied += len(batch)
+            batch = []
+    if batch:
+        store.write_rows(batch)
+        copied += len(batch)
+    return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time-partitioned GPS log storage')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    split = commands.add_parser('split', help='Split gps_log.csv into segments')
+    split.add_argument('log', help='Existing GPS log, e.g. data/gps_log.csv')
+    split.add_argument('--out', help='Segment directory (default: log path without .csv)')
+    split.add_argument('--granularity', choices=sorted(GRANULARITIES), default=DEFAULT_GRANULARITY)
+    split.add_argument('--per-device', action='store_true', help='One segment per device and period')
+
+    info = commands.add_parser('info', help='List segments from the manifest')
+    info.add_argument('dir', help='Segment directory')
+
+    seal = commands.add_parser('seal', help='Convert finished segments to columnar archives')
+    seal.add_argument('dir', help='Segment directory (the server must not be writing to it)')
+
+    prune = commands.add_parser('prune', help='Delete segments older than N days')
+    prune.add_argument('dir', help='Segment directory')
+    prune.add_argument('--keep-days', type=float, required=True)
+
+    args = parser.parse_args()
+
+    if args.command == 'split':
+        out = args.out or os.path.splitext(args.log)[0]
+        if os.path.exists(os.path.join(out, MANIFEST_NAME)):
+            parser.error(f'{out} already holds a partitioned log')
+        store = PartitionedLogStore(out, args.granularity, args.per_device).open()
+        started = time.time()
+        copied = split_log(args.log, store)
+        store.sync()
+        store.close()
+        print(f"✅ Split {copied} fixes into {len(store.segments)} segments in {out} "
+              f"({time.time() - started:.1f}s)")
+        print(f"   Start the server with GPS_STORAGE=partitioned GPS_PARTITION_DIR={out}")
+
+    elif args.command == 'info':
+        store = PartitionedLogStore(args.dir).open()
+        print(f"📂 {args.dir}: {store.granularity} segments"
+              f"{', per device' if store.per_device else ''}")
+        for name in store.select():
+            entry = store.segments[name]
+            print(f"   {name:45} {entry['rows']:>9} fixes  {len(entry['devices']):>4} devices  "
+                  f"{entry['start']} .. {entry['end']}")
+        store.close()
+
+    elif args.command == 'seal':
+        store = PartitionedLogStore(args.dir).open()
+        before = sum(entry['bytes'] for entry in store.segments.values())
+        sealed = store.seal()
+        after = sum(entry['bytes'] for entry in store.segments.values())
+        store.close()
+        print(f"📦 Sealed {len(sealed)} segments ({before / 1024:.0f} KB -> {after / 1024:.0f} KB)")
+
+    elif args.command == 'prune':
+        store = PartitionedLogStore(args.dir).open()
+        removed = store.remove_before(time.time() - args.keep_days * 86400)
+        store.close()
+        print(f"🧹 Removed {len(removed)} segments older than {args.keep_days:g} days")
+
+
+if __name__ == '__main__':
+    main()
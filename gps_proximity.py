@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Proximity Alerts
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Flags pairs of vehicles that are dangerously close, or closing in on each
+other fast, from the latest position of every device:
+
+    critical   the two vehicles are within GPS_PROXIMITY_DISTANCE metres
+    warning    within GPS_PROXIMITY_WARN metres and closing at GPS_PROXIMITY_CLOSING_KMH or more
+    clear      a flagged pair is no longer close
+
+Distances and velocities are measured in metres east/north at the
+vehicles' own latitude, so sites far apart (the demo log has forklifts in
+Gothenburg and New York) are each measured correctly; the velocity of each
+device is estimated from its last two fixes. A scan hashes every recently
+seen device into latitude/longitude cells at least the warning distance
+wide, so only devices in the same or a neighbouring cell are compared
+instead of all n * (n - 1) / 2 pairs. Each neighbouring cell pair is visited
+once (half neighbourhood).
+
+Alerts are kept in memory with "<epoch>-<seq>" cursors like the geofence
+events, and pushed to /api/proximity_stream.php clients.
+
+Environment:
+    GPS_PROXIMITY_DISTANCE      metres for a critical alert (default 5)
+    GPS_PROXIMITY_WARN          metres for a warning when closing (default 15)
+    GPS_PROXIMITY_CLOSING_KMH   closing speed for a warning (default 5)
+    GPS_PROXIMITY_INTERVAL      seconds between scans (default 1)
+    GPS_PROXIMITY_MAX_AGE       positions older than this many seconds are ignored (default 30)
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from gps_index import parse_cursor
+from gps_log import utc_now_iso
+
+DEFAULT_DISTANCE_M = 5.0
+DEFAULT_WARN_M = 15.0
+DEFAULT_CLOSING_KMH = 5.0
+DEFAULT_INTERVAL_S = 1.0
+DEFAULT_MAX_AGE_S = 30.0
+DEFAULT_MAX_ALERTS = 10000
+MIN_VELOCITY_DT = 0.5
+METERS_PER_DEGREE = 111320.0
+MAX_GRID_LAT = 89.0
+SEVERITY = {'warning': 1, 'critical': 2}
+
+# The cell itself and the four neighbours "after" it; the other four are
+# covered when the scan reaches those cells
+HALF_NEIGHBOURHOOD = ((1, -1), (1, 0), (1, 1), (0, 1))
+
+
+class ProximityDetector:
+    """Latest position and velocity per device, scanned for close pairs"""
+
+    def __init__(self, distance_m=DEFAULT_DISTANCE_M, warn_m=DEFAULT_WARN_M, closing_kmh=DEFAULT_CLOSING_KMH,
+                 interval_s=DEFAULT_INTERVAL_S, max_age_s=DEFAULT_MAX_AGE_S, max_alerts=DEFAULT_MAX_ALERTS):
+        self.distance_m = distance_m
+        self.warn_m = max(warn_m, distance_m)
+        self.closing_kmh = closing_kmh
+        self.interval_s = interval_s
+        self.max_age_s = max_age_s
+        self.seq = 0
+        self.scans = 0
+        self.last_scan_ms = 0.0
+        self.epoch = format(int(time.time() * 1000), 'x')
+        self.alerts = deque(maxlen=max_alerts)
+        self._positions = {}  # device_id -> [vx, vy, seen_at, lat, lng, ref_lat, ref_lng, ref_at]
+        self._active = {}  # (device_a, device_b) -> latest alert of the pair
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(float(os.environ.get('GPS_PROXIMITY_DISTANCE', DEFAULT_DISTANCE_M)),
+                   float(os.environ.get('GPS_PROXIMITY_WARN', DEFAULT_WARN_M)),
+                   float(os.environ.get('GPS_PROXIMITY_CLOSING_KMH', DEFAULT_CLOSING_KMH)),
+                   float(os.environ.get('GPS_PROXIMITY_INTERVAL', DEFAULT_INTERVAL_S)),
+                   float(os.environ.get('GPS_PROXIMITY_MAX_AGE', DEFAULT_MAX_AGE_S)))
+
+    def add_rows(self, rows):
+        """Ingest pipeline listener: record the newest position of each device"""
+        now = time.time()
+        with self._lock:
+            for row in rows:
+                self._update(row[1], row[3], row[4], now)
+
+    def update(self, device_id, lat, lng, now=None):
+        """Record a position that does not go through the ingest pipeline"""
+        with self._lock:
+            self._update(device_id, lat, lng, time.time() if now is None else now)
+
+    def _update(self, device_id, lat, lng, now):
+        if not (math.isfinite(lat) and math.isfinite(lng)):
+            return
+        position = self._positions.get(device_id)
+        if position is None:
+            self._positions[device_id] = [0.0, 0.0, now, lat, lng, lat, lng, now]
+            return
+        # Velocity over at least MIN_VELOCITY_DT, so fixes arriving in one burst keep the previous one
+        dt = now - position[7]
+        if dt >= MIN_VELOCITY_DT:
+            position[0] = (lng - position[6]) * METERS_PER_DEGREE * math.cos(math.radians(lat)) / dt
+            position[1] = (lat - position[5]) * METERS_PER_DEGREE / dt
+            position[5], position[6], position[7] = lat, lng, now
+        position[2], position[3], position[4] = now, lat, lng
+
+    def recent(self, now):
+        """(device_id, lat, lng, vx, vy, metres per degree of longitude) of devices seen within
+        max_age_s, velocities in m/s east/north"""
+        with self._lock:
+            return [(device_id, p[3], p[4], p[0], p[1], METERS_PER_DEGREE * math.cos(math.radians(p[3])))
+                    for device_id, p in self._positions.items() if now - p[2] <= self.max_age_s]
+
+    def close_pairs(self, now=None):
+        """(device_a, device_b, distance_m, closing_kmh, severity) of every flagged pair"""
+        now = time.time() if now is None else now
+        positions = self.recent(now)
+        if not positions:
+            return []
+
+        # Longitude cells are warn_m wide where a degree is shortest, so close pairs always share or touch a cell
+        lat_cell = self.warn_m / METERS_PER_DEGREE
+        lng_cell = lat_cell / math.cos(math.radians(min(max(abs(p[1]) for p in positions), MAX_GRID_LAT)))
+        grid = {}
+        for position in positions:
+            grid.setdefault((math.floor(position[2] / lng_cell), math.floor(position[1] / lat_cell)),
+                            []).append(position)
+
+        pairs = []
+        for (cx, cy), members in grid.items():
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    self._check(a, b, pairs)
+            for dx, dy in HALF_NEIGHBOURHOOD:
+                neighbours = grid.get((cx + dx, cy + dy))
+                if neighbours:
+                    for a in members:
+                        for b in neighbours:
+                            self._check(a, b, pairs)
+        return pairs
+
+    def _check(self, a, b, pairs):
+        dy = (b[1] - a[1]) * METERS_PER_DEGREE
+        if abs(dy) > self.warn_m:
+            return
+        dx = (b[2] - a[2]) * (a[5] + b[5]) / 2
+        d2 = dx * dx + dy * dy
+        if d2 > self.warn_m * self.warn_m:
+            return
+        distance = math.sqrt(d2)
+        # Closing speed: how fast the gap shrinks along the line between the two
+        closing = -(dx * (b[3] - a[3]) + dy * (b[4] - a[4])) / distance * 3.6 if distance > 0 else 0.0
+        if distance <= self.distance_m:
+            severity = 'critical'
+        elif closing >= self.closing_kmh:
+            severity = 'warning'
+        else:
+            return
+        if a[0] > b[0]:
+            a, b = b, a
+        pairs.append((a, b, distance, closing, severity))
+
+    def scan(self, now=None):
+        """Compare the latest positions and record new, escalated and cleared alerts; returns them"""
+        started = time.perf_counter()
+        pairs = self.close_pairs(now)
+        timestamp = utc_now_iso(now)
+        new_alerts = []
+        with self._lock:
+            flagged = set()
+            for a, b, distance, closing, severity in pairs:
+                key = (a[0], b[0])
+                flagged.add(key)
+                active = self._active.get(key)
+                alert = {'device_a': a[0], 'device_b': b[0], 'severity': severity,
+                         'distance_m': round(distance, 1), 'closing_kmh': round(closing, 1),
+                         'lat': round((a[1] + b[1]) / 2, 7), 'lng': round((a[2] + b[2]) / 2, 7),
+                         'timestamp': timestamp}
+                if active is None or SEVERITY[severity] > SEVERITY[active['severity']]:
+                    new_alerts.append(self._record(alert))
+                else:
+                    alert['seq'] = active['seq']
+                self._active[key] = alert
+            for key in [key for key in self._active if key not in flagged]:
+                cleared = dict(self._active.pop(key), severity='clear', timestamp=timestamp)
+                new_alerts.append(self._record(cleared))
+            self.scans += 1
+            self.last_scan_ms = round((time.perf_counter() - started) * 1000, 2)
+        return new_alerts
+
+    def _record(self, alert):
+        self.seq += 1
+        alert['seq'] = self.seq
+        self.alerts.append(alert)
+        return alert
+
+    def cursor(self):
+        return f'{self.epoch}-{self.seq}'
+
+    def parse_cursor(self, value):
+        seq = parse_cursor(value, self.epoch)
+        return seq if seq is not None and seq <= self.seq else None
+
+    def alerts_since(self, seq=None, device_id=None, limit=100):
+        """Newest ``limit`` alerts (after ``seq`` if given) involving ``device_id``, oldest first"""
+        with self._lock:
+            alerts = list(self.alerts)
+        matched = []
+        for alert in reversed(alerts):
+            if seq is not None and alert['seq'] <= seq:
+                break
+            if device_id and device_id not in (alert['device_a'], alert['device_b']):
+                continue
+            matched.append(alert)
+            if len(matched) >= limit:
+                break
+        matched.reverse()
+        return matched
+
+    def active(self):
+        """Pairs flagged by the last scan, most severe and closest first"""
+        with self._lock:
+            alerts = list(self._active.values())
+        return sorted(alerts, key=lambda alert: (-SEVERITY[alert['severity']], alert['distance_m']))
+
+    def status(self):
+        return {'devices': len(self._positions), 'active': len(self._active), 'alerts': self.seq,
+                'scans': self.scans, 'last_scan_ms': self.last_scan_ms, 'distance_m': self.distance_m,
+                'warn_m': self.warn_m, 'closing_kmh': self.closing_kmh}
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Simulated Fleet State Store
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Holds the animated forklifts of the development server. The movement
+simulator thread is the only writer: it updates its working copies, appends
+one trail point per forklift to a fixed-size ring and then publishes an
+immutable FleetSnapshot with a single attribute assignment. Request handlers
+read ``store.snapshot`` once and work on that object, so they never take a
+lock and never see a forklift half-way through an update or a trail being
+trimmed.
+
+States and trail points use __slots__ classes instead of per-point dicts.
+"""
+
+from collections import deque
+
+DEFAULT_TRAIL_LENGTH = 25
+
+
+class ForkliftState:
+    """Position and movement of one simulated forklift"""
+
+    __slots__ = ('current_lat', 'current_lng', 'target_destination', 'progress', 'last_update',
+                 'speed_kmh', 'heading', 'status')
+
+    def __init__(self, current_lat, current_lng, target_destination=0, progress=0.0, last_update=0.0,
+                 speed_kmh=0.0, heading=0.0, status='moving'):
+        self.current_lat = current_lat
+        self.current_lng = current_lng
+        self.target_destination = target_destination
+        self.progress = progress
+        self.last_update = last_update
+        self.speed_kmh = speed_kmh
+        self.heading = heading
+        self.status = status
+
+    def copy(self):
+        return ForkliftState(self.current_lat, self.current_lng, self.target_destination, self.progress,
+                             self.last_update, self.speed_kmh, self.heading, self.status)
+
+
+class TrailPoint:
+    """One point of a forklift trail"""
+
+    __slots__ = ('lat', 'lng', 'timestamp', 'speed', 'heading')
+
+    def __init__(self, lat, lng, timestamp, speed, heading):
+        self.lat = lat
+        self.lng = lng
+        self.timestamp = timestamp
+        self.speed = speed
+        self.heading = heading
+
+    def to_dict(self):
+        """The forklift_trails.php point shape"""
+        return {'lat': self.lat, 'lng': self.lng, 'timestamp': self.timestamp,
+                'speed': self.speed, 'heading': self.heading}
+
+
+class FleetSnapshot:
+    """Read-only view of the fleet after ``tick`` simulator passes"""
+
+    __slots__ = ('tick', 'states', 'trails')
+
+    def __init__(self, tick, states, trails):
+        self.tick = tick
+        self.states = states  # device_id -> ForkliftState, never mutated once published
+        self.trails = trails  # device_id -> tuple of TrailPoint, oldest first
+
+    def __contains__(self, device_id):
+        return device_id in self.states
+
+    def trail_dicts(self, device_id, newest=None):
+        """A forklift's trail as dicts; ``newest`` keeps only that many of the latest points"""
+        trail = self.trails.get(device_id, ())
+        if newest is not None:
+            trail = trail[len(trail) - min(newest, len(trail)):]
+        return [point.to_dict() for point in trail]
+
+
+class FleetStateStore:
+    """Single-writer store publishing copy-on-write snapshots of the simulated fleet"""
+
+    def __init__(self, trail_length=DEFAULT_TRAIL_LENGTH):
+        self.trail_length = trail_length
+        self.ticks = 0
+        self.states = {}  # working copies, only touched by the writer
+        self._trails = {}
+        self.snapshot = FleetSnapshot(0, {}, {})
+
+    def add(self, device_id, state):
+        self.states[device_id] = state
+        self._trails[device_id] = deque(maxlen=self.trail_length)
+
+    def record(self, device_id, timestamp):
+        """Append the current position of a forklift to its trail ring"""
+        state = self.states[device_id]
+        self._trails[device_id].append(TrailPoint(state.current_lat, state.current_lng, timestamp,
+                                                  state.speed_kmh, state.heading))
+
+    def publish(self, advance=True):
+        """Make the working state visible to readers as a new snapshot; returns it"""
+        if advance:
+            self.ticks += 1
+        snapshot = FleetSnapshot(self.ticks,
+                                 {device_id: state.copy() for device_id, state in self.states.items()},
+                                 {device_id: tuple(trail) for device_id, trail in self._trails.items()})
+        self.snapshot = snapshot
+        return snapshot
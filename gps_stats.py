@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Incremental Fleet Statistics
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Maintains the aggregates behind dashboard_api.php?action=stats (total
+points, per-device first/last seen, date range) incrementally instead of
+rescanning gps_log.csv on every request like getSystemStats() does.
+
+The aggregates are updated from the CSV writer after each batch is written
+and checkpointed to a small JSON file together with the log offset they
+cover. On restart only the part of the log written after the checkpoint is
+scanned. With partitioned storage (gps_partitions.py) the aggregates are
+rebuilt from the segment manifest instead and no checkpoint is written.
+
+Environment:
+    GPS_STATS_CHECKPOINT            checkpoint file (default <log>.stats.json next to the log)
+    GPS_STATS_CHECKPOINT_INTERVAL   seconds between checkpoints (default 60)
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from gps_log import iter_complete_rows, parse_utc
+
+CHECKPOINT_VERSION = 1
+FINGERPRINT_BYTES = 4096
+ACTIVE_WINDOW_S = 300
+
+
+def log_fingerprint(path, length):
+    """Hash of the first ``length`` bytes of the log, to notice a replaced or rotated file"""
+    with open(path, 'rb') as fh:
+        return hashlib.sha1(fh.read(length)).hexdigest()
+
+
+class FleetStats:
+    """Running totals of the GPS log, safe to read while the writer updates them"""
+
+    def __init__(self, log_path, checkpoint_path=None, checkpoint_interval=60.0):
+        self.log_path = log_path
+        self.checkpoint_path = checkpoint_path or os.path.splitext(log_path)[0] + '.stats.json'
+        self.checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = time.monotonic()
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.total_points = 0
+        self.date_start = None
+        self.date_end = None
+        self.devices = {}
+        self.offset = 0
+
+    @classmethod
+    def from_env(cls, log_path):
+        return cls(
+            log_path,
+            checkpoint_path=os.environ.get('GPS_STATS_CHECKPOINT'),
+            checkpoint_interval=float(os.environ.get('GPS_STATS_CHECKPOINT_INTERVAL', 60)),
+        )
+
+    @classmethod
+    def from_store(cls, store):
+        """Statistics of a PartitionedLogStore, summed from its manifest"""
+        stats = cls(store.path)
+        stats.checkpoint_path = None
+        for device_id, device in store.device_summary().items():
+            stats.devices[device_id] = device
+            stats.total_points += device['points']
+            if stats.date_start is None or device['first_seen'] < stats.date_start:
+                stats.date_start = device['first_seen']
+            if stats.date_end is None or device['last_seen'] > stats.date_end:
+                stats.date_end = device['last_seen']
+        return stats
+
+    def bootstrap(self):
+        """Load the checkpoint and scan the log from where it left off; returns rows scanned"""
+        if not os.path.exists(self.log_path):
+            return 0
+        if not self._load_checkpoint():
+            self._reset()
+        scanned = self._scan_from(self.offset)
+        if scanned:
+            self.checkpoint()
+        return scanned
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return False
+
+        if data.get('version') != CHECKPOINT_VERSION:
+            return False
+        offset = data.get('offset', 0)
+        fingerprint_length = min(offset, FINGERPRINT_BYTES)
+        if (os.path.getsize(self.log_path) < offset
+                or data.get('fingerprint') != log_fingerprint(self.log_path, fingerprint_length)):
+            print("⚠️  GPS log changed since the last stats checkpoint, rescanning")
+            return False
+        # The checkpoint must end on a line boundary of the current log
+        if offset:
+            with open(self.log_path, 'rb') as fh:
+                fh.seek(offset - 1)
+                if fh.read(1) != b'\n':
+                    return False
+
+        self.total_points = data['total_points']
+        self.date_start = data['date_start']
+        self.date_end = data['date_end']
+        self.devices = data['devices']
+        self.offset = offset
+        return True
+
+    def _scan_from(self, offset):
+        scanned = 0
+        for row, offset in iter_complete_rows(self.log_path, offset):
+            self._count(row[1], row[0])
+            scanned += 1
+        self.offset = offset
+        return scanned
+
+    def _count(self, device_id, timestamp):
+        self.total_points += 1
+        device = self.devices.get(device_id)
+        if device is None:
+            self.devices[device_id] = {'points': 1, 'first_seen': timestamp, 'last_seen': timestamp}
+        else:
+            device['points'] += 1
+            device['last_seen'] = timestamp
+        if self.date_start is None or timestamp < self.date_start:
+            self.date_start = timestamp
+        if self.date_end is None or timestamp > self.date_end:
+            self.date_end = timestamp
+
+    def add_flushed(self, rows, end_offset):
+        """CSV writer flush listener: count rows that just reached the log"""
+        with self._lock:
+            for row in rows:
+                self._count(row[1], row[0])
+            self.offset = end_offset
+        if time.monotonic() - self._last_checkpoint >= self.checkpoint_interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Atomically write the aggregates and the log offset they cover"""
+        if self.checkpoint_path is None:
+            return
+        with self._lock:
+            tmp_path = self.checkpoint_path + '.tmp'
+            try:
+                data = {
+                    'version': CHECKPOINT_VERSION,
+                    'offset': self.offset,
+                    'fingerprint': log_fingerprint(self.log_path, min(self.offset, FINGERPRINT_BYTES)),
+                    'total_points': self.total_points,
+                    'date_start': self.date_start,
+                    'date_end': self.date_end,
+                    'devices': self.devices,
+                }
+                with open(tmp_path, 'w') as fh:
+                    json.dump(data, fh)
+                os.replace(tmp_path, self.checkpoint_path)
+            except OSError as e:
+                print(f"⚠️  Could not write stats checkpoint: {e}")
+            self._last_checkpoint = time.monotonic()
+
+    def snapshot(self, now=None):
+        """Statistics in the api/dashboard_api.php?action=stats shape"""
+        now = time.time() if now is None else now
+        with self._lock:
+            devices = {}
+            active = 0
+            for device_id, device in self.devices.items():
+                seen = parse_utc(device['last_seen'])
+                is_active = seen is not None and now - seen < ACTIVE_WINDOW_S
+                active += is_active
+                devices[device_id] = dict(device, is_active=is_active)
+            return {
+                'total_points': self.total_points,
+                'unique_devices': len(self.devices),
+                'active_devices': active,
+                'date_range': {'start': self.date_start, 'end': self.date_end},
+                'devices': devices,
+            }
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Live Position Push Stream
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Fans out every new fix (from ingest or the movement simulator) to the
+dashboards subscribed to /api/gps_stream.php, a Server-Sent Events stream,
+so a dashboard no longer polls gps_latest.php once per device on every tick.
+
+Publishing never blocks the ingest path: each subscriber has a bounded queue
+and when a slow client falls behind its oldest queued fixes are dropped (a
+newer position supersedes them). A client that stops reading altogether is
+disconnected once a socket write stalls for longer than WRITE_TIMEOUT_S.
+
+Environment:
+    GPS_STREAM_MAX_CLIENTS   concurrent stream clients (default: half the pool
+                             workers in pool mode, 64 in threaded mode)
+    GPS_STREAM_QUEUE         fixes queued per client before dropping (default 256)
+"""
+
+import json
+import os
+import threading
+from collections import deque
+
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_MAX_CLIENTS = 64
+KEEPALIVE_S = 15
+WRITE_TIMEOUT_S = 10
+RETRY_MS = 3000
+
+
+class Subscription:
+    """One stream client: a bounded queue of fixes waiting to be sent"""
+
+    def __init__(self, broadcaster, device_ids=None, queue_size=DEFAULT_QUEUE_SIZE):
+        self.device_ids = frozenset(device_ids) if device_ids else None
+        self.dropped = 0
+        self.closed = False
+        self.last_seq = 0
+        self._broadcaster = broadcaster
+        self._queue = deque(maxlen=queue_size)
+        self._ready = threading.Condition(threading.Lock())
+
+    def offer(self, seq, fixes):
+        """Queue fixes without blocking; the oldest ones go when the queue is full"""
+        if self.device_ids is not None:
+            fixes = [fix for fix in fixes if fix['device_id'] in self.device_ids]
+            if not fixes:
+                return
+        with self._ready:
+            overflow = len(self._queue) + len(fixes) - self._queue.maxlen
+            if overflow > 0:
+                self.dropped += overflow
+            self._queue.extend(fixes)
+            self.last_seq = seq
+            self._ready.notify()
+
+    def get(self, timeout=KEEPALIVE_S):
+        """All queued fixes (oldest first) and the sequence number of the newest;
+        an empty list after ``timeout`` seconds or once the subscription is closed"""
+        with self._ready:
+            if not self._queue and not self.closed:
+                self._ready.wait(timeout)
+            fixes = list(self._queue)
+            self._queue.clear()
+            return fixes, self.last_seq
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+        self._broadcaster.unsubscribe(self)
+
+
+class FixBroadcaster:
+    """Publish/subscribe hub between fix producers and stream clients"""
+
+    def __init__(self, max_clients=DEFAULT_MAX_CLIENTS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.max_clients = max_clients
+        self.queue_size = queue_size
+        self.seq = 0
+        self.published = 0
+        self.rejected = 0
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, mode=None, workers=None):
+        default = max(1, workers // 2) if mode == 'pool' and workers else DEFAULT_MAX_CLIENTS
+        return cls(int(os.environ.get('GPS_STREAM_MAX_CLIENTS', default)),
+                   int(os.environ.get('GPS_STREAM_QUEUE', DEFAULT_QUEUE_SIZE)))
+
+    @property
+    def clients(self):
+        return len(self._subscriptions)
+
+    def subscribe(self, device_ids=None):
+        """New Subscription, or None when max_clients are already connected"""
+        with self._lock:
+            if len(self._subscriptions) >= self.max_clients:
+                self.rejected += 1
+                return None
+            subscription = Subscription(self, device_ids, self.queue_size)
+            self._subscriptions.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, fixes):
+        """Hand a batch of JSON records to every subscriber; never blocks on a client"""
+        if not fixes:
+            return
+        with self._lock:
+            self.seq += 1
+            self.published += len(fixes)
+            seq = self.seq
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.offer(seq, fixes)
+
+    def close(self):
+        """Wake and end every open stream (server shutdown)"""
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            subscription.close()
+
+    def status(self):
+        return {
+            'clients': self.clients,
+            'max_clients': self.max_clients,
+            'published': self.published,
+            'rejected': self.rejected,
+            'dropped': sum(s.dropped for s in list(self._subscriptions)),
+        }
+
+
+def format_event(seq, fixes, event='fixes'):
+    """One SSE message carrying a JSON array of fixes"""
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(fixes, separators=(',', ':'))}\n\n".encode()
+
+
+def stream_to(wfile, subscription, keepalive=KEEPALIVE_S, is_running=lambda: True, event='fixes'):
+    """Write queued fixes to a client until it disconnects or the subscription closes"""
+    wfile.write(f"retry: {RETRY_MS}\n\n".encode())
+    wfile.flush()
+    while is_running() and not subscription.closed:
+        fixes, seq = subscription.get(keepalive)
+        if fixes:
+            wfile.write(format_event(seq, fixes, event))
+        elif subscription.closed:
+            break
+        else:
+            wfile.write(b': keepalive\n\n')
+        wfile.flush()
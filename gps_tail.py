@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Reverse Tail Reader for gps_log.csv
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Reads the GPS log backwards from EOF in fixed-size blocks, so queries that
+only need the most recent fixes (gps_latest with a small limit, the last N
+fixes per device) stop as soon as they have enough rows instead of parsing
+the whole file from the top.
+
+A trailing line without a newline is treated as a write still in progress
+and skipped. Rows are parsed one line at a time, so quoted fields with
+embedded newlines (never written by the ingest endpoints) are not supported
+and such lines are skipped as malformed.
+
+Time-window reads that go forward (exports of long ranges) instead bisect the
+file for the first line of the window and stream from there, so they neither
+parse the part before it nor hold the result in memory.
+"""
+
+import os
+
+from gps_log import iter_complete_rows, normalize_time, parse_line, parse_utc, record_from_row, utc_now_iso
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+# Concurrent requests may land in the log slightly out of server-time order
+ORDER_SLACK_S = 60
+
+
+def iter_lines_reversed(path, block_size=DEFAULT_BLOCK_SIZE):
+    """Yield complete lines (bytes, without newline) from the end of a file"""
+    with open(path, 'rb') as fh:
+        fh.seek(0, os.SEEK_END)
+        position = fh.tell()
+        remainder = b''
+        first_block = True
+
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            fh.seek(position)
+            block = fh.read(size) + remainder
+            lines = block.split(b'\n')
+
+            if first_block:
+                # Unterminated last line: a writer is mid-append
+                lines.pop()
+                first_block = False
+
+            # The first piece may be the tail of a line that started in an
+            # earlier block; keep it until that block has been read
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                if line:
+                    yield line
+
+        if remainder:
+            yield remainder
+
+
+def iter_rows_reversed(path, block_size=DEFAULT_BLOCK_SIZE):
+    """Yield parsed CSV rows newest first, skipping the header and malformed lines"""
+    if not os.path.exists(path):
+        return
+    for line in iter_lines_reversed(path, block_size):
+        row = parse_line(line)
+        if row is not None:
+            yield row
+
+
+def iter_records_reversed(path, device_ids=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Yield JSON records newest first, optionally only for some devices"""
+    wanted = set(device_ids) if device_ids is not None else None
+    for row in iter_rows_reversed(path, block_size):
+        if wanted is not None and row[1] not in wanted:
+            continue
+        try:
+            yield record_from_row(row)
+        except ValueError:
+            continue
+
+
+def tail_by_device(path, per_device, device_ids=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Last ``per_device`` fixes of each device, oldest first.
+
+    With ``device_ids`` the scan stops as soon as every listed device has
+    enough rows (devices with fewer logged fixes force a full scan). Without
+    it every device in the log is returned, which needs a full backwards pass.
+    """
+    result = {device_id: [] for device_id in device_ids} if device_ids is not None else {}
+    waiting = set(result)
+
+    for record in iter_records_reversed(path, device_ids, block_size):
+        rows = result.setdefault(record['device_id'], [])
+        if len(rows) >= per_device:
+            continue
+        rows.append(record)
+        if len(rows) == per_device and device_ids is not None:
+            waiting.discard(record['device_id'])
+            if not waiting:
+                break
+
+    for rows in result.values():
+        rows.reverse()
+    return result
+
+
+def records_between(path, device_id=None, start=None, end=None, block_size=DEFAULT_BLOCK_SIZE):
+    """Records received between two server times, oldest first.
+
+    Reads backwards and stops once rows are older than ``start`` (with a
+    small slack for out-of-order appends), so recent windows only touch the
+    end of the log.
+    """
+    lower, upper = normalize_time(start), normalize_time(end)
+    stop = utc_now_iso(parse_utc(lower) - ORDER_SLACK_S) if lower is not None else None
+    records = []
+    for record in iter_records_reversed(path, [device_id] if device_id is not None else None, block_size):
+        timestamp = record['timestamp_server_utc']
+        if stop is not None and timestamp < stop:
+            break
+        if (lower is None or timestamp >= lower) and (upper is None or timestamp <= upper):
+            records.append(record)
+    records.reverse()
+    return records
+
+
+def _first_row_at(fh, offset):
+    """(line start, row) of the first parseable line starting after ``offset``; (None, None) at EOF"""
+    fh.seek(offset)
+    if offset:
+        fh.readline()  # finish the line ``offset`` falls into
+    while True:
+        start = fh.tell()
+        line = fh.readline()
+        if not line.endswith(b'\n'):
+            return None, None
+        row = parse_line(line.rstrip(b'\n'))
+        if row is not None:
+            return start, row
+
+
+def offset_before(path, timestamp, block_size=DEFAULT_BLOCK_SIZE):
+    """Offset of a line start at or before the first row received at ``timestamp``.
+
+    Bisects on the server time of the log's lines, then backs off by
+    ORDER_SLACK_S so rows appended slightly out of order are not skipped.
+    """
+    target = utc_now_iso(parse_utc(timestamp) - ORDER_SLACK_S)
+    with open(path, 'rb') as fh:
+        low, high = 0, os.fstat(fh.fileno()).st_size
+        while high - low > block_size:
+            middle = (low + high) // 2
+            start, row = _first_row_at(fh, middle)
+            if start is not None and row[0] < target:
+                low = start
+            else:
+                high = middle
+    return low
+
+
+def iter_records_between(path, device_id=None, start=None, end=None):
+    """Yield records received between two server times, oldest first, without buffering them"""
+    if not os.path.exists(path):
+        return
+    lower, upper = normalize_time(start), normalize_time(end)
+    offset = offset_before(path, lower) if lower is not None else 0
+    stop = utc_now_iso(parse_utc(upper) + ORDER_SLACK_S) if upper is not None else None
+    for row, _ in iter_complete_rows(path, offset):
+        timestamp = row[0]
+        if stop is not None and timestamp > stop:
+            break
+        if device_id is not None and row[1] != device_id:
+            continue
+        if (lower is not None and timestamp < lower) or (upper is not None and timestamp > upper):
+            continue
+        try:
+            yield record_from_row(row)
+        except ValueError:
+            continue
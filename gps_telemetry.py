@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Server Telemetry
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Instrumentation for the Python server, all stdlib:
+
+- MetricsRegistry: per-route request counters, latency histograms and bytes
+  sent, background loop tick histograms, the ingested fix rate and gauges
+  read from the server's components when scraped, rendered in the Prometheus
+  text exposition format at /metrics. With GPS_PROCESSES above 1 the worker
+  processes send their request metrics to the primary, which merges them in
+- AccessLog: request log lines queued by the handlers and written in batches
+  by a background thread, instead of one synchronous stderr write per request
+- SamplingProfiler: opt-in wall-clock sampler of every thread's stack
+  (sys._current_frames), reported as folded stacks for flame graph tools
+
+Environment:
+    GPS_METRICS              0 disables /metrics and request timing (default 1)
+    GPS_ACCESS_LOG           stderr (default), off, or a file to append to
+    GPS_ACCESS_LOG_BUFFER    lines queued before new ones are dropped (default 10000)
+    GPS_PROFILER             1 enables the /api/profile.php sampling profiler toggle (default 0)
+    GPS_PROFILER_INTERVAL    milliseconds between stack samples (default 5)
+"""
+
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TICK_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+DEFAULT_LOG_BUFFER = 10000
+LOG_FLUSH_INTERVAL_S = 0.5
+DEFAULT_PROFILER_INTERVAL_MS = 5.0
+PROFILER_MAX_DEPTH = 64
+PROFILER_MAX_STACKS = 10000
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _enabled(name, default):
+    return os.environ.get(name, default).lower() in ('1', 'true', 'yes', 'on')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in labels]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Observation counts per upper bound, plus their sum and count"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels):
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            le = 'le="%s"' % ('+Inf' if bound == float('inf') else _number(float(bound)))
+            yield f'{name}_bucket{_labels(labels, le)} {cumulative}'
+        yield f'{name}_sum{_labels(labels)} {_number(self.sum)}'
+        yield f'{name}_count{_labels(labels)} {self.count}'
+
+
+class MetricsRegistry:
+    """Request, loop and ingest metrics of one server process"""
+
+    def __init__(self, latency_buckets=LATENCY_BUCKETS, tick_buckets=TICK_BUCKETS):
+        self.latency_buckets = latency_buckets
+        self.tick_buckets = tick_buckets
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._sent = {}
+        self._latency = {}
+        self._ticks = {}
+        self._ingested = 0
+        self._collectors = []
+        self._remote = {}
+        self._retired = []
+
+    @classmethod
+    def from_env(cls):
+        """A registry, or None when GPS_METRICS is off"""
+        return cls() if _enabled('GPS_METRICS', '1') else None
+
+    def observe_request(self, route, method, status, seconds, sent):
+        key = (route, method, status)
+        with self._lock:
+            self._requests[key] = self._requests.get(key, 0) + 1
+            self._sent[route] = self._sent.get(route, 0) + sent
+            histogram = self._latency.get(route)
+            if histogram is None:
+                histogram = self._latency[route] = Histogram(self.latency_buckets)
+            histogram.observe(seconds)
+
+    def observe_tick(self, loop, seconds):
+        """Duration of one pass of a background loop (simulator, load generator, scans)"""
+        with self._lock:
+            histogram = self._ticks.get(loop)
+            if histogram is None:
+                histogram = self._ticks[loop] = Histogram(self.tick_buckets)
+            histogram.observe(seconds)
+
+    def add_rows(self, rows):
+        """Ingest pipeline listener: count stored fixes"""
+        with self._lock:
+            self._ingested += len(rows)
+
+    def add_collector(self, name, kind, help_text, collect):
+        """Register a value read at scrape time.
+
+        ``collect()`` returns a number, a list of ``({label: value}, number)``
+        pairs, or None to leave the metric out (component not running).
+        """
+        self._collectors.append((name, kind, help_text, collect))
+
+    def state(self):
+        """Counters and histogram buckets as plain data, to merge into another process's registry"""
+        with self._lock:
+            return {'requests': dict(self._requests), 'sent': dict(self._sent),
+                    'latency': {route: (list(h.counts), h.sum, h.count) for route, h in self._latency.items()},
+                    'ticks': {loop: (list(h.counts), h.sum, h.count) for loop, h in self._ticks.items()},
+                    'ingested': self._ingested}
+
+    def add_remote(self, source, state):
+        """Include the latest state() of another process (a worker) in render()"""
+        with self._lock:
+            previous = self._remote.get(source)
+            # A restarted process counts from zero again; keep what its predecessor counted
+            if previous is not None and sum(state['requests'].values()) < sum(previous['requests'].values()):
+                self._retired.append(previous)
+            self._remote[source] = state
+
+    def render(self):
+        """All metrics, including those of remote processes, in the Prometheus text exposition format"""
+        merged = self.state()
+        with self._lock:
+            remotes = list(self._remote.values()) + self._retired
+        for remote in remotes:
+            _merge(merged, remote)
+        requests = sorted(merged['requests'].items())
+        sent = sorted(merged['sent'].items())
+        latency = [(route,) + values for route, values in sorted(merged['latency'].items())]
+        ticks = [(loop,) + values for loop, values in sorted(merged['ticks'].items())]
+        ingested = merged['ingested']
+
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histograms(name, buckets, label, entries):
+            for value, counts, total, count in entries:
+                histogram = Histogram(buckets)
+                histogram.counts, histogram.sum, histogram.count = counts, total, count
+                lines.extend(histogram.lines(name, [(label, value)]))
+
+        header('gps_http_requests_total', 'counter', 'HTTP requests served, by route, method and status')
+        lines.extend(f'gps_http_requests_total{_labels([("route", r), ("method", m), ("status", s)])} {n}'
+                     for (r, m, s), n in requests)
+        header('gps_http_response_bytes_total', 'counter', 'Response bytes written, headers included, by route')
+        lines.extend(f'gps_http_response_bytes_total{_labels([("route", r)])} {n}' for r, n in sent)
+        header('gps_http_request_duration_seconds', 'histogram',
+               'Time from parsed request line to response written (whole stream for SSE routes)')
+        histograms('gps_http_request_duration_seconds', self.latency_buckets, 'route', latency)
+        header('gps_loop_tick_seconds', 'histogram', 'Duration of one pass of a background loop')
+        histograms('gps_loop_tick_seconds', self.tick_buckets, 'loop', ticks)
+        header('gps_ingest_fixes_total', 'counter', 'Fixes accepted by the ingest pipeline after filtering')
+        lines.append(f'gps_ingest_fixes_total {ingested}')
+
+        for name, kind, help_text, collect in self._collectors:
+            value = collect()
+            if value is None:
+                continue
+            header(name, kind, help_text)
+            if isinstance(value, (int, float)):
+                lines.append(f'{name} {_number(value)}')
+            else:
+                lines.extend(f'{name}{_labels(sorted(labels.items()))} {_number(v)}' for labels, v in value)
+
+        header('gps_process_uptime_seconds', 'gauge', 'Seconds since the server started')
+        lines.append(f'gps_process_uptime_seconds {round(time.time() - self.started, 3)!r}')
+        header('gps_process_threads', 'gauge', 'Live Python threads')
+        lines.append(f'gps_process_threads {threading.active_count()}')
+        return '\n'.join(lines) + '\n'
+
+
+def _merge(state, other):
+    for name in ('requests', 'sent'):
+        for key, value in other[name].items():
+            state[name][key] = state[name].get(key, 0) + value
+    for name in ('latency', 'ticks'):
+        for key, (counts, total, count) in other[name].items():
+            mine = state[name].get(key)
+            if mine is None:
+                state[name][key] = (list(counts), total, count)
+            else:
+                state[name][key] = ([a + b for a, b in zip(mine[0], counts)], mine[1] + total, mine[2] + count)
+    state['ingested'] += other['ingested']
+
+
+class AccessLog:
+    """Request log lines buffered in memory and written by a background thread"""
+
+    def __init__(self, stream=sys.stderr, max_lines=DEFAULT_LOG_BUFFER, flush_interval=LOG_FLUSH_INTERVAL_S):
+        self.stream = stream
+        self.max_lines = max_lines
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._lines = deque()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        target = os.environ.get('GPS_ACCESS_LOG', 'stderr')
+        max_lines = int(os.environ.get('GPS_ACCESS_LOG_BUFFER', DEFAULT_LOG_BUFFER))
+        if target.lower() in ('off', '0', 'none'):
+            return cls(None, max_lines)
+        if target.lower() == 'stderr':
+            return cls(sys.stderr, max_lines)
+        return cls(open(target, 'a', buffering=1024 * 1024, encoding='utf-8'), max_lines)
+
+    def start(self):
+        if self.stream is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='gps-access-log', daemon=True)
+            self._thread.start()
+        return self
+
+    def write(self, line):
+        """Queue one line (with its newline); dropped when the buffer is full"""
+        if self.stream is None:
+            return
+        with self._lock:
+            if len(self._lines) >= self.max_lines:
+                self.dropped += 1
+                return
+            self._lines.append(line)
+
+    def _drain(self):
+        with self._lock:
+            lines, self._lines = self._lines, deque()
+        if lines:
+            try:
+                self.stream.write(''.join(lines))
+                self.stream.flush()
+            except (OSError, ValueError):
+                self.dropped += len(lines)
+                return
+            self.written += len(lines)
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            self._drain()
+
+    def close(self):
+        """Write what is queued and stop the writer thread"""
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self.stream is not None:
+            self._drain()
+            if self.stream not in (sys.stderr, sys.stdout):
+                self.stream.close()
+
+
+class SamplingProfiler:
+    """Wall-clock stack sampler over all threads, started and stopped at runtime"""
+
+    def __init__(self, interval_s=DEFAULT_PROFILER_INTERVAL_MS / 1000.0, max_depth=PROFILER_MAX_DEPTH,
+                 max_stacks=PROFILER_MAX_STACKS):
+        self.interval_s = interval_s
+        self.max_depth = max_depth
+        self.max_stacks = max_stacks
+        self.samples = 0
+        self.started_at = None
+        self.sampled_s = 0.0
+        self._stacks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        """A profiler (not sampling yet), or None when GPS_PROFILER is off"""
+        if not _enabled('GPS_PROFILER', '0'):
+            return None
+        return cls(float(os.environ.get('GPS_PROFILER_INTERVAL', DEFAULT_PROFILER_INTERVAL_MS)) / 1000.0)
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        """Start sampling; samples of an earlier run are kept until reset()"""
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self.started_at = time.monotonic()
+                self._thread = threading.Thread(target=self._run, name='gps-profiler', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is None:
+                return
+            self._stop.set()
+            self.sampled_s += time.monotonic() - self.started_at
+            self.started_at = None
+        thread.join()
+
+    def reset(self):
+        with self._lock:
+            self._stacks = {}
+            self.samples = 0
+            self.sampled_s = 0.0
+            if self.started_at is not None:
+                self.started_at = time.monotonic()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval_s):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                    frame = frame.f_back
+                # Pool threads differ only by their number
+                stack.append(names.get(ident, 'thread').rstrip('0123456789_-'))
+                key = ';'.join(reversed(stack))
+                with self._lock:
+                    if key not in self._stacks and len(self._stacks) >= self.max_stacks:
+                        key = '(other stacks)'
+                    self._stacks[key] = self._stacks.get(key, 0) + 1
+            self.samples += 1
+
+    def folded(self, limit=None):
+        """``thread;outer;...;inner count`` lines, most sampled first (flamegraph.pl / speedscope input)"""
+        with self._lock:
+            stacks = sorted(self._stacks.items(), key=lambda item: -item[1])
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks[:limit])
+
+    def status(self):
+        sampled_s = self.sampled_s + (time.monotonic() - self.started_at if self.started_at is not None else 0.0)
+        return {'running': self.running, 'interval_ms': round(self.interval_s * 1000, 3),
+                'samples': self.samples, 'seconds': round(sampled_s, 1), 'stacks': len(self._stacks)}
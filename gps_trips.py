@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Trip Metrics
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Python replacement for calculateDeviceMetrics() / calculateDistance() in
+api/dashboard_api.php. Whole tracks are processed as arrays: with NumPy the
+Haversine distances, speed statistics and idle/moving split are computed in
+vectorized passes; without it a tight stdlib loop gives the same results.
+
+Metrics follow the PHP function (distance in km rounded to 2 decimals, max
+and average over the reported speeds of every fix but the first, duration in
+seconds between the first and last server timestamp) and add:
+
+    moving_time   seconds spent at or above IDLE_SPEED_KMH
+    idle_time     seconds spent below it
+    points        fixes in the track
+
+An interval takes the speed reported with its later fix, or distance / time
+when the tracker sent none. Intervals longer than MAX_GAP_S (tracker offline)
+count towards duration but neither moving nor idle time.
+
+fleet_metrics() computes every device of a mixed log in one call: the fixes
+are sorted by device and time once and all devices are reduced together.
+"""
+
+import math
+
+from gps_log import parse_utc
+
+try:
+    import numpy as np
+except ImportError:  # optional, the stdlib loop is used instead
+    np = None
+
+EARTH_RADIUS_KM = 6371.0
+IDLE_SPEED_KMH = 1.0
+MAX_GAP_S = 300
+
+
+def empty_metrics(points=0):
+    return {'total_distance': 0, 'max_speed': 0, 'avg_speed': 0, 'duration': 0,
+            'moving_time': 0, 'idle_time': 0, 'points': points}
+
+
+def _summary(distance, max_speed, speed_sum, speed_count, duration, moving, idle, points):
+    return {
+        'total_distance': round(distance, 2),
+        'max_speed': round(max_speed, 2) if speed_count else 0,
+        'avg_speed': round(speed_sum / speed_count, 2) if speed_count else 0,
+        'duration': int(round(duration)),
+        'moving_time': int(round(moving)),
+        'idle_time': int(round(idle)),
+        'points': points,
+    }
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distance between two fixes in km, the same formula as calculateDistance()"""
+    d_lat = math.radians(lat2 - lat1)
+    d_lng = math.radians(lng2 - lng1)
+    a = (math.sin(d_lat / 2) ** 2
+         + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(d_lng / 2) ** 2)
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def _haversine_arrays(lat1, lng1, lat2, lng2):
+    """Element-wise Haversine over arrays of radians"""
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2)
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def _track_metrics_loop(times, lats, lngs, speeds, idle_speed, max_gap):
+    distance = moving = idle = speed_sum = 0.0
+    max_speed = -math.inf
+    speed_count = 0
+    radians, cos, sin, sqrt, atan2 = math.radians, math.cos, math.sin, math.sqrt, math.atan2
+
+    prev_t, prev_lat, prev_lng = times[0], radians(lats[0]), radians(lngs[0])
+    prev_cos = cos(prev_lat)
+    for i in range(1, len(times)):
+        t, lat, lng, speed = times[i], radians(lats[i]), radians(lngs[i]), speeds[i]
+        lat_cos = cos(lat)
+        a = sin((lat - prev_lat) / 2) ** 2 + prev_cos * lat_cos * sin((lng - prev_lng) / 2) ** 2
+        step = 2 * EARTH_RADIUS_KM * atan2(sqrt(a), sqrt(1 - a))
+        distance += step
+
+        has_speed = speed is not None and speed == speed
+        if has_speed:
+            speed_sum += speed
+            speed_count += 1
+            if speed > max_speed:
+                max_speed = speed
+        dt = t - prev_t
+        if 0 < dt <= max_gap:
+            interval_speed = speed if has_speed else step / dt * 3600
+            if interval_speed >= idle_speed:
+                moving += dt
+            else:
+                idle += dt
+        prev_t, prev_lat, prev_lng, prev_cos = t, lat, lng, lat_cos
+
+    return _summary(distance, max_speed, speed_sum, speed_count, times[-1] - times[0],
+                    moving, idle, len(times))
+
+
+def _track_metrics_numpy(times, lats, lngs, speeds, idle_speed, max_gap):
+    t = np.asarray(times, dtype=float)
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lng = np.radians(np.asarray(lngs, dtype=float))
+    speed = np.asarray(speeds, dtype=float)[1:]
+
+    steps = _haversine_arrays(lat[:-1], lng[:-1], lat[1:], lng[1:])
+    dt = np.diff(t)
+    has_speed = ~np.isnan(speed)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        interval_speed = np.where(has_speed, speed, steps / dt * 3600)
+    counted = (dt > 0) & (dt <= max_gap)
+    is_moving = counted & (interval_speed >= idle_speed)
+    reported = speed[has_speed]
+
+    return _summary(float(steps.sum()), float(reported.max()) if reported.size else 0,
+                    float(reported.sum()), int(reported.size), float(t[-1] - t[0]),
+                    float(dt[is_moving].sum()), float(dt[counted & ~is_moving].sum()), len(t))
+
+
+def track_metrics(times, lats, lngs, speeds, idle_speed=IDLE_SPEED_KMH, max_gap=MAX_GAP_S):
+    """Metrics of one track given as parallel sequences in time order.
+
+    ``times`` are epoch seconds; a missing speed is None or NaN.
+    """
+    if len(times) < 2:
+        return empty_metrics(len(times))
+    if np is not None:
+        return _track_metrics_numpy(times, lats, lngs, speeds, idle_speed, max_gap)
+    return _track_metrics_loop(times, lats, lngs, speeds, idle_speed, max_gap)
+
+
+def _columns(records):
+    device_ids, times, lats, lngs, speeds = [], [], [], [], []
+    for record in records:
+        seconds = parse_utc(record['timestamp_server_utc'])
+        if seconds is None:
+            continue
+        device_ids.append(record['device_id'])
+        times.append(seconds)
+        lats.append(record['lat'])
+        lngs.append(record['lng'])
+        speed = record.get('speed_kmh')
+        speeds.append(math.nan if speed is None else speed)
+    return device_ids, times, lats, lngs, speeds
+
+
+def metrics_from_records(records, idle_speed=IDLE_SPEED_KMH, max_gap=MAX_GAP_S):
+    """Metrics of one device's records (the api/gps_latest.php shape), oldest first"""
+    return track_metrics(*_columns(records)[1:], idle_speed=idle_speed, max_gap=max_gap)
+
+
+def _fleet_metrics_numpy(codes, times, lats, lngs, speeds, names, idle_speed, max_gap):
+    codes = np.asarray(codes)
+    t = np.asarray(times, dtype=float)
+    order = np.lexsort((t, codes))
+    codes, t = codes[order], t[order]
+    lat = np.radians(np.asarray(lats, dtype=float)[order])
+    lng = np.radians(np.asarray(lngs, dtype=float)[order])
+    speed = np.asarray(speeds, dtype=float)[order][1:]
+    devices = len(names)
+
+    # Pair i joins fix i and i + 1; pairs that cross into the next device are masked out
+    same = codes[1:] == codes[:-1]
+    pair_device = codes[1:]
+    steps = np.where(same, _haversine_arrays(lat[:-1], lng[:-1], lat[1:], lng[1:]), 0.0)
+    dt = np.diff(t)
+    has_speed = same & ~np.isnan(speed)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        interval_speed = np.where(has_speed, speed, steps / dt * 3600)
+    counted = same & (dt > 0) & (dt <= max_gap)
+    is_moving = counted & (interval_speed >= idle_speed)
+
+    distance = np.bincount(pair_device, weights=steps, minlength=devices)
+    moving = np.bincount(pair_device, weights=np.where(is_moving, dt, 0.0), minlength=devices)
+    idle = np.bincount(pair_device, weights=np.where(counted & ~is_moving, dt, 0.0), minlength=devices)
+    speed_sum = np.bincount(pair_device[has_speed], weights=speed[has_speed], minlength=devices)
+    speed_count = np.bincount(pair_device[has_speed], minlength=devices)
+    max_speed = np.full(devices, -np.inf)
+    np.maximum.at(max_speed, pair_device[has_speed], speed[has_speed])
+
+    points = np.bincount(codes, minlength=devices)
+    last = np.cumsum(points) - 1
+    first = last - points + 1
+    results = {}
+    for code, name in enumerate(names):
+        if points[code] == 0:
+            continue
+        if points[code] < 2:
+            results[name] = empty_metrics(int(points[code]))
+            continue
+        results[name] = _summary(float(distance[code]), float(max_speed[code]), float(speed_sum[code]),
+                                 int(speed_count[code]), float(t[last[code]] - t[first[code]]),
+                                 float(moving[code]), float(idle[code]), int(points[code]))
+    return results
+
+
+def fleet_metrics(device_ids, times, lats, lngs, speeds, idle_speed=IDLE_SPEED_KMH, max_gap=MAX_GAP_S):
+    """Metrics of every device of a mixed log in one call; returns {device_id: metrics}.
+
+    The parallel sequences may be in any order; each device's fixes are
+    sorted by time first.
+    """
+    names, codes, index = [], [], {}
+    for device_id in device_ids:
+        code = index.get(device_id)
+        if code is None:
+            code = index[device_id] = len(names)
+            names.append(device_id)
+        codes.append(code)
+    return fleet_metrics_coded(codes, names, times, lats, lngs, speeds, idle_speed, max_gap)
+
+
+def fleet_metrics_coded(codes, names, times, lats, lngs, speeds, idle_speed=IDLE_SPEED_KMH, max_gap=MAX_GAP_S):
+    """fleet_metrics() for dictionary-encoded devices (``names[code]``), e.g. archive columns"""
+    if not len(codes):
+        return {}
+    if np is not None:
+        return _fleet_metrics_numpy(codes, times, lats, lngs, speeds, names, idle_speed, max_gap)
+
+    tracks = {}
+    for i, code in enumerate(codes):
+        tracks.setdefault(code, []).append(i)
+    results = {}
+    for code, rows in tracks.items():
+        rows.sort(key=times.__getitem__)
+        results[names[code]] = track_metrics([times[i] for i in rows], [lats[i] for i in rows],
+                                             [lngs[i] for i in rows], [speeds[i] for i in rows],
+                                             idle_speed, max_gap)
+    return results
+
+
+def fleet_metrics_from_records(records, idle_speed=IDLE_SPEED_KMH, max_gap=MAX_GAP_S):
+    """Per-device metrics of records from many devices"""
+    return fleet_metrics(*_columns(records), idle_speed=idle_speed, max_gap=max_gap)
+
+
+def fleet_metrics_from_archive(archive, idle_speed=IDLE_SPEED_KMH, max_gap=MAX_GAP_S):
+    """Per-device metrics straight from the columns of a gps_archive.GPSArchive"""
+    if np is not None:
+        columns = {name: archive.column(name, numpy=True)
+                   for name in ('device', 'ts_server', 'lat', 'lng', 'speed_kmh')}
+        return fleet_metrics_coded(columns['device'], archive.devices, columns['ts_server'],
+                                   columns['lat'] / 1e7, columns['lng'] / 1e7, columns['speed_kmh'],
+                                   idle_speed, max_gap)
+    return fleet_metrics_coded(archive.column('device'), archive.devices, archive.column('ts_server'),
+                               [v / 1e7 for v in archive.column('lat')],
+                               [v / 1e7 for v in archive.column('lng')],
+                               archive.column('speed_kmh'), idle_speed, max_gap)
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+"""
+GPS Tracking System - Multi-Process Serving
+Created by Eng. Nawoar Ekkou & Walace Cagnin
+
+Request handlers are bound by the GIL, so one server process uses one core.
+With GPS_PROCESSES above 1 the enhanced server starts that many processes
+that all listen on the same port (SO_REUSEPORT: the kernel spreads new
+connections over them):
+
+- the primary owns everything that writes: the movement simulator, the
+  ingest pipeline and log writer, statistics, geofence, proximity and the
+  live streams. Each change of the read state (ingested rows, simulator
+  snapshots) is pickled once and sent down an ordered pipe to every worker.
+- workers apply those messages to their own replica of the latest-fix index
+  and the fleet snapshot, in the primary's order, and answer the position
+  polls themselves. Any other request (ingest, history beyond the index,
+  exports, streams, ...) is forwarded to the primary over loopback HTTP.
+
+All processes thus see the same positions, workers at most one pipe hop
+behind the primary. Each worker holds a full copy of the index in memory.
+Workers are started with the spawn method (no fork of a threaded process)
+and restarted when they exit; a worker whose queue of unsent messages fills
+up (GPS_FEED_QUEUE) is disconnected and replaced at once, so a stalled
+worker never holds up ingest. A new worker's base state is copied while
+ingest is paused but pickled after it resumes.
+
+Environment:
+    GPS_PROCESSES     serving processes including the primary (default 1)
+    GPS_FEED_QUEUE    state messages queued per worker (default 10000)
+"""
+
+import http.client
+import multiprocessing
+import os
+import pickle
+import queue
+import select
+import signal
+import socket
+import threading
+import time
+
+DEFAULT_FEED_QUEUE = 10000
+MONITOR_INTERVAL_S = 1.0
+PROXY_TIMEOUT_S = 60
+PROXY_CHUNK_BYTES = 64 * 1024
+# Methods safe to resend when a reused upstream connection fails before the response arrives
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+# Headers that describe one hop and are not passed through the proxy
+HOP_BY_HOP = {'connection', 'keep-alive', 'proxy-connection', 'transfer-encoding', 'te', 'trailer', 'upgrade',
+              'content-length', 'server', 'date'}
+
+
+class ProxyRequired(Exception):
+    """Raised in a worker when a request needs state only the primary has"""
+
+
+def processes_from_env(processes=None):
+    if processes is None:
+        processes = int(os.environ.get('GPS_PROCESSES', 1))
+    if processes < 1:
+        raise ValueError('Process count must be at least 1')
+    if processes > 1 and not hasattr(socket, 'SO_REUSEPORT'):
+        raise ValueError('GPS_PROCESSES above 1 needs SO_REUSEPORT (Linux or BSD)')
+    return processes
+
+
+class _Subscriber:
+    """One worker's end of the feed: a bounded queue drained by a sender thread"""
+
+    def __init__(self, worker_id, conn, queue_size, on_message, on_close):
+        self.worker_id = worker_id
+        self.conn = conn
+        self.queue = queue.Queue(queue_size)
+        self.closed = False
+        self._base = None
+        self._based = threading.Event()
+        self._close_lock = threading.Lock()
+        self._on_message = on_message
+        self._on_close = on_close
+        threading.Thread(target=self._send, name=f'gps-feed-{worker_id}', daemon=True).start()
+        threading.Thread(target=self._receive, name=f'gps-feed-{worker_id}-in', daemon=True).start()
+
+    def start(self, base):
+        """Send the pickled ``base`` ahead of everything queued so far"""
+        self._base = base
+        self._based.set()
+
+    def _send(self):
+        self._based.wait()
+        if self.closed:
+            return
+        try:
+            self.conn.send_bytes(self._base)
+        except (OSError, ValueError):
+            self.close()
+            return
+        self._base = None
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+            try:
+                self.conn.send_bytes(message)
+            except (OSError, ValueError):
+                break
+        self.close()
+
+    def _receive(self):
+        """Messages from the worker (its metrics) until the pipe closes"""
+        while not self.closed:
+            try:
+                kind, payload = pickle.loads(self.conn.recv_bytes())
+            except (EOFError, OSError, ValueError):
+                break
+            if self._on_message is not None:
+                self._on_message(self.worker_id, kind, payload)
+        self.close()
+
+    def close(self):
+        with self._close_lock:
+            if self.closed:
+                return
+            self.closed = True
+        self._on_close(self)
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self._based.set()
+        # shutdown() (unlike close()) wakes the receiving thread and shows the worker end of file
+        try:
+            with socket.fromfd(self.conn.fileno(), socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, ValueError):
+            pass
+
+
+class StateFeed:
+    """Ordered fan-out of read-state changes from the primary to its workers"""
+
+    def __init__(self, queue_size=DEFAULT_FEED_QUEUE, on_message=None):
+        self.queue_size = queue_size
+        self.on_message = on_message
+        self.published = 0
+        self._subscribers = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, on_message=None):
+        return cls(int(os.environ.get('GPS_FEED_QUEUE', DEFAULT_FEED_QUEUE)), on_message)
+
+    @property
+    def workers(self):
+        return len(self._subscribers)
+
+    def add_worker(self, worker_id, conn, base, hold):
+        """Start feeding a worker: ``base()`` is its first message, every later publish() follows it.
+
+        ``base()`` runs under ``hold`` (the lock of the state writers) and must
+        return a copy later changes do not touch: it is pickled after ``hold``
+        is released, while new messages already queue up behind it.
+        """
+        subscriber = _Subscriber(worker_id, conn, self.queue_size, self.on_message, self._remove)
+        with hold:
+            first = base()
+            with self._lock:
+                self._subscribers.append(subscriber)
+        subscriber.start(pickle.dumps(first, pickle.HIGHEST_PROTOCOL))
+        return subscriber
+
+    def _remove(self, subscriber):
+        with self._lock:
+            if subscriber in self._subscribers:
+                self._subscribers.remove(subscriber)
+
+    def publish(self, kind, payload):
+        """Send ``(kind, payload)`` to every worker, pickled once; never blocks (called under the ingest lock)"""
+        if not self._subscribers:
+            return
+        message = pickle.dumps((kind, payload), pickle.HIGHEST_PROTOCOL)
+        stuck = []
+        with self._lock:
+            self.published += 1
+            for subscriber in self._subscribers:
+                try:
+                    subscriber.queue.put_nowait(message)
+                except queue.Full:
+                    stuck.append(subscriber)
+        # A worker that cannot keep up is cut off; it exits and is restarted with a fresh base
+        for subscriber in stuck:
+            print(f"⚠️  Worker {subscriber.worker_id} stopped reading its state feed, disconnecting it")
+            subscriber.close()
+
+    def close(self):
+        for subscriber in list(self._subscribers):
+            subscriber.close()
+
+
+class StateReplica:
+    """Worker side of the feed: applies the primary's messages in order on a background thread"""
+
+    def __init__(self, conn, apply):
+        self.conn = conn
+        self.apply = apply
+        self.applied = 0
+        self.ready = threading.Event()
+        self._send_lock = threading.Lock()
+
+    def start(self):
+        threading.Thread(target=self._run, name='gps-replica', daemon=True).start()
+        return self
+
+    def _run(self):
+        try:
+            while True:
+                kind, payload = pickle.loads(self.conn.recv_bytes())
+                self.apply(kind, payload)
+                self.applied += 1
+                if kind == 'base':
+                    self.ready.set()
+        except (EOFError, OSError):
+            pass
+        # The primary is gone (or cut this worker off): stop serving stale state
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def send(self, kind, payload):
+        """Message to the primary (e.g. metrics); dropped when the pipe is gone"""
+        try:
+            with self._send_lock:
+                self.conn.send_bytes(pickle.dumps((kind, payload), pickle.HIGHEST_PROTOCOL))
+        except (OSError, ValueError):
+            pass
+
+
+class WorkerPool:
+    """Spawns the worker processes, feeds them and restarts the ones that exit"""
+
+    def __init__(self, count, target, args, feed, base, hold):
+        self.count = count
+        self.target = target
+        self.args = args
+        self.feed = feed
+        self.base = base
+        self.hold = hold  # lock of the state writers, held while a base is taken
+        self.restarts = 0
+        self._context = multiprocessing.get_context('spawn')
+        self._processes = {}
+        self._running = False
+
+    def start(self):
+        self._running = True
+        for worker_id in range(1, self.count + 1):
+            self._spawn(worker_id)
+        threading.Thread(target=self._monitor, name='gps-workers', daemon=True).start()
+        return self
+
+    def _spawn(self, worker_id):
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(target=self.target, args=(worker_id, child_conn) + tuple(self.args),
+                                        name=f'gps-worker-{worker_id}', daemon=True)
+        process.start()
+        child_conn.close()
+        self.feed.add_worker(worker_id, parent_conn, self.base, self.hold)
+        self._processes[worker_id] = process
+
+    def _monitor(self):
+        while self._running:
+            time.sleep(MONITOR_INTERVAL_S)
+            for worker_id, process in list(self._processes.items()):
+                if self._running and not process.is_alive():
+                    print(f"⚠️  Worker {worker_id} exited with status {process.exitcode}, restarting it")
+                    self.restarts += 1
+                    self._spawn(worker_id)
+
+    def close(self, timeout=10):
+        self._running = False
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self._processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+        self.feed.close()
+
+    def status(self):
+        return {'workers': self.count, 'alive': sum(p.is_alive() for p in self._processes.values()),
+                'restarts': self.restarts, 'feed_messages': self.feed.published}
+
+
+_upstream = threading.local()
+
+
+def _upstream_connection(address, fresh=False):
+    """This thread's connection to the primary and whether it is a reused one"""
+    conn = getattr(_upstream, 'conn', None)
+    if conn is not None and not fresh and conn.sock is not None and select.select([conn.sock], [], [], 0)[0]:
+        # Readable while idle: the primary closed the kept-alive connection
+        fresh = True
+    if conn is None or fresh:
+        if conn is not None:
+            conn.close()
+        conn = _upstream.conn = http.client.HTTPConnection(address[0], address[1], timeout=PROXY_TIMEOUT_S)
+    return conn, conn.sock is not None
+
+
+def proxy_request(handler, address):
+    """Forward the handler's request to the primary at ``address`` and relay the response as it arrives"""
+    if 'chunked' in handler.headers.get('Transfer-Encoding', '').lower():
+        handler.close_connection = True
+        handler.send_json({"ok": False, "error": "length_required"}, status=411)
+        return
+    length = handler.content_length
+    body = handler.rfile.read(length) if length > 0 else None
+    headers = {name: value for name, value in handler.headers.items() if name.lower() not in HOP_BY_HOP}
+    headers['X-Forwarded-For'] = handler.client_address[0]
+    if body is not None:
+        headers['Content-Length'] = str(len(body))
+
+    response = None
+    for attempt in (0, 1):
+        conn, reused = _upstream_connection(address, fresh=attempt > 0)
+        try:
+            conn.request(handler.command, handler.path, body=body, headers=headers)
+        except (OSError, http.client.HTTPException):
+            # A kept-alive upstream connection may have been closed meanwhile: resend once on a new one
+            conn.close()
+            if reused:
+                continue
+            break
+        try:
+            response = conn.getresponse()
+            break
+        except (OSError, http.client.HTTPException):
+            # The primary may have processed the request: only resend what is safe to repeat (not an ingest POST)
+            conn.close()
+            if not (reused and handler.command in IDEMPOTENT_METHODS):
+                break
+    if response is None:
+        handler.send_json({"ok": False, "error": "upstream_unavailable"}, status=502)
+        return
+
+    handler.send_response(response.status, response.reason)
+    for name, value in response.getheaders():
+        if name.lower() not in HOP_BY_HOP:
+            handler.send_header(name, value)
+    try:
+        content_length = response.getheader('Content-Length')
+        if content_length is not None or response.status in (204, 304) or handler.command == 'HEAD':
+            if content_length is not None:
+                handler.send_header('Content-Length', content_length)
+            handler.end_headers()
+            while True:
+                chunk = response.read(PROXY_CHUNK_BYTES)
+                if not chunk:
+                    break
+                handler.wfile.write(chunk)
+        elif handler.request_version == 'HTTP/1.1' and handler.protocol_version == 'HTTP/1.1':
+            # Exports and event streams: relay each piece as soon as the primary sends it
+            handler.send_header('Transfer-Encoding', 'chunked')
+            handler.end_headers()
+            for chunk in iter(lambda: response.read1(PROXY_CHUNK_BYTES), b''):
+                handler.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            handler.wfile.write(b'0\r\n\r\n')
+        else:
+            handler.send_header('Connection', 'close')
+            handler.close_connection = True
+            handler.end_headers()
+            for chunk in iter(lambda: response.read1(PROXY_CHUNK_BYTES), b''):
+                handler.wfile.write(chunk)
+    except (OSError, http.client.HTTPException):
+        # Client or primary went away mid-response; neither connection can be reused
+        handler.close_connection = True
+        conn.close()
+        return
+    if response.will_close:
+        conn.close()
+
@@ -7,16 +7,20 @@ This server provides a quick way to run the GPS tracking system demo
 without needing PHP installation.
 """
 
-import http.server
-import socketserver
+import argparse
 import webbrowser
 import os
-import json
 from urllib.parse import urlparse, parse_qs
 import threading
 import time
 
-class GPSRequestHandler(http.server.SimpleHTTPRequestHandler):
+from gps_http import JSONRequestHandler, add_server_arguments, create_server, server_settings_from_env
+from gps_ingest import MAX_INGEST_BODY, CSVBatchWriter, process_ingest
+
+# Batching writer for data/gps_log.csv, opened in start_server()
+ingest_writer = None
+
+class GPSRequestHandler(JSONRequestHandler):
     def do_GET(self):
         parsed_path = urlparse(self.path)
         
@@ -33,18 +37,15 @@ class GPSRequestHandler(http.server.SimpleHTTPRequestHandler):
         if parsed_path.path.startswith('/api/'):
             self.handle_api_request(parsed_path)
         else:
+            self.discard_body()
             self.send_error(404)
     
     def handle_api_request(self, parsed_path):
         """Handle API requests with simulated responses"""
         
         if 'gps_ingest.php' in parsed_path.path:
-            # Simulate GPS data ingestion
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {"ok": True, "stored": True}
-            self.wfile.write(json.dumps(response).encode())
+            # Store the fix in data/gps_log.csv
+            self.handle_gps_ingest()
             
         elif 'gps_latest.php' in parsed_path.path:
             # Simulate GPS data retrieval
@@ -56,6 +57,18 @@ class GPSRequestHandler(http.server.SimpleHTTPRequestHandler):
         else:
             self.send_error(404)
     
+    def handle_gps_ingest(self):
+        """Validate a single fix and queue it for the batched CSV writer"""
+        raw = self.read_body(MAX_INGEST_BODY)
+        if raw is None:
+            self.send_json({"ok": False, "error": "payload_too_large"}, status=413)
+            return
+        
+        status, response = process_ingest(raw, self.headers.get('X-API-Key', ''),
+                                          self.client_address[0], ingest_writer)
+        self.send_json(response, status=status,
+                       headers={'Cache-Control': 'no-cache, no-store, must-revalidate'})
+    
     def send_gps_data(self, parsed_path):
         """Send simulated GPS data for devices"""
         query_params = parse_qs(parsed_path.query)
@@ -92,11 +105,7 @@ class GPSRequestHandler(http.server.SimpleHTTPRequestHandler):
         else:
             response = {"ok": False, "error": "device_not_found"}
         
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(response).encode())
+        self.send_json(response)
     
     def send_dashboard_data(self, parsed_path):
         """Send dashboard API data"""
@@ -156,15 +165,13 @@ class GPSRequestHandler(http.server.SimpleHTTPRequestHandler):
         else:
             response = {"ok": False, "error": "invalid_action"}
         
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        self.wfile.write(json.dumps(response).encode())
+        self.send_json(response)
 
-def start_server():
+def start_server(port=None, mode=None, workers=None):
     """Start the GPS tracking system server"""
-    PORT = 8000
+    global ingest_writer
+    PORT = port if port is not None else int(os.environ.get('PORT', 8000))
+    mode, workers = server_settings_from_env(mode, workers)
     
     print("🚜 GPS Tracking System - Development Server")
     print("=" * 50)
@@ -172,9 +179,12 @@ def start_server():
     print("")
     print(f"🚀 Starting server on port {PORT}...")
     
+    ingest_writer = CSVBatchWriter.from_env().start()
+    
     try:
-        with socketserver.TCPServer(("", PORT), GPSRequestHandler) as httpd:
+        with create_server(("", PORT), GPSRequestHandler, mode, workers) as httpd:
             print(f"✅ Server running at: http://localhost:{PORT}")
+            print(f"🧵 Serving mode: {mode}")
             print("")
             print("🔗 Available URLs:")
             print(f"   🚜 Forklift Demo: http://localhost:{PORT}/test/forklift_demo.html")
@@ -203,8 +213,12 @@ def start_server():
             print("Try using a different port or stop the existing server")
         else:
             print(f"❌ Error starting server: {e}")
+    finally:
+        ingest_writer.close()
 
 if __name__ == "__main__":
     # Change to the GPS system directory
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    start_server()
\ No newline at end of file
+    parser = add_server_arguments(argparse.ArgumentParser(description="GPS Tracking System development server"))
+    args = parser.parse_args()
+    start_server(port=args.port, mode=args.mode, workers=args.workers)
\ No newline at end of file
@@ -6,18 +6,40 @@ Created by Eng. Nawoar Ekkou & Walace Cagnin
 This server provides animated forklift movement with trails and realistic GPS simulation.
 """
 
-import http.server
-import socketserver
+import argparse
 import webbrowser
 import os
-import json
 from urllib.parse import urlparse, parse_qs
 import threading
 import time
 import math
 import random
+import signal
 from datetime import datetime, timezone
 
+from gps_cache import ResponseCache
+from gps_export import (FORMATS as EXPORT_FORMATS, export_chunks, export_filename, filtered_records, gzip_chunks,
+                        write_chunked)
+from gps_filter import FixFilter
+from gps_fleet_sim import FleetSimulator, settings_from_env as fleet_settings_from_env
+from gps_geofence import EVENT_TYPES, GeofenceTracker
+from gps_heatmap import TrafficHeatmap, parse_bbox
+from gps_history import DEFAULT_MAX_POINTS, DEFAULT_WINDOW_S, MAX_POINTS_LIMIT, MIN_POINTS, downsample_track
+from gps_http import (JSONRequestHandler, SingleHTTPServer, add_server_arguments, create_server,
+                      server_settings_from_env)
+from gps_index import LatestFixIndex, parse_cursor
+from gps_log import normalize_time, parse_utc, record_from_values, utc_now_iso
+from gps_partitions import PartitionedLogStore
+from gps_proximity import ProximityDetector
+from gps_state import FleetStateStore, ForkliftState
+from gps_stats import FleetStats
+from gps_stream import WRITE_TIMEOUT_S, FixBroadcaster, stream_to
+from gps_telemetry import CONTENT_TYPE as METRICS_CONTENT_TYPE, AccessLog, MetricsRegistry, SamplingProfiler
+from gps_trips import fleet_metrics_from_records, metrics_from_records
+from gps_workers import ProxyRequired, StateFeed, StateReplica, WorkerPool, processes_from_env, proxy_request
+from gps_ingest import (API_KEY, MAX_INGEST_BODY, CSVBatchWriter, IngestPipeline, iter_batch_records,
+                        process_ingest, process_ingest_batch)
+
 # Enhanced Forklift configurations with movement patterns and colors
 FORKLIFT_CONFIG = {
     'FORKLIFT_001': {
@@ -74,28 +96,74 @@ FORKLIFT_CONFIG = {
     }
 }
 
-# Global state for forklift positions and trails
-forklift_states = {}
-forklift_trails = {}
+# Forklift positions and trails: written by movement_simulator(), read by
+# request handlers through fleet_state.snapshot without locking
+fleet_state = FleetStateStore()
 movement_thread = None
+load_thread = None
 running = True
 
+# Batching writer for data/gps_log.csv, the pipeline feeding it and the
+# in-memory views of the log, all opened by setup_ingest()
+ingest_writer = None
+ingest_pipeline = None
+fix_index = None
+fleet_stats = None
+ingest_filter = None
+
+# Fan-out of new fixes to /api/gps_stream.php clients, opened by setup_stream()
+stream_broadcaster = None
+# Serialized position responses reused until their ETag changes, see send_cached()
+response_cache = None
+# Zone membership and enter/exit/dwell events of all devices, opened by setup_geofence()
+geofence = None
+# Per-tile traffic rollups behind /api/heatmap.php, opened by setup_heatmap()
+heatmap = None
+# Close-pair detection over the latest positions and its /api/proximity_stream.php
+# fan-out, opened by setup_proximity() and scanned by proximity_monitor()
+proximity = None
+alert_broadcaster = None
+proximity_thread = None
+# Request/loop metrics served at /metrics, the buffered access log and the
+# opt-in /api/profile.php stack sampler, opened by setup_telemetry()
+server_metrics = None
+access_log = None
+profiler = None
+
+# With GPS_PROCESSES > 1: in the primary, the feed of state changes to the worker
+# processes and their pool (see setup_workers()); in a worker, the primary's
+# loopback address for forwarded requests and the replica applying its feed
+state_feed = None
+worker_pool = None
+upstream = None
+replica = None
+WORKER_METRICS_INTERVAL_S = 5.0
+
+# Endpoints under /api/ reported by name in the request metrics
+API_ROUTES = ('gps_ingest.php', 'gps_ingest_batch.php', 'gps_latest.php', 'dashboard_api.php',
+              'forklift_trails.php', 'history.php', 'export.php', 'gps_stream.php', 'proximity_stream.php',
+              'proximity.php', 'geofence.php', 'heatmap.php', 'profile.php')
+# Read-only position endpoints a worker answers from its replica (GET only)
+# Devices seen within ONLINE_WINDOW_S are online; cached responses flip them at most ONLINE_ETAG_BUCKET_S late
+ONLINE_WINDOW_S = 300
+ONLINE_ETAG_BUCKET_S = 60
+WORKER_ROUTES = ('gps_latest.php', 'forklift_trails.php')
+WORKER_DASHBOARD_ACTIONS = ('get_devices', 'devices', 'batch', 'device', 'metrics')
+
 def initialize_forklifts():
     """Initialize forklift positions and trails"""
-    global forklift_states, forklift_trails
-    
     for device_id, config in FORKLIFT_CONFIG.items():
-        forklift_states[device_id] = {
-            'current_lat': config['destinations'][0]['lat'],
-            'current_lng': config['destinations'][0]['lng'],
-            'target_destination': 0,
-            'progress': 0.0,
-            'last_update': time.time(),
-            'speed_kmh': random.uniform(5, 15),
-            'heading': random.uniform(0, 360),
-            'status': 'moving'
-        }
-        forklift_trails[device_id] = []
+        fleet_state.add(device_id, ForkliftState(
+            current_lat=config['destinations'][0]['lat'],
+            current_lng=config['destinations'][0]['lng'],
+            target_destination=0,
+            progress=0.0,
+            last_update=time.time(),
+            speed_kmh=random.uniform(5, 15),
+            heading=random.uniform(0, 360),
+            status='moving'
+        ))
+    fleet_state.publish(advance=False)
 
 def update_forklift_position(device_id):
     """Update forklift position based on movement pattern"""
@@ -103,88 +171,583 @@ def update_forklift_position(device_id):
         return
     
     config = FORKLIFT_CONFIG[device_id]
-    state = forklift_states[device_id]
+    state = fleet_state.states[device_id]
     
     # Get current and target destinations
     destinations = config['destinations']
-    current_dest = destinations[state['target_destination']]
+    current_dest = destinations[state.target_destination]
     
     # Calculate movement towards destination
-    lat_diff = current_dest['lat'] - state['current_lat']
-    lng_diff = current_dest['lng'] - state['current_lng']
+    lat_diff = current_dest['lat'] - state.current_lat
+    lng_diff = current_dest['lng'] - state.current_lng
     distance = math.sqrt(lat_diff**2 + lng_diff**2)
     
     # If close to destination, pick next destination
     if distance < 0.0001:  # About 10 meters
-        state['target_destination'] = (state['target_destination'] + 1) % len(destinations)
-        current_dest = destinations[state['target_destination']]
-        lat_diff = current_dest['lat'] - state['current_lat']
-        lng_diff = current_dest['lng'] - state['current_lng']
+        state.target_destination = (state.target_destination + 1) % len(destinations)
+        current_dest = destinations[state.target_destination]
+        lat_diff = current_dest['lat'] - state.current_lat
+        lng_diff = current_dest['lng'] - state.current_lng
         distance = math.sqrt(lat_diff**2 + lng_diff**2)
-        
-        # Pause briefly at destination
-        time.sleep(0.5)
     
     # Move towards destination
     if distance > 0:
         move_speed = config['speed'] * 0.00008  # Adjust movement speed
         move_ratio = min(move_speed / distance, 1.0)
         
-        new_lat = state['current_lat'] + (lat_diff * move_ratio)
-        new_lng = state['current_lng'] + (lng_diff * move_ratio)
+        new_lat = state.current_lat + (lat_diff * move_ratio)
+        new_lng = state.current_lng + (lng_diff * move_ratio)
         
         # Add some realistic movement variation
         variation = 0.00002
         new_lat += random.uniform(-variation, variation)
         new_lng += random.uniform(-variation, variation)
         
-        state['current_lat'] = new_lat
-        state['current_lng'] = new_lng
+        state.current_lat = new_lat
+        state.current_lng = new_lng
         
         # Calculate heading
         if lat_diff != 0 or lng_diff != 0:
-            state['heading'] = (math.degrees(math.atan2(lng_diff, lat_diff)) + 90) % 360
+            state.heading = (math.degrees(math.atan2(lng_diff, lat_diff)) + 90) % 360
         
         # Update speed based on movement
         base_speed = 8 + (config['speed'] * 5)
-        state['speed_kmh'] = base_speed + random.uniform(-3, 3)
-        state['status'] = 'moving'
+        state.speed_kmh = base_speed + random.uniform(-3, 3)
+        state.status = 'moving'
     else:
-        state['status'] = 'idle'
-        state['speed_kmh'] = 0
-    
-    # Add to trail (keep last 25 points)
-    current_time = datetime.now(timezone.utc)
-    trail_point = {
-        'lat': state['current_lat'],
-        'lng': state['current_lng'],
-        'timestamp': current_time.isoformat(),
-        'speed': state['speed_kmh'],
-        'heading': state['heading']
-    }
+        state.status = 'idle'
+        state.speed_kmh = 0
     
-    if device_id not in forklift_trails:
-        forklift_trails[device_id] = []
+    # Add to trail (the ring keeps the last 25 points)
+    fleet_state.record(device_id, datetime.now(timezone.utc).isoformat())
+
+def setup_ingest(csv_path=None):
+    """Open the GPS log writer and rebuild the in-memory views of the log"""
+    global ingest_writer, ingest_pipeline, fix_index, fleet_stats, ingest_filter
+    if ingest_pipeline is None:
+        ingest_writer = CSVBatchWriter.from_env(csv_path).start()
+        
+        log_store = ingest_writer.sink
+        if isinstance(log_store, PartitionedLogStore):
+            print(f"🗂️  Partitioned GPS log: {len(log_store.segments)} {log_store.granularity} segments in {log_store.path}")
+        journal = ingest_writer.journal
+        if journal is not None:
+            torn = f", {journal.torn_bytes} torn bytes cut" if journal.torn_bytes else ""
+            print(f"📓 Ingest journal: {journal.path} ({journal.recovered} fixes recovered{torn})")
+        
+        fix_index = LatestFixIndex.from_env()
+        rows = log_store.iter_rows()
+        if heatmap is not None:
+            # Same pass over the log
+            rows = heatmap.observe(rows)
+        loaded = fix_index.load_rows(rows)
+        print(f"📇 Indexed {loaded} logged fixes for {len(fix_index.device_ids())} devices")
+        
+        if isinstance(log_store, PartitionedLogStore):
+            fleet_stats = FleetStats.from_store(log_store)
+            print(f"📊 Fleet statistics: {fleet_stats.total_points} fixes (from the segment manifest)")
+        else:
+            fleet_stats = FleetStats.from_env(ingest_writer.path)
+            scanned = fleet_stats.bootstrap()
+            print(f"📊 Fleet statistics: {fleet_stats.total_points} fixes ({scanned} scanned since last checkpoint)")
+        
+        ingest_writer.add_flush_listener(fleet_stats.add_flushed)
+        ingest_pipeline = IngestPipeline(ingest_writer)
+        ingest_filter = FixFilter.from_env()
+        if ingest_filter is not None:
+            ingest_pipeline.add_filter(ingest_filter)
+            print(f"🧹 Ingest filter: hdop <= {ingest_filter.max_hdop:g}, sats >= {ingest_filter.min_sats}, "
+                  f"stationary {ingest_filter.stationary_m:g} m, smoothing {'on' if ingest_filter.smooth else 'off'}")
+        ingest_pipeline.add_listener(fix_index.add_rows)
+        ingest_pipeline.add_listener(publish_rows)
+        if geofence is not None:
+            ingest_pipeline.add_listener(geofence.add_rows)
+        if proximity is not None:
+            ingest_pipeline.add_listener(proximity.add_rows)
+        if heatmap is not None:
+            ingest_pipeline.add_listener(heatmap.add_rows)
+        if server_metrics is not None:
+            ingest_pipeline.add_listener(server_metrics.add_rows)
+    return ingest_pipeline
+
+def shutdown_ingest():
+    """Flush buffered fixes to disk, checkpoint statistics and close the writer"""
+    global ingest_writer, ingest_pipeline
+    if ingest_writer is not None:
+        ingest_writer.close()
+        fleet_stats.checkpoint()
+        ingest_writer = None
+        ingest_pipeline = None
+
+def setup_stream(mode=None, workers=None):
+    """Open the live position broadcaster for the given serving mode"""
+    global stream_broadcaster
+    if stream_broadcaster is None:
+        stream_broadcaster = FixBroadcaster.from_env(mode, workers)
+    return stream_broadcaster
+
+def setup_geofence():
+    """Load the zones and start tracking zone events"""
+    global geofence
+    if geofence is None:
+        geofence = GeofenceTracker.from_env(FORKLIFT_CONFIG)
+    return geofence
+
+def setup_heatmap():
+    """Open the traffic heatmap (filled by setup_ingest())"""
+    global heatmap
+    if heatmap is None:
+        heatmap = TrafficHeatmap.from_env()
+    return heatmap
+
+def setup_proximity():
+    """Open the proximity detector and its alert stream (a quarter of the stream client cap)"""
+    global proximity, alert_broadcaster
+    if proximity is None:
+        proximity = ProximityDetector.from_env()
+        max_clients = max(1, stream_broadcaster.max_clients // 4) if stream_broadcaster else 1
+        alert_broadcaster = FixBroadcaster(max_clients, stream_broadcaster.queue_size if stream_broadcaster else 256)
+    return proximity
+
+def setup_telemetry():
+    """Open the metrics registry, access log and profiler and attach them to the request handler"""
+    global server_metrics, access_log, profiler
+    if access_log is None:
+        server_metrics = MetricsRegistry.from_env()
+        access_log = AccessLog.from_env().start()
+        profiler = SamplingProfiler.from_env()
+        GPSRequestHandler.metrics = server_metrics
+        GPSRequestHandler.access_log = access_log
+        if server_metrics is not None:
+            register_collectors(server_metrics)
+    return server_metrics
+
+def register_collectors(registry):
+    """Queue depths and component counters, read when /metrics is scraped"""
+    def streams(read):
+        return [({'stream': name}, read(broadcaster)) for name, broadcaster in
+                (('fixes', stream_broadcaster), ('alerts', alert_broadcaster)) if broadcaster is not None]
     
-    forklift_trails[device_id].append(trail_point)
-    if len(forklift_trails[device_id]) > 25:
-        forklift_trails[device_id].pop(0)
+    registry.add_collector('gps_ingest_pending_fixes', 'gauge', 'Fixes queued for the next log write',
+                           lambda: ingest_writer.pending if ingest_writer is not None else None)
+    registry.add_collector('gps_ingest_journal_bytes', 'gauge', 'Size of the write-ahead ingest journal',
+                           lambda: ingest_writer.journal.size
+                           if ingest_writer is not None and ingest_writer.journal is not None else None)
+    registry.add_collector('gps_ingest_listener_errors_total', 'counter',
+                           'Exceptions raised by ingest and log flush listeners, by stage',
+                           lambda: [({'stage': 'ingest'}, ingest_pipeline.listener_errors),
+                                    ({'stage': 'flush'}, ingest_writer.listener_errors)]
+                           if ingest_pipeline is not None else None)
+    registry.add_collector('gps_ingest_filter_fixes_total', 'counter', 'Fixes seen by the ingest filter, by outcome',
+                           lambda: [({'outcome': name}, value) for name, value in ingest_filter.counters.items()
+                                    if name != 'received'] if ingest_filter is not None else None)
+    registry.add_collector('gps_stream_clients', 'gauge', 'Connected Server-Sent Events clients',
+                           lambda: streams(lambda broadcaster: broadcaster.clients))
+    registry.add_collector('gps_stream_dropped_total', 'counter', 'Events dropped for slow stream clients',
+                           lambda: streams(lambda broadcaster: broadcaster.status()['dropped']))
+    registry.add_collector('gps_response_cache_requests_total', 'counter', 'Response cache lookups, by result',
+                           lambda: [({'result': 'hit'}, response_cache.hits), ({'result': 'miss'}, response_cache.misses)]
+                           if response_cache is not None else None)
+    registry.add_collector('gps_geofence_events_total', 'counter', 'Zone enter/exit/dwell events raised',
+                           lambda: geofence.seq if geofence is not None else None)
+    registry.add_collector('gps_proximity_alerts_total', 'counter', 'Proximity alerts raised',
+                           lambda: proximity.seq if proximity is not None else None)
+    registry.add_collector('gps_access_log_dropped_total', 'counter', 'Access log lines dropped on a full buffer',
+                           lambda: access_log.dropped if access_log is not None else None)
+
+def setup_workers(processes, port, mode, workers):
+    """Listen for forwarded requests on loopback and start ``processes - 1`` worker processes"""
+    global state_feed, worker_pool
+    internal = create_server(('127.0.0.1', 0), ForwardedRequestHandler, 'pool' if mode == 'single' else mode, workers)
+    internal.trust_forwarded_for = True
+    threading.Thread(target=internal.serve_forever, daemon=True).start()
+    
+    state_feed = StateFeed.from_env(on_message=worker_message)
+    ingest_pipeline.add_listener(publish_to_workers)
+    worker_pool = WorkerPool(processes - 1, serve_worker, (port, mode, workers, internal.server_address),
+                             state_feed, replica_base, ingest_pipeline.paused()).start()
+    return internal
+
+def replica_base():
+    """First feed message of a new worker: a copy of the whole read state (taken with ingest paused)"""
+    return 'base', (fix_index.copy(), fleet_state.snapshot)
+
+def publish_to_workers(rows):
+    """Ingest pipeline listener: send accepted fixes to the worker replicas, in log order"""
+    state_feed.publish('rows', rows)
+
+def worker_message(worker_id, kind, payload):
+    if kind == 'metrics' and server_metrics is not None:
+        server_metrics.add_remote(worker_id, payload)
+
+def apply_replica(kind, payload):
+    """Worker side: apply one message of the primary's state feed"""
+    global fix_index
+    if kind == 'rows':
+        fix_index.add_rows(payload)
+    elif kind == 'fleet':
+        fleet_state.snapshot = payload
+    elif kind == 'base':
+        fix_index, fleet_state.snapshot = payload
+
+def report_worker_metrics():
+    """Worker background thread: send the request metrics to the primary's /metrics"""
+    while True:
+        time.sleep(WORKER_METRICS_INTERVAL_S)
+        replica.send('metrics', server_metrics.state())
+
+def serve_worker(worker_id, conn, port, mode, workers, primary_address):
+    """Worker process: answer position polls from a replica of the primary's state, forward the rest"""
+    global upstream, replica, response_cache
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+    upstream = primary_address
+    response_cache = ResponseCache.from_env()
+    setup_telemetry()
+    replica = StateReplica(conn, apply_replica).start()
+    replica.ready.wait()
+    if server_metrics is not None:
+        threading.Thread(target=report_worker_metrics, daemon=True).start()
+    try:
+        with create_server(("", port), GPSRequestHandler, mode, workers, reuse_port=True) as httpd:
+            httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if access_log is not None:
+            access_log.close()
+
+def history_store():
+    """The GPS log, for reads beyond the in-memory index (a worker hands those to the primary)"""
+    if upstream is not None:
+        raise ProxyRequired()
+    return ingest_writer.sink
+
+def observe_tick(loop, started):
+    if server_metrics is not None:
+        server_metrics.observe_tick(loop, time.perf_counter() - started)
+
+def proximity_monitor():
+    """Background thread scanning the latest positions for close pairs"""
+    while running:
+        started = time.perf_counter()
+        try:
+            alerts = proximity.scan()
+            if alerts and alert_broadcaster.clients:
+                alert_broadcaster.publish(alerts)
+        except Exception as e:
+            # Keep scanning: one bad scan must not end proximity alerts for good
+            print(f"⚠️  Proximity scan failed: {e!r}")
+        observe_tick('proximity', started)
+        time.sleep(proximity.interval_s)
+
+def publish_rows(rows):
+    """Ingest pipeline listener: push accepted fixes to stream clients"""
+    if stream_broadcaster is not None and stream_broadcaster.clients:
+        stream_broadcaster.publish([record_from_values(row) for row in rows])
+
+def _handle_sigterm(signum, frame):
+    """Treat `docker stop` like Ctrl+C so buffered fixes are flushed"""
+    raise KeyboardInterrupt
 
 def movement_simulator():
     """Background thread to continuously update forklift positions"""
     global running
     while running:
+        started = time.perf_counter()
         for device_id in FORKLIFT_CONFIG.keys():
             update_forklift_position(device_id)
+        snapshot = fleet_state.publish()
+        if geofence is not None:
+            now = utc_now_iso()
+            for device_id, state in snapshot.states.items():
+                geofence.observe(device_id, state.current_lat, state.current_lng, now)
+        if proximity is not None:
+            for device_id, state in snapshot.states.items():
+                proximity.update(device_id, state.current_lat, state.current_lng)
+        if stream_broadcaster is not None and stream_broadcaster.clients:
+            now = datetime.now(timezone.utc).isoformat()
+            stream_broadcaster.publish([simulated_fix(device_id, now, snapshot) for device_id in FORKLIFT_CONFIG])
+        if state_feed is not None:
+            state_feed.publish('fleet', snapshot)
+        observe_tick('movement', started)
         time.sleep(2)  # Update every 2 seconds
 
-class GPSRequestHandler(http.server.SimpleHTTPRequestHandler):
+def simulated_fix(device_id, now=None, snapshot=None):
+    """Position of a simulated forklift in the gps_latest.php record shape"""
+    now = now or datetime.now(timezone.utc).isoformat()
+    state = (snapshot or fleet_state.snapshot).states[device_id]
+    config = FORKLIFT_CONFIG[device_id]
+    
+    # Get current destination info
+    dest = config['destinations'][state.target_destination]
+    
+    return {
+        "timestamp_server_utc": now,
+        "device_id": device_id,
+        "timestamp_utc": now,
+        "lat": round(state.current_lat, 6),
+        "lng": round(state.current_lng, 6),
+        "speed_kmh": round(state.speed_kmh, 1),
+        "alt_m": round(102 + random.uniform(-2, 2), 1),
+        "sats": random.randint(6, 12),
+        "hdop": round(random.uniform(0.8, 2.0), 1),
+        "ip": f"192.168.1.{101 + int(device_id[-1]) - 1}",
+        "heading": round(state.heading, 1),
+        "status": state.status,
+        "destination": dest['name'],
+        "zone": config['zone']
+    }
+
+def fleet_load_generator(fleet, interval):
+    """Background thread feeding a simulated load fleet through the real ingest pipeline"""
+    while running:
+        started = time.monotonic()
+        tick_started = time.perf_counter()
+        fleet.step(interval)
+        if ingest_pipeline is not None:
+            ingest_pipeline.append(fleet.rows())
+        observe_tick('load', tick_started)
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+def logged_fixes(device_id, limit):
+    """Last ``limit`` logged fixes of a device, oldest first.
+
+    Served from the in-memory index when it holds enough history, otherwise
+    read backwards from the end of the log (flushed fixes only).
+    """
+    if fix_index is None:
+        return []
+    if limit <= fix_index.depth or fix_index.device_counts.get(device_id, 0) <= fix_index.depth:
+        return fix_index.latest(device_id, limit)
+    return history_store().tail(device_id, limit)
+
+def batch_fixes(device_ids, limit, since=None, snapshot=None):
+    """Last ``limit`` fixes of each device, oldest first, as one batch.
+
+    Simulated forklifts report their current position; logged devices are
+    read from the index in one pass, and those needing more history than it
+    holds from a single backwards pass over the log. With a ``since``
+    sequence number only fixes indexed after it are returned.
+    """
+    snapshot = snapshot or fleet_state.snapshot
+    now = datetime.now(timezone.utc).isoformat()
+    result = {device_id: [simulated_fix(device_id, now, snapshot)] for device_id in device_ids if device_id in snapshot}
+    logged = [device_id for device_id in device_ids if device_id not in result]
+    if fix_index is None:
+        result.update((device_id, []) for device_id in logged)
+    elif since is not None:
+        result.update((device_id, fix_index.since(device_id, since, limit)) for device_id in logged)
+    elif logged:
+        deep = [device_id for device_id in logged
+                if limit > fix_index.depth and fix_index.device_counts.get(device_id, 0) > fix_index.depth]
+        result.update(fix_index.latest_many([d for d in logged if d not in deep], limit))
+        if deep:
+            result.update(history_store().tail_many(deep, limit))
+    return {device_id: result[device_id] for device_id in device_ids}
+
+def history_fixes(device_id, start, end):
+    """Logged fixes of a device between two server times, oldest first.
+
+    Served from the in-memory index while it still reaches back to ``start``,
+    otherwise read from the log, which only touches the end of gps_log.csv
+    (or the overlapping segments in partitioned storage).
+    """
+    if fix_index is None:
+        return []
+    records = fix_index.between(device_id, start, end)
+    if records is None:
+        records = list(history_store().query(device_id, start, end))
+    return records
+
+def fleet_history(start, end):
+    """Logged fixes of all devices between two server times"""
+    if fix_index is None:
+        return []
+    records = []
+    for device_id in fix_index.device_ids():
+        window = fix_index.between(device_id, start, end)
+        if window is None:
+            # Some ring no longer reaches back far enough: read the log once
+            return list(history_store().query(None, start, end))
+        records.extend(window)
+    return records
+
+def server_epoch():
+    """Identifies this server run in cursors and ETags"""
+    return fix_index.epoch if fix_index is not None else '0'
+
+def state_etag(*versions):
+    """ETag for a response that only changes when the given counters do"""
+    return '"' + '-'.join([server_epoch()] + [str(version) for version in versions]) + '"'
+
+def revalidate_headers(etag):
+    """Let clients cache a position response but revalidate it on every poll"""
+    return {'ETag': etag, 'Cache-Control': 'no-cache', 'Access-Control-Expose-Headers': 'ETag'}
+
+def since_seq(query_params):
+    """Sequence number of the since= cursor, or None when a full response is needed"""
+    if fix_index is None:
+        return None
+    return fix_index.parse_cursor(query_params.get('since', [''])[0])
+
+def latest_payload(device_id, limit, since=None, snapshot=None):
+    """gps_latest.php response: a simulated forklift, a logged device or all simulated forklifts"""
+    snapshot = snapshot or fleet_state.snapshot
+    if device_id in snapshot:
+        return {
+            "ok": True,
+            "count": 1,
+            "data": [simulated_fix(device_id, snapshot=snapshot)]
+        }
+    if device_id:
+        # Logged device: answer from the in-memory index in O(limit)
+        data = logged_fixes(device_id, limit) if since is None else fix_index.since(device_id, since, limit)
+        return {
+            "ok": True,
+            "count": len(data),
+            "data": data,
+            "cursor": fix_index.cursor(device_id) if fix_index else None
+        }
+    # Return all devices
+    now = datetime.now(timezone.utc).isoformat()
+    all_data = [simulated_fix(dev_id, now, snapshot) for dev_id in snapshot.states]
+    return {
+        "ok": True,
+        "count": len(all_data),
+        "data": all_data
+    }
+
+def simulated_devices_payload(snapshot=None):
+    """dashboard_api.php?action=get_devices response for the simulated forklifts"""
+    snapshot = snapshot or fleet_state.snapshot
+    now = datetime.now(timezone.utc).isoformat()
+    devices = []
+    for device_id, state in snapshot.states.items():
+        config = FORKLIFT_CONFIG[device_id]
+        dest = config['destinations'][state.target_destination]
+        
+        devices.append({
+            "device_id": device_id,
+            "name": config['name'],
+            "zone": config['zone'],
+            "color": config['color'],
+            "status": state.status,
+            "last_seen": now,
+            "lastLocation": {
+                "lat": round(state.current_lat, 6),
+                "lng": round(state.current_lng, 6),
+                "speed_kmh": round(state.speed_kmh, 1),
+                "heading": round(state.heading, 1)
+            },
+            "destination": dest['name'],
+            "trail": snapshot.trail_dicts(device_id)
+        })
+    
+    return {
+        "ok": True,
+        "devices": devices
+    }
+
+def logged_devices_payload(since=None):
+    """dashboard_api.php?action=devices response: logged devices with their last 10 fixes.
+
+    With a ``since`` sequence number only devices with newer fixes are
+    listed, each with only those fixes.
+    """
+    devices = []
+    if fix_index is None:
+        device_ids = []
+    else:
+        device_ids = fix_index.device_ids() if since is None else fix_index.changed_since(since)
+    for device_id in device_ids:
+        if since is None:
+            locations = fix_index.latest(device_id, 10)
+        else:
+            locations = fix_index.since(device_id, since, 10)
+        last_seen = locations[-1]['timestamp_server_utc']
+        devices.append({
+            "device_id": device_id,
+            "locations": locations,
+            "last_seen": last_seen,
+            "total_points": fix_index.device_counts.get(device_id, 0),
+            "is_online": is_recent(last_seen)
+        })
+    
+    return {
+        "ok": True,
+        "devices": devices,
+        "count": len(devices),
+        "cursor": fix_index.cursor() if fix_index else None
+    }
+
+def batch_payload(device_ids, limit, since=None, snapshot=None):
+    """dashboard_api.php?action=batch response"""
+    devices = batch_fixes(device_ids, limit, since, snapshot)
+    return {
+        "ok": True,
+        "limit": limit,
+        "devices": devices,
+        "count": len(devices),
+        "cursor": fix_index.cursor() if fix_index else None
+    }
+
+def trails_payload(device_id, snapshot, new_points=None):
+    """forklift_trails.php response; ``new_points`` limits each trail to its newest points"""
+    if device_id and device_id in snapshot.trails:
+        trails = snapshot.trail_dicts(device_id, new_points)
+    else:
+        # Return all trails
+        trails = {dev_id: snapshot.trail_dicts(dev_id, new_points) for dev_id in snapshot.trails}
+    
+    return {
+        "ok": True,
+        "trails": trails,
+        "config": FORKLIFT_CONFIG,
+        "cursor": f"{server_epoch()}-{snapshot.tick}"
+    }
+
+def time_window(query_params):
+    """(from, to) server times of a request, defaulting to the last 24 hours.
+
+    Raises ValueError for unparseable or reversed bounds.
+    """
+    end = normalize_time(query_params.get('to', [''])[0]) or utc_now_iso()
+    start = (normalize_time(query_params.get('from', [''])[0])
+             or utc_now_iso(parse_utc(end) - DEFAULT_WINDOW_S))
+    if start > end:
+        raise ValueError('from is after to')
+    return start, end
+
+def is_recent(timestamp, seconds=ONLINE_WINDOW_S):
+    """True when a logged server timestamp is within the online window"""
+    seen = parse_utc(timestamp)
+    return seen is not None and time.time() - seen < seconds
+
+def online_bucket():
+    """Coarse clock for ETags of responses with is_online, which changes without new fixes"""
+    return int(time.time() // ONLINE_ETAG_BUCKET_S)
+
+def query_int(query_params, name, default, minimum, maximum):
+    """Integer query parameter clamped like the PHP endpoints do"""
+    try:
+        value = int(query_params.get(name, [default])[0])
+    except ValueError:
+        value = default
+    return max(minimum, min(maximum, value))
+
+class GPSRequestHandler(JSONRequestHandler):
     def do_GET(self):
         parsed_path = urlparse(self.path)
         
         # Handle API requests
         if parsed_path.path.startswith('/api/'):
-            self.handle_api_request(parsed_path)
+            try:
+                self.handle_api_request(parsed_path)
+            except ProxyRequired:
+                # Worker process whose replica cannot answer this one (e.g. history beyond the index)
+                proxy_request(self, upstream)
+        elif parsed_path.path == '/metrics':
+            self.send_metrics()
         else:
             # Serve static files
             super().do_GET()
@@ -195,19 +758,43 @@ class GPSRequestHandler(http.server.SimpleHTTPRequestHandler):
         if parsed_path.path.startswith('/api/'):
             self.handle_api_request(parsed_path)
         else:
+            self.discard_body()
             self.send_error(404)
     
+    def route_label(self):
+        """Endpoint name for the request metrics (unknown API paths share one label)"""
+        path = urlparse(self.path).path
+        if path == '/metrics':
+            return 'metrics'
+        if path.startswith('/api/'):
+            name = path.rsplit('/', 1)[-1]
+            return name if name in API_ROUTES else 'api_other'
+        return 'static'
+    
+    def served_by_worker(self, parsed_path):
+        """True for the position polls a worker process answers from its replica"""
+        if self.command != 'GET':
+            return False
+        name = parsed_path.path.rsplit('/', 1)[-1]
+        if name == 'dashboard_api.php':
+            return parse_qs(parsed_path.query).get('action', [''])[0] in WORKER_DASHBOARD_ACTIONS
+        return name in WORKER_ROUTES
+    
     def handle_api_request(self, parsed_path):
         """Handle API requests with simulated responses"""
         
+        if upstream is not None and not self.served_by_worker(parsed_path):
+            # Worker process: the primary owns ingest, streams, zones and the log
+            proxy_request(self, upstream)
+            return
+        
         if 'gps_ingest.php' in parsed_path.path:
-            # Simulate GPS data ingestion
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            response = {"ok": True, "stored": True}
-            self.wfile.write(json.dumps(response).encode())
+            # Store the fix in data/gps_log.csv
+            self.handle_gps_ingest()
+            
+        elif 'gps_ingest_batch.php' in parsed_path.path:
+            # Store a JSON array / NDJSON stream of fixes in one write
+            self.handle_gps_ingest_batch()
             
         elif 'gps_latest.php' in parsed_path.path:
             # Simulate GPS data retrieval
@@ -220,167 +807,542 @@ class GPSRequestHandler(http.server.SimpleHTTPRequestHandler):
         elif 'forklift_trails.php' in parsed_path.path:
             # New endpoint for forklift trails
             self.send_forklift_trails(parsed_path)
+            
+        elif 'history.php' in parsed_path.path:
+            # Downsampled track of a logged device over a time window
+            self.send_history(parsed_path)
+            
+        elif 'export.php' in parsed_path.path:
+            # Chunked CSV / GeoJSON / NDJSON export of logged fixes
+            self.send_export(parsed_path)
+            
+        elif 'gps_stream.php' in parsed_path.path:
+            # Server-Sent Events stream of new fixes
+            self.send_stream(parsed_path)
+            
+        elif 'proximity_stream.php' in parsed_path.path:
+            # Server-Sent Events stream of proximity alerts
+            self.send_events(alert_broadcaster, [], 'alerts')
+            
+        elif 'proximity.php' in parsed_path.path:
+            # Close pairs of vehicles
+            self.send_proximity(parsed_path)
+            
+        elif 'geofence.php' in parsed_path.path:
+            # Zones, zone events and who is in which zone
+            self.send_geofence(parsed_path)
+        elif 'heatmap.php' in parsed_path.path:
+            # Traffic per map tile
+            self.send_heatmap(parsed_path)
+            
+        elif 'profile.php' in parsed_path.path:
+            # Start/stop the sampling profiler and fetch its folded stacks
+            self.send_profile(parsed_path)
         else:
             self.send_error(404)
     
+    def handle_gps_ingest(self):
+        """Validate a single fix and queue it for the batched CSV writer"""
+        raw = self.read_body(MAX_INGEST_BODY)
+        if raw is None:
+            self.send_json({"ok": False, "error": "payload_too_large"}, status=413)
+            return
+        
+        status, response = process_ingest(raw, self.headers.get('X-API-Key', ''),
+                                          self.client_address[0], ingest_pipeline)
+        self.send_json(response, status=status,
+                       headers={'Cache-Control': 'no-cache, no-store, must-revalidate'})
+    
+    def handle_gps_ingest_batch(self):
+        """Validate a batch of fixes and append the valid ones in one write"""
+        reader = self.body_reader()
+        if reader is None:
+            self.send_json({"ok": False, "error": "length_required"}, status=411)
+            return
+        
+        records = iter_batch_records(reader, self.headers.get('Content-Type', ''))
+        status, response = process_ingest_batch(records, self.headers.get('X-API-Key', ''),
+                                                self.client_address[0], ingest_pipeline)
+        reader.drain()
+        self.send_json(response, status=status,
+                       headers={'Cache-Control': 'no-cache, no-store, must-revalidate'})
+    
     def send_forklift_trails(self, parsed_path):
         """Send forklift trail data"""
         query_params = parse_qs(parsed_path.query)
         device_id = query_params.get('device_id', [''])[0]
+        snapshot = fleet_state.snapshot
+        tick = snapshot.tick
         
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
+        # since=<cursor>: only the points added by the simulator passes after it
+        since = parse_cursor(query_params.get('since', [''])[0], server_epoch())
+        new_points = tick - since if since is not None and since <= tick else None
         
-        if device_id and device_id in forklift_trails:
-            trails = forklift_trails[device_id]
-        else:
-            # Return all trails
-            trails = forklift_trails
+        self.send_cached(state_etag('trails', tick), lambda: trails_payload(device_id, snapshot, new_points))
+    
+    def send_cached(self, etag, build):
+        """Answer a position request from the snapshot cache (or 304) while ``etag`` is current"""
+        if self.not_modified(etag):
+            return
+        if response_cache is None:
+            self.send_json(build(), headers=revalidate_headers(etag))
+            return
+        entry = response_cache.get(self.path, etag, build)
+        self.send_body(entry.body, entry.gzipped, headers=revalidate_headers(etag))
+    
+    def send_history(self, parsed_path):
+        """history.php?device_id=X&from=...&to=...&max_points=500"""
+        query_params = parse_qs(parsed_path.query)
+        device_id = query_params.get('device_id', [''])[0]
+        if not device_id:
+            self.send_json({"ok": False, "error": "missing_device_id"}, status=400)
+            return
+        
+        try:
+            start, end = time_window(query_params)
+        except ValueError:
+            self.send_json({"ok": False, "error": "invalid_time_range"}, status=400)
+            return
         
-        response = {
+        max_points = query_int(query_params, 'max_points', DEFAULT_MAX_POINTS, MIN_POINTS, MAX_POINTS_LIMIT)
+        records = history_fixes(device_id, start, end)
+        data = downsample_track(records, max_points)
+        self.send_json({
             "ok": True,
-            "trails": trails,
-            "config": FORKLIFT_CONFIG
-        }
+            "device_id": device_id,
+            "from": start,
+            "to": end,
+            "total_points": len(records),
+            "count": len(data),
+            "downsampled": len(data) < len(records),
+            "data": data
+        })
+    
+    def send_export(self, parsed_path):
+        """export.php?format=csv|geojson|ndjson&device_id=A,B&from=...&to=... streamed straight from the log"""
+        query_params = parse_qs(parsed_path.query)
+        fmt = query_params.get('format', ['csv'])[0]
+        if fmt not in EXPORT_FORMATS:
+            self.send_json({"ok": False, "error": "invalid_format"}, status=400)
+            return
+        if ingest_writer is None:
+            self.send_json({"ok": False, "error": "export_unavailable"}, status=503)
+            return
+        
+        # Unlike history.php the range is open-ended unless from/to are given
+        try:
+            start = normalize_time(query_params.get('from', [''])[0])
+            end = normalize_time(query_params.get('to', [''])[0])
+        except ValueError:
+            self.send_json({"ok": False, "error": "invalid_time_range"}, status=400)
+            return
+        if start and end and start > end:
+            self.send_json({"ok": False, "error": "invalid_time_range"}, status=400)
+            return
+        device_ids = [d for d in query_params.get('device_id', [''])[0].split(',') if d]
         
-        self.wfile.write(json.dumps(response).encode())
+        chunks = export_chunks(filtered_records(ingest_writer.sink, device_ids, start, end), fmt)
+        gzipped = self.accepts_gzip()
+        if gzipped:
+            chunks = gzip_chunks(chunks)
+        chunked = self.request_version == 'HTTP/1.1' and self.protocol_version == 'HTTP/1.1'
+        
+        self.send_response(200)
+        self.send_header('Content-type', EXPORT_FORMATS[fmt][0])
+        self.send_header('Content-Disposition',
+                         f'attachment; filename="{export_filename(fmt, device_ids, start, end)}"')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Vary', 'Accept-Encoding')
+        if gzipped:
+            self.send_header('Content-Encoding', 'gzip')
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        else:
+            # HTTP/1.0: the end of the body is the end of the connection
+            self.close_connection = True
+            self.send_header('Connection', 'close')
+        self.end_headers()
+        try:
+            if chunked:
+                write_chunked(self.wfile, chunks)
+            else:
+                for chunk in chunks:
+                    self.wfile.write(chunk)
+        except OSError:
+            # Client went away mid-export; the connection cannot be reused
+            self.close_connection = True
     
-    def send_gps_data(self, parsed_path):
-        """Send simulated GPS data for devices"""
+    def send_stream(self, parsed_path):
+        """gps_stream.php?device_ids=A,B: push new fixes as Server-Sent Events"""
         query_params = parse_qs(parsed_path.query)
-        device_id = query_params.get('device_id', [''])[0]
-        limit = int(query_params.get('limit', [10])[0])
+        device_ids = [d for d in query_params.get('device_ids', [''])[0].split(',') if d]
+        self.send_events(stream_broadcaster, device_ids, 'fixes')
+    
+    def send_events(self, broadcaster, device_ids, event):
+        """Hold the connection open and push what ``broadcaster`` publishes as SSE ``event`` messages"""
+        # A stream holds its connection open, which would stall the single-threaded server
+        if broadcaster is None or isinstance(self.server, SingleHTTPServer):
+            self.send_json({"ok": False, "error": "stream_unavailable"}, status=503)
+            return
+        subscription = broadcaster.subscribe(device_ids)
+        if subscription is None:
+            self.send_json({"ok": False, "error": "too_many_clients"}, status=503,
+                           headers={'Retry-After': '30'})
+            return
         
+        self.close_connection = True
         self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Connection', 'close')
         self.end_headers()
+        # A client that stops reading is dropped instead of pinning a worker
+        self.connection.settimeout(WRITE_TIMEOUT_S)
+        try:
+            stream_to(self.wfile, subscription, is_running=lambda: running, event=event)
+        except OSError:
+            pass
+        finally:
+            subscription.close()
+    
+    def send_proximity(self, parsed_path):
+        """proximity.php?action=active|alerts|status"""
+        query_params = parse_qs(parsed_path.query)
+        action = query_params.get('action', ['active'])[0]
+        if proximity is None:
+            self.send_json({"ok": False, "error": "proximity_unavailable"}, status=503)
+            return
         
-        if device_id in forklift_states:
-            state = forklift_states[device_id]
-            config = FORKLIFT_CONFIG[device_id]
-            
-            # Get current destination info
-            dest = config['destinations'][state['target_destination']]
+        if action == 'active':
+            alerts = proximity.active()
+            response = {"ok": True, "alerts": alerts, "count": len(alerts)}
+        elif action == 'alerts':
+            # since=<cursor>: only alerts after it; device_id filters either side of the pair
+            since = proximity.parse_cursor(query_params.get('since', [''])[0])
+            device_id = query_params.get('device_id', [''])[0]
+            limit = query_int(query_params, 'limit', 100, 1, 1000)
             
-            response = {
-                "ok": True,
-                "count": 1,
-                "data": [{
-                    "timestamp_server_utc": datetime.now(timezone.utc).isoformat(),
-                    "device_id": device_id,
-                    "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-                    "lat": round(state['current_lat'], 6),
-                    "lng": round(state['current_lng'], 6),
-                    "speed_kmh": round(state['speed_kmh'], 1),
-                    "alt_m": round(102 + random.uniform(-2, 2), 1),
-                    "sats": random.randint(6, 12),
-                    "hdop": round(random.uniform(0.8, 2.0), 1),
-                    "ip": f"192.168.1.{101 + int(device_id[-1]) - 1}",
-                    "heading": round(state['heading'], 1),
-                    "status": state['status'],
-                    "destination": dest['name'],
-                    "zone": config['zone']
-                }]
-            }
+            def build():
+                alerts = proximity.alerts_since(since, device_id, limit)
+                return {"ok": True, "alerts": alerts, "count": len(alerts), "cursor": proximity.cursor()}
+            self.send_cached(state_etag('alerts', proximity.seq), build)
+            return
+        elif action == 'status':
+            response = {"ok": True, "proximity": proximity.status()}
         else:
-            # Return all devices
-            all_data = []
-            for dev_id, state in forklift_states.items():
-                config = FORKLIFT_CONFIG[dev_id]
-                dest = config['destinations'][state['target_destination']]
-                
-                all_data.append({
-                    "timestamp_server_utc": datetime.now(timezone.utc).isoformat(),
-                    "device_id": dev_id,
-                    "timestamp_utc": datetime.now(timezone.utc).isoformat(),
-                    "lat": round(state['current_lat'], 6),
-                    "lng": round(state['current_lng'], 6),
-                    "speed_kmh": round(state['speed_kmh'], 1),
-                    "alt_m": round(102 + random.uniform(-2, 2), 1),
-                    "sats": random.randint(6, 12),
-                    "hdop": round(random.uniform(0.8, 2.0), 1),
-                    "ip": f"192.168.1.{101 + int(dev_id[-1]) - 1}",
-                    "heading": round(state['heading'], 1),
-                    "status": state['status'],
-                    "destination": dest['name'],
-                    "zone": config['zone']
-                })
+            response = {"ok": False, "error": "Unknown action"}
+        
+        self.send_json(response)
+    
+    def send_heatmap(self, parsed_path):
+        """heatmap.php?zoom=18&from=...&to=...&bbox=south,west,north,east&limit=1000, or action=status"""
+        query_params = parse_qs(parsed_path.query)
+        if heatmap is None:
+            self.send_json({"ok": False, "error": "heatmap_unavailable"}, status=503)
+            return
+        if query_params.get('action', ['cells'])[0] == 'status':
+            self.send_json({"ok": True, "heatmap": heatmap.status()})
+            return
+        
+        zoom = query_int(query_params, 'zoom', min(18, heatmap.zoom), 0, heatmap.zoom)
+        limit = query_int(query_params, 'limit', 1000, 1, 100000)
+        try:
+            start, end = time_window(query_params)
+        except ValueError:
+            self.send_json({"ok": False, "error": "invalid_time_range"}, status=400)
+            return
+        try:
+            bbox = parse_bbox(query_params.get('bbox', [''])[0])
+        except ValueError:
+            self.send_json({"ok": False, "error": "invalid_bbox"}, status=400)
+            return
+        
+        # Rollups are hourly: report the widened range, and let the default window ("now") move the ETag per hour
+        start, end = start[:13] + ':00:00Z', end[:13] + ':59:59Z'
+        
+        def build():
+            cells, total = heatmap.cells(zoom, start, end, bbox, limit)
+            return {"ok": True, "zoom": zoom, "from": start, "to": end, "cells": cells, "count": len(cells),
+                    "total_cells": total, "speeding_kmh": heatmap.speeding_kmh}
+        self.send_cached(state_etag('heatmap', heatmap.rows, start, end), build)
+    
+    def send_geofence(self, parsed_path):
+        """geofence.php?action=zones|events|occupancy|locate"""
+        query_params = parse_qs(parsed_path.query)
+        action = query_params.get('action', ['events'])[0]
+        if geofence is None:
+            self.send_json({"ok": False, "error": "geofence_unavailable"}, status=503)
+            return
+        
+        if action == 'zones':
+            zones = [zone.to_dict() for zone in geofence.index.zones]
+            response = {"ok": True, "zones": zones, "count": len(zones)}
+        elif action == 'events':
+            # since=<cursor>: only events after it; device_id, zone and type filter
+            event_type = query_params.get('type', [''])[0]
+            if event_type and event_type not in EVENT_TYPES:
+                self.send_json({"ok": False, "error": "invalid_type"}, status=400)
+                return
+            since = geofence.parse_cursor(query_params.get('since', [''])[0])
+            device_id = query_params.get('device_id', [''])[0]
+            zone = query_params.get('zone', [''])[0]
+            limit = query_int(query_params, 'limit', 100, 1, 1000)
             
+            def build():
+                events = geofence.events_since(since, device_id, zone, event_type, limit)
+                return {"ok": True, "events": events, "count": len(events), "cursor": geofence.cursor()}
+            self.send_cached(state_etag('zones', geofence.seq), build)
+            return
+        elif action == 'occupancy':
+            occupancy = geofence.occupancy()
             response = {
                 "ok": True,
-                "count": len(all_data),
-                "data": all_data
+                "zones": occupancy,
+                "devices_inside": sum(len(devices) for devices in occupancy.values())
             }
+        elif action == 'locate':
+            try:
+                lat = float(query_params.get('lat', [''])[0])
+                lng = float(query_params.get('lng', [''])[0])
+            except ValueError:
+                lat = lng = math.nan
+            if not (math.isfinite(lat) and math.isfinite(lng)):
+                self.send_json({"ok": False, "error": "invalid_position"}, status=400)
+                return
+            zones = [zone.zone_id for zone in geofence.index.classify(lat, lng)]
+            response = {"ok": True, "lat": lat, "lng": lng, "zones": zones}
+        elif action == 'status':
+            response = {"ok": True, "geofence": geofence.status()}
+        else:
+            response = {"ok": False, "error": "Unknown action"}
+        
+        self.send_json(response)
+    
+    def send_metrics(self):
+        """Prometheus text exposition of the server metrics (the primary's, with its workers' merged in)"""
+        if upstream is not None:
+            proxy_request(self, upstream)
+            return
+        if server_metrics is None:
+            self.send_error(404)
+            return
+        self.send_body(server_metrics.render().encode(), content_type=METRICS_CONTENT_TYPE,
+                       headers={'Cache-Control': 'no-cache, no-store, must-revalidate'})
+    
+    def send_profile(self, parsed_path):
+        """profile.php?action=start|stop|reset|status|report (X-API-Key required)"""
+        if profiler is None:
+            self.send_json({"ok": False, "error": "profiler_disabled"}, status=404)
+            return
+        if self.headers.get('X-API-Key', '') != API_KEY:
+            self.send_json({"ok": False, "error": "unauthorized"}, status=401)
+            return
+        query_params = parse_qs(parsed_path.query)
+        action = query_params.get('action', ['status'])[0]
         
-        self.wfile.write(json.dumps(response).encode())
+        if action == 'report':
+            limit = query_int(query_params, 'limit', 500, 1, 100000)
+            self.send_body(profiler.folded(limit).encode(), content_type='text/plain; charset=utf-8',
+                           headers={'Cache-Control': 'no-cache, no-store, must-revalidate'})
+            return
+        if action == 'start':
+            profiler.start()
+        elif action == 'stop':
+            profiler.stop()
+        elif action == 'reset':
+            profiler.reset()
+        elif action != 'status':
+            self.send_json({"ok": False, "error": "Unknown action"}, status=400)
+            return
+        self.send_json({"ok": True, "profiler": profiler.status()},
+                       headers={'Cache-Control': 'no-cache, no-store, must-revalidate'})
+    
+    def send_gps_data(self, parsed_path):
+        """Send simulated GPS data, or logged fixes from the latest-position index"""
+        query_params = parse_qs(parsed_path.query)
+        device_id = query_params.get('device_id', [''])[0]
+        limit = query_int(query_params, 'limit', 1, 1, 1000)
+        
+        snapshot = fleet_state.snapshot
+        if device_id and device_id not in snapshot:
+            etag = state_etag(fix_index.device_seq.get(device_id, 0) if fix_index else 0)
+        else:
+            etag = state_etag('sim', snapshot.tick)
+        since = since_seq(query_params)
+        self.send_cached(etag, lambda: latest_payload(device_id, limit, since, snapshot))
     
     def send_dashboard_data(self, parsed_path):
         """Send dashboard API data"""
         query_params = parse_qs(parsed_path.query)
         action = query_params.get('action', [''])[0]
         
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-        
         if action == 'get_devices':
-            devices = []
-            for device_id, state in forklift_states.items():
-                config = FORKLIFT_CONFIG[device_id]
-                dest = config['destinations'][state['target_destination']]
-                
-                devices.append({
-                    "device_id": device_id,
-                    "name": config['name'],
-                    "zone": config['zone'],
-                    "color": config['color'],
-                    "status": state['status'],
-                    "last_seen": datetime.now(timezone.utc).isoformat(),
-                    "lastLocation": {
-                        "lat": round(state['current_lat'], 6),
-                        "lng": round(state['current_lng'], 6),
-                        "speed_kmh": round(state['speed_kmh'], 1),
-                        "heading": round(state['heading'], 1)
-                    },
-                    "destination": dest['name'],
-                    "trail": forklift_trails.get(device_id, [])
-                })
+            # Simulated forklifts with their trails
+            snapshot = fleet_state.snapshot
+            self.send_cached(state_etag('sim', snapshot.tick), lambda: simulated_devices_payload(snapshot))
+            return
+        elif action == 'devices':
+            # Logged devices with their last 10 fixes, like api/dashboard_api.php;
+            # since=<cursor>: only devices with newer fixes, and only those fixes
+            since = since_seq(query_params)
+            etag = state_etag(fix_index.seq if fix_index else 0, online_bucket())
+            self.send_cached(etag, lambda: logged_devices_payload(since))
+            return
+        elif action == 'device':
+            device_id = query_params.get('device_id', [''])[0]
+            if not device_id:
+                self.send_json({"ok": False, "error": "missing_device_id"}, status=400)
+                return
+            
+            data = logged_fixes(device_id, query_int(query_params, 'limit', 50, 1, 1000))
+            if 'from' in query_params or 'to' in query_params:
+                # Metrics over the whole track in the window, not just the returned rows
+                try:
+                    track = history_fixes(device_id, *time_window(query_params))
+                except ValueError:
+                    self.send_json({"ok": False, "error": "invalid_time_range"}, status=400)
+                    return
+            else:
+                track = data
+            response = {
+                "ok": True,
+                "device_id": device_id,
+                "count": len(data),
+                "data": data,
+                "metrics": metrics_from_records(track)
+            }
+        elif action == 'batch':
+            # Latest fixes of many devices in one round trip (device_ids=A,B or all)
+            requested = query_params.get('device_ids', ['all'])[0]
+            snapshot = fleet_state.snapshot
+            if requested in ('', 'all'):
+                device_ids = list(snapshot.states) + [d for d in (fix_index.device_ids() if fix_index else [])
+                                                      if d not in snapshot]
+            else:
+                device_ids = list(dict.fromkeys(d for d in requested.split(',') if d))
+            limit = query_int(query_params, 'limit', 10, 1, 1000)
             
+            since = since_seq(query_params)
+            simulated = any(device_id in snapshot for device_id in device_ids)
+            etag = state_etag(fix_index.seq if fix_index else 0, snapshot.tick if simulated else 0)
+            self.send_cached(etag, lambda: batch_payload(device_ids, limit, since, snapshot))
+            return
+        elif action == 'metrics':
+            # Trip metrics of every logged device in one batch computation
+            try:
+                start, end = time_window(query_params)
+            except ValueError:
+                self.send_json({"ok": False, "error": "invalid_time_range"}, status=400)
+                return
+            metrics = fleet_metrics_from_records(fleet_history(start, end))
             response = {
                 "ok": True,
-                "devices": devices
+                "from": start,
+                "to": end,
+                "devices": metrics,
+                "count": len(metrics)
             }
+        elif action == 'stats':
+            # Incrementally maintained aggregates, no log scan per request
+            if fleet_stats is None:
+                self.send_json({"ok": False, "error": "stats_unavailable"}, status=503)
+                return
+            response = {
+                "ok": True,
+                "stats": fleet_stats.snapshot()
+            }
+            if ingest_filter is not None:
+                response["ingest_filter"] = ingest_filter.status()
         else:
             response = {"ok": False, "error": "Unknown action"}
         
-        self.wfile.write(json.dumps(response).encode())
+        self.send_json(response)
+
+class ForwardedRequestHandler(GPSRequestHandler):
+    """Requests forwarded by a worker process; the worker already counted, timed and logged them"""
+    metrics = None
+    
+    def log_request(self, code='-', size='-'):
+        pass
 
-def start_server(port=None):
+def start_server(port=None, mode=None, workers=None, processes=None):
     """Start the enhanced GPS tracking server"""
-    global movement_thread, running
+    global movement_thread, load_thread, proximity_thread, running, response_cache
+    
+    mode, workers = server_settings_from_env(mode, workers)
+    processes = processes_from_env(processes)
     
     # Initialize forklifts
     initialize_forklifts()
     
+    # Open the live position stream, the response cache and the GPS log writer for real ingest
+    response_cache = ResponseCache.from_env()
+    setup_stream(mode, workers)
+    setup_geofence()
+    setup_heatmap()
+    setup_proximity()
+    setup_telemetry()
+    setup_ingest()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _handle_sigterm)
+    
     # Start movement simulation in background
     movement_thread = threading.Thread(target=movement_simulator, daemon=True)
     movement_thread.start()
+    proximity_thread = threading.Thread(target=proximity_monitor, daemon=True)
+    proximity_thread.start()
+    
+    # Optional load generation: GPS_SIM_VEHICLES simulated vehicles through the ingest path
+    load_vehicles, load_interval, load_seed = fleet_settings_from_env()
+    if load_vehicles > 0:
+        fleet = FleetSimulator(load_vehicles, seed=load_seed)
+        load_thread = threading.Thread(target=fleet_load_generator, args=(fleet, load_interval), daemon=True)
+        load_thread.start()
     
     # Use provided port or default to 8000, but prefer environment variable for Azure
     if port is None:
         port = int(os.environ.get('PORT', 8000))
     
+    internal = None
     try:
-        with socketserver.TCPServer(("", port), GPSRequestHandler) as httpd:
+        with create_server(("", port), GPSRequestHandler, mode, workers, reuse_port=processes > 1) as httpd:
+            if processes > 1:
+                internal = setup_workers(processes, port, mode, workers)
+            if server_metrics is not None and mode == 'pool':
+                server_metrics.add_collector(
+                    'gps_http_connections', 'gauge', 'Open connections being served or waiting for a worker',
+                    lambda: [({'state': 'active'}, min(httpd.connections, workers)),
+                             ({'state': 'queued'}, max(0, httpd.connections - workers))])
             print("🚜 Enhanced GPS Tracking System - Development Server")
             print("=" * 55)
             print("👨‍💻 Created by Eng. Nawoar Ekkou & Walace Cagnin")
             print()
             print(f"🚀 Starting enhanced server on port {port}...")
+            if mode == 'pool':
+                print(f"🧵 Serving mode: {mode} ({workers} workers, HTTP/1.1 keep-alive)")
+            else:
+                print(f"🧵 Serving mode: {mode}")
+            if processes > 1:
+                print(f"🧩 Processes: {processes} sharing port {port} (primary + {processes - 1} workers "
+                      f"answering position polls from replicated state)")
+            if mode == 'single':
+                print("📡 Live stream: disabled in single mode (dashboards poll instead)")
+            else:
+                print(f"📡 Live stream: /api/gps_stream.php (up to {stream_broadcaster.max_clients} clients)")
+            print(f"🗺️  Geofence: {len(geofence.index.zones)} zones, events at /api/geofence.php")
+            if heatmap is not None:
+                print(f"🔥 Heatmaps: /api/heatmap.php (tiles up to zoom {heatmap.zoom}, hourly and daily rollups)")
+            print(f"🚨 Proximity alerts: /api/proximity.php (critical within {proximity.distance_m:g} m, "
+                  f"warning within {proximity.warn_m:g} m when closing at {proximity.closing_kmh:g} km/h)")
+            if load_vehicles > 0:
+                print(f"🧪 Load simulation: {load_vehicles} vehicles every {load_interval}s through the ingest pipeline")
+            if server_metrics is not None:
+                print("📈 Metrics: /metrics (Prometheus text format)")
+            if profiler is not None:
+                print(f"🔬 Profiler: /api/profile.php?action=start|stop|report "
+                      f"(one sample every {profiler.interval_s * 1000:g} ms while running)")
             
             # Different messages for local vs Azure deployment
             if os.environ.get('WEBSITE_HOSTNAME'):
@@ -423,6 +1385,25 @@ def start_server(port=None):
             print("Try using a different port or stop the existing server")
         else:
             print(f"❌ Error starting server: {e}")
+    finally:
+        if worker_pool is not None:
+            worker_pool.close()
+        if internal is not None:
+            internal.shutdown()
+            internal.server_close()
+        if stream_broadcaster is not None:
+            stream_broadcaster.close()
+        if alert_broadcaster is not None:
+            alert_broadcaster.close()
+        if profiler is not None:
+            profiler.stop()
+        shutdown_ingest()
+        if access_log is not None:
+            access_log.close()
 
 if __name__ == "__main__":
-    start_server()
\ No newline at end of file
+    parser = add_server_arguments(argparse.ArgumentParser(description="Enhanced GPS Tracking System server"))
+    parser.add_argument('--processes', type=int, default=None,
+                        help='Serving processes sharing the port (default: $GPS_PROCESSES or 1)')
+    args = parser.parse_args()
+    start_server(port=args.port, mode=args.mode, workers=args.workers, processes=args.processes)
\ No newline at end of file
@@ -0,0 +1,55 @@
+"""Columnar archive round trips of rows the CSV log can hold but the columns cannot"""
+
+from gps_archive import GPSArchive, write_archive
+
+
+def row(timestamp_utc='2025-10-08T10:00:00Z', lat='57.7', lng='11.9', sats='8'):
+    return ['2025-10-08T10:00:01Z', 'FORKLIFT_1', timestamp_utc, lat, lng, '5.5', '', sats, '0.9', '10.0.0.1']
+
+
+def archive_rows(tmp_path, rows):
+    path = str(tmp_path / 'segment.gpsc')
+    written = write_archive(path, rows)
+    with GPSArchive(path) as archive:
+        return written, list(archive.iter_rows())
+
+
+def test_values_outside_the_column_ranges_do_not_abort_the_archive(tmp_path):
+    written, rows = archive_rows(tmp_path, [
+        row(lat='1e400'),
+        row(lat='-inf'),
+        row(lng='nan'),
+        row(lat='300'),
+        row(lng='-720.5'),
+        row(sats='1e400'),
+        row(sats='70000'),
+        row(),
+    ])
+
+    assert written == 2
+    assert [fields[7] for fields in rows] == ['32767', '8']
+    assert rows[1][3:5] == ['57.7', '11.9']
+
+
+def test_unparseable_device_times_are_kept(tmp_path):
+    written, rows = archive_rows(tmp_path, [
+        row(timestamp_utc='not a time'),
+        row(),
+        row(timestamp_utc=''),
+        row(timestamp_utc='08/10/2025 10:00'),
+    ])
+
+    assert written == 4
+    assert [fields[2] for fields in rows] == ['not a time', '2025-10-08T10:00:00Z', '', '08/10/2025 10:00']
+
+
+def test_device_times_follow_row_selection(tmp_path):
+    path = str(tmp_path / 'segment.gpsc')
+    other = row(timestamp_utc='garbled')
+    other[1] = 'FORKLIFT_2'
+    write_archive(path, [row(), other, row(timestamp_utc='also garbled')])
+
+    with GPSArchive(path) as archive:
+        assert [record['timestamp_utc'] for record in archive.records('FORKLIFT_2')] == ['garbled']
+        assert [record['timestamp_utc'] for record in archive.records(reverse=True)] == \
+            ['also garbled', 'garbled', '2025-10-08T10:00:00Z']
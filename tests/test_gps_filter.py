@@ -0,0 +1,43 @@
+"""Fix quality filter: which fixes of a device reach the log"""
+
+from gps_filter import MAX_JUMP_REJECTS, FixFilter
+
+METERS_PER_DEGREE = 111320.0
+
+
+def fix(second, north_m=0.0, speed=5.0, sats=8, hdop=0.9):
+    timestamp = f'2025-10-08T10:{second // 60:02d}:{second % 60:02d}Z'
+    return [timestamp, 'FORKLIFT_1', timestamp, 57.7 + north_m / METERS_PER_DEGREE, 11.9,
+            speed, None, sats, hdop, '10.0.0.1']
+
+
+def test_poor_quality_fixes_are_dropped():
+    fix_filter = FixFilter(stationary_m=0)
+    kept = fix_filter([fix(0, hdop=9.0), fix(1, sats=2), fix(2, sats=None, hdop=None)])
+
+    assert len(kept) == 1
+    assert fix_filter.counters['dropped_quality'] == 2
+
+
+def test_jumps_are_dropped_until_the_device_keeps_reporting_there():
+    fix_filter = FixFilter(stationary_m=0)
+    kept = fix_filter([fix(0)] + [fix(1 + i, north_m=5000.0) for i in range(MAX_JUMP_REJECTS + 1)])
+
+    assert [row[2] for row in kept] == ['2025-10-08T10:00:00Z', f'2025-10-08T10:00:0{MAX_JUMP_REJECTS + 1}Z']
+    assert fix_filter.counters['dropped_jump'] == MAX_JUMP_REJECTS
+
+
+def test_stationary_fixes_are_stored_once_per_heartbeat():
+    fix_filter = FixFilter(stationary_m=3.0, heartbeat_s=60.0)
+    kept = fix_filter([fix(second, north_m=0.5, speed=0.0) for second in range(0, 130, 10)])
+
+    assert [row[2] for row in kept] == ['2025-10-08T10:00:00Z', '2025-10-08T10:01:00Z', '2025-10-08T10:02:00Z']
+    assert fix_filter.counters['dropped_stationary'] == 10
+
+
+def test_moving_fixes_all_pass():
+    fix_filter = FixFilter()
+    rows = [fix(second, north_m=second * 1.5, speed=5.4) for second in range(10)]
+
+    assert fix_filter(rows) == rows
+    assert fix_filter.status()['stored_pct'] == 100.0
@@ -0,0 +1,49 @@
+"""Geofence zones and the enter/dwell/exit events a device's fixes produce"""
+
+from gps_geofence import GeofenceTracker, ZoneIndex, zones_from_geojson
+
+DOCK = {'type': 'FeatureCollection', 'features': [{
+    'type': 'Feature',
+    'properties': {'id': 'dock', 'name': 'Loading Dock'},
+    'geometry': {'type': 'Polygon', 'coordinates': [
+        [[11.900, 57.700], [11.902, 57.700], [11.902, 57.702], [11.900, 57.702], [11.900, 57.700]],
+        [[11.9008, 57.7008], [11.9012, 57.7008], [11.9012, 57.7012], [11.9008, 57.7012], [11.9008, 57.7008]],
+    ]},
+}]}
+
+
+def row(second, lat, lng, device_id='FORKLIFT_1'):
+    timestamp = f'2025-10-08T10:{second // 60:02d}:{second % 60:02d}Z'
+    return [timestamp, device_id, timestamp, lat, lng, 5.0, None, 8, 0.9, '10.0.0.1']
+
+
+def test_polygon_holes_are_outside_the_zone():
+    index = ZoneIndex(zones_from_geojson(DOCK))
+
+    assert [zone.zone_id for zone in index.classify(57.7005, 11.9005)] == ['dock']
+    assert index.classify(57.701, 11.901) == []
+    assert index.classify(57.703, 11.901) == []
+    assert index.classify(float('nan'), 11.901) == []
+
+
+def test_enter_dwell_and_exit_events():
+    tracker = GeofenceTracker(ZoneIndex(zones_from_geojson(DOCK)), dwell_s=60)
+    tracker.add_rows([row(0, 57.69, 11.9), row(10, 57.7005, 11.9005), row(40, 57.7006, 11.9005),
+                      row(80, 57.7007, 11.9005), row(100, 57.69, 11.9)])
+
+    events = tracker.events_since()
+    assert [event['type'] for event in events] == ['enter', 'dwell', 'exit']
+    assert events[-1]['dwell_s'] == 90.0
+    assert tracker.occupancy(0) == {'dock': []}
+
+
+def test_events_since_a_cursor_and_by_device():
+    tracker = GeofenceTracker(ZoneIndex(zones_from_geojson(DOCK)))
+    tracker.add_rows([row(0, 57.7005, 11.9005)])
+    seq = tracker.parse_cursor(tracker.cursor())
+    tracker.add_rows([row(10, 57.7005, 11.9005, 'FORKLIFT_2'), row(20, 57.69, 11.9)])
+
+    assert [(event['device_id'], event['type']) for event in tracker.events_since(seq)] == \
+        [('FORKLIFT_2', 'enter'), ('FORKLIFT_1', 'exit')]
+    assert [event['type'] for event in tracker.events_since(device_id='FORKLIFT_1')] == ['enter', 'exit']
+    assert tracker.parse_cursor(f'{tracker.epoch}-99') is None
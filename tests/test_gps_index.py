@@ -0,0 +1,54 @@
+"""Latest-fix index cursors: what a poller gets back after, across and without a cursor"""
+
+from gps_index import LatestFixIndex
+
+
+def fix(device_id, minute):
+    return [f'2025-10-08T10:{minute:02d}:00Z', device_id, f'2025-10-08T10:{minute:02d}:00Z',
+            57.7, 11.9, 5.0, None, 8, 0.9, '10.0.0.1']
+
+
+def test_since_a_cursor_returns_only_newer_fixes():
+    index = LatestFixIndex(depth=10)
+    index.add_rows([fix('FORKLIFT_1', 0), fix('FORKLIFT_2', 0)])
+    seq = index.parse_cursor(index.cursor())
+    index.add_rows([fix('FORKLIFT_1', 1), fix('FORKLIFT_1', 2)])
+
+    assert [record['timestamp_utc'] for record in index.since('FORKLIFT_1', seq)] == \
+        ['2025-10-08T10:01:00Z', '2025-10-08T10:02:00Z']
+    assert index.since('FORKLIFT_2', seq) == []
+    assert index.changed_since(seq) == ['FORKLIFT_1']
+    assert [record['timestamp_utc'] for record in index.since('FORKLIFT_1', seq, limit=1)] == ['2025-10-08T10:02:00Z']
+
+
+def test_cursors_from_another_index_or_the_future_are_stale():
+    index = LatestFixIndex()
+    index.add_rows([fix('FORKLIFT_1', 0)])
+    restarted = LatestFixIndex()
+    restarted.epoch = index.epoch + '0'
+
+    assert restarted.parse_cursor(index.cursor()) is None
+    assert index.parse_cursor(f'{index.epoch}-99') is None
+    assert index.parse_cursor('garbage') is None
+    assert index.parse_cursor(index.cursor('FORKLIFT_1')) == 1
+
+
+def test_ring_keeps_the_newest_fixes_per_device():
+    index = LatestFixIndex(depth=2)
+    index.add_rows([fix('FORKLIFT_1', minute) for minute in range(5)])
+
+    assert [record['timestamp_utc'] for record in index.latest('FORKLIFT_1', limit=5)] == \
+        ['2025-10-08T10:03:00Z', '2025-10-08T10:04:00Z']
+    assert index.device_counts == {'FORKLIFT_1': 5}
+    assert index.latest('FORKLIFT_9') == []
+
+
+def test_copy_is_independent_of_later_fixes():
+    index = LatestFixIndex(depth=10)
+    index.add_rows([fix('FORKLIFT_1', 0)])
+    clone = index.copy()
+    index.add_rows([fix('FORKLIFT_1', 1), fix('FORKLIFT_2', 1)])
+
+    assert clone.seq == 1
+    assert clone.device_ids() == ['FORKLIFT_1']
+    assert len(clone.latest('FORKLIFT_1', limit=10)) == 1
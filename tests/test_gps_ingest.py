@@ -0,0 +1,167 @@
+"""Group-commit log writer and ingest pipeline: ack modes, fsync policies, shutdown flush"""
+
+import threading
+import time
+
+import pytest
+
+from gps_ingest import CSVBatchWriter, CSVLogFile, IngestError, IngestPipeline, build_row
+from gps_log import iter_csv_rows
+
+
+def fix(i):
+    return ['2025-10-08T10:00:00Z', f'FORKLIFT_{i}', '2025-10-08T10:00:00Z', 57.7, 11.9, 5.0, '', 8, 0.9, '10.0.0.1']
+
+
+class CountingLog(CSVLogFile):
+    """Log file that counts fsyncs and can hold writes until released"""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.syncs = 0
+        self.release = threading.Event()
+        self.release.set()
+
+    def write_rows(self, rows):
+        self.release.wait(5)
+        return super().write_rows(rows)
+
+    def sync(self):
+        self.syncs += 1
+        super().sync()
+
+
+def writer(tmp_path, **options):
+    sink = CountingLog(str(tmp_path / 'gps_log.csv'))
+    options.setdefault('flush_interval', 60.0)
+    return CSVBatchWriter(sink.path, sink=sink, **options).start()
+
+
+def logged(log_writer):
+    return [row[1] for row in iter_csv_rows(log_writer.path)]
+
+
+def test_buffered_ack_returns_before_the_write(tmp_path):
+    log_writer = writer(tmp_path, ack='buffered', max_batch=1)
+    log_writer.sink.release.clear()
+    log_writer.append([fix(0)])
+
+    assert logged(log_writer) == []
+    log_writer.sink.release.set()
+    log_writer.close()
+    assert logged(log_writer) == ['FORKLIFT_0']
+
+
+def test_flushed_ack_returns_after_the_write(tmp_path):
+    log_writer = writer(tmp_path, ack='flushed')
+    log_writer.append([fix(0), fix(1)])
+
+    assert logged(log_writer) == ['FORKLIFT_0', 'FORKLIFT_1']
+    assert log_writer.rows_written == 2
+    log_writer.close()
+
+
+def test_flushed_ack_reports_a_failed_write(tmp_path):
+    def full_disk(rows):
+        raise OSError('No space left on device')
+
+    log_writer = writer(tmp_path, ack='flushed')
+    log_writer.sink.write_rows = full_disk
+
+    with pytest.raises(OSError, match='No space left'):
+        log_writer.append([fix(0)])
+    log_writer.close()
+
+
+def test_fsync_always_syncs_every_batch(tmp_path):
+    log_writer = writer(tmp_path, ack='flushed', fsync='always')
+    log_writer.append([fix(0)])
+    log_writer.append([fix(1)])
+
+    assert log_writer.sink.syncs == 2
+    log_writer.close()
+
+
+@pytest.mark.parametrize('fsync', ['interval', 'never'])
+def test_deferred_fsync_waits_for_shutdown(tmp_path, fsync):
+    log_writer = writer(tmp_path, ack='flushed', fsync=fsync, fsync_interval=60.0)
+    log_writer.append([fix(0)])
+    log_writer.append([fix(1)])
+
+    assert log_writer.sink.syncs == 0
+    log_writer.close()
+    assert log_writer.sink.syncs == 1
+
+
+def test_interval_fsync_syncs_an_idle_log(tmp_path):
+    log_writer = writer(tmp_path, ack='flushed', fsync='interval', fsync_interval=0.05)
+    log_writer.append([fix(0)])
+
+    for _ in range(100):
+        if log_writer.sink.syncs:
+            break
+        time.sleep(0.02)
+    assert log_writer.sink.syncs == 1
+    log_writer.close()
+
+
+def test_close_flushes_pending_rows(tmp_path):
+    log_writer = writer(tmp_path, ack='buffered', max_batch=1000)
+    log_writer.append([fix(0), fix(1)])
+    log_writer.append([fix(2)])
+
+    assert log_writer.pending == 3
+    log_writer.close()
+    assert logged(log_writer) == ['FORKLIFT_0', 'FORKLIFT_1', 'FORKLIFT_2']
+    with pytest.raises(OSError):
+        log_writer.append([fix(3)])
+
+
+def test_failing_flush_listener_keeps_the_writer_running(tmp_path):
+    log_writer = writer(tmp_path, ack='flushed')
+    flushed = []
+    log_writer.add_flush_listener(lambda rows, end_offset: 1 / 0)
+    log_writer.add_flush_listener(lambda rows, end_offset: flushed.extend(rows))
+    log_writer.append([fix(0)])
+    log_writer.append([fix(1)])
+    log_writer.close()
+
+    assert log_writer.listener_errors == 2
+    assert [row[1] for row in flushed] == ['FORKLIFT_0', 'FORKLIFT_1']
+
+
+def test_pipeline_filters_before_storing_and_isolates_listeners(tmp_path):
+    log_writer = writer(tmp_path, ack='flushed')
+    pipeline = IngestPipeline(log_writer)
+    seen = []
+    pipeline.add_filter(lambda rows: [row for row in rows if row[1] != 'FORKLIFT_1'])
+    pipeline.add_listener(lambda rows: 1 / 0)
+    pipeline.add_listener(seen.extend)
+    pipeline.append([fix(0), fix(1), fix(2)])
+    log_writer.close()
+
+    assert logged(log_writer) == ['FORKLIFT_0', 'FORKLIFT_2']
+    assert [row[1] for row in seen] == ['FORKLIFT_0', 'FORKLIFT_2']
+    assert pipeline.listener_errors == 1
+
+
+@pytest.mark.parametrize('data, code', [
+    ({'timestamp_utc': 'now', 'lat': 1, 'lng': 2}, 'missing_device_id'),
+    ({'device_id': '!!', 'timestamp_utc': 'now', 'lat': 1, 'lng': 2}, 'invalid_device_id'),
+    ({'device_id': 'F1', 'timestamp_utc': 'now', 'lat': 91, 'lng': 2}, 'invalid_lat'),
+    ({'device_id': 'F1', 'timestamp_utc': 'now', 'lat': 1, 'lng': 'nan'}, 'invalid_lng'),
+    ({'device_id': 'F1', 'timestamp_utc': 'now', 'lat': 1, 'lng': 2, 'speed_kmh': 'inf'}, 'invalid_speed_kmh'),
+    ([], 'invalid_json'),
+])
+def test_build_row_rejects_invalid_fixes(data, code):
+    with pytest.raises(IngestError) as error:
+        build_row(data)
+    assert error.value.code == code
+
+
+def test_build_row_types_and_cleans_fields():
+    row = build_row({'device_id': 'FORK LIFT/1', 'timestamp_utc': '2025-10-08T10:00:00Z',
+                     'lat': '57.7', 'lng': 11.9, 'sats': '7.0'}, '10.0.0.1', 0)
+
+    assert row == ['1970-01-01T00:00:00Z', 'FORKLIFT1', '2025-10-08T10:00:00Z', 57.7, 11.9,
+                   None, None, 7, None, '10.0.0.1']
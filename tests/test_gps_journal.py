@@ -0,0 +1,85 @@
+"""Write-ahead journal: what a crash after a failed log write leaves to recover"""
+
+from gps_ingest import CSVBatchWriter, CSVLogFile
+from gps_journal import IngestJournal, read_records, unapplied_rows
+from gps_log import format_rows, iter_csv_rows
+
+
+def fix(i):
+    return ['2025-10-08T10:00:00Z', f'FORKLIFT_{i}', '2025-10-08T10:00:00Z', 57.7, 11.9, 5.0, '', 8, 0.9, '10.0.0.1']
+
+
+class FailingOnceLog(CSVLogFile):
+    def __init__(self, path):
+        super().__init__(path)
+        self.failures = 1
+
+    def write_rows(self, rows):
+        if self.failures:
+            self.failures -= 1
+            raise OSError('No space left on device')
+        return super().write_rows(rows)
+
+
+def writer(tmp_path, sink, fsync='always'):
+    journal = IngestJournal(str(tmp_path / 'gps_log.journal'), fsync)
+    return CSVBatchWriter(sink.path, fsync=fsync, ack='flushed', sink=sink, journal=journal).start()
+
+
+def test_failed_batch_stays_in_the_journal(tmp_path):
+    sink = FailingOnceLog(str(tmp_path / 'gps_log.csv'))
+    log_writer = writer(tmp_path, sink)
+    try:
+        log_writer.append([fix(0), fix(1)])
+    except OSError:
+        pass
+    log_writer.append([fix(2)])
+    log_writer.close()
+
+    rows, _ = unapplied_rows(read_records(log_writer.journal.path)[0])
+    assert [row[1] for row in rows] == ['FORKLIFT_0', 'FORKLIFT_1', 'FORKLIFT_2']
+
+
+def test_recovery_appends_the_failed_batch(tmp_path):
+    sink = FailingOnceLog(str(tmp_path / 'gps_log.csv'))
+    log_writer = writer(tmp_path, sink)
+    try:
+        log_writer.append([fix(0), fix(1)])
+    except OSError:
+        pass
+    log_writer.append([fix(2)])
+    log_writer.close()
+
+    log_writer = writer(tmp_path, CSVLogFile(sink.path))
+    log_writer.close()
+
+    assert log_writer.journal.recovered == 2
+    assert sorted(row[1] for row in iter_csv_rows(sink.path)) == ['FORKLIFT_0', 'FORKLIFT_1', 'FORKLIFT_2']
+
+
+def test_checkpoints_cover_written_rows(tmp_path):
+    log_writer = writer(tmp_path, CSVLogFile(str(tmp_path / 'gps_log.csv')))
+    log_writer.append([fix(0), fix(1)])
+    log_writer.close()
+
+    assert unapplied_rows(read_records(log_writer.journal.path)[0])[0] == []
+
+
+def test_recovery_replaces_a_torn_last_line(tmp_path):
+    sink = CSVLogFile(str(tmp_path / 'gps_log.csv'))
+    sink.open()
+    journal = IngestJournal(str(tmp_path / 'gps_log.journal'), 'always')
+    journal.recover(sink)
+    journal.append(0, [fix(0), fix(1), fix(2)])
+    journal.close()
+    # Crash halfway through the batch: one whole line and part of the next reached the log
+    lines = format_rows([fix(0), fix(1)])
+    sink.close()
+    with open(sink.path, 'a', newline='') as fh:
+        fh.write(lines[:len(lines) - 20])
+
+    log_writer = writer(tmp_path, CSVLogFile(sink.path))
+    log_writer.close()
+
+    assert log_writer.journal.recovered == 2
+    assert [row[1] for row in iter_csv_rows(sink.path)] == ['FORKLIFT_0', 'FORKLIFT_1', 'FORKLIFT_2']
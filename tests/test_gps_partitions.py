@@ -0,0 +1,57 @@
+"""Partitioned log store: sealing finished segments into archives"""
+
+import os
+
+from gps_log import iter_csv_rows
+from gps_partitions import REJECTED_SUFFIX, PartitionedLogStore
+
+
+def fix(server_time, device_id, lat='57.7'):
+    return [server_time, device_id, server_time, lat, '11.9', '5.5', '', '8', '0.9', '10.0.0.1']
+
+
+def segment_files(store):
+    return sorted(name for name in store.segments)
+
+
+def test_seal_keeps_rows_the_archive_cannot_hold(tmp_path):
+    store = PartitionedLogStore(str(tmp_path / 'gps_log')).open()
+    store.write_rows([
+        fix('2025-10-08T10:00:00Z', 'FORKLIFT_1'),
+        fix('2025-10-08T10:00:01Z', 'FORKLIFT_2', lat='300'),
+        fix('2025-10-08T10:00:02Z', 'FORKLIFT_3', lat='inf'),
+        fix('2025-10-08T10:00:03Z', 'FORKLIFT_4'),
+    ])
+    csv_name, = segment_files(store)
+
+    assert store.seal() == [csv_name[:-len('.csv')] + '.gpsc']
+    rejected_path = os.path.join(store.path, csv_name + REJECTED_SUFFIX)
+    assert not os.path.exists(os.path.join(store.path, csv_name))
+    assert [row[1] for row in iter_csv_rows(rejected_path)] == ['FORKLIFT_2', 'FORKLIFT_3']
+    assert [row[1] for row in store.iter_rows()] == ['FORKLIFT_1', 'FORKLIFT_4']
+    store.close()
+
+
+def test_seal_merges_late_rows_into_an_archive(tmp_path):
+    store = PartitionedLogStore(str(tmp_path / 'gps_log')).open()
+    store.write_rows([fix('2025-10-08T10:00:00Z', 'FORKLIFT_1')])
+    store.seal()
+    store.write_rows([fix('2025-10-08T11:00:00Z', 'FORKLIFT_2')])
+    store.seal()
+
+    assert [name.endswith('.gpsc') for name in segment_files(store)] == [True]
+    assert [row[1] for row in store.iter_rows()] == ['FORKLIFT_1', 'FORKLIFT_2']
+    assert not any(name.endswith(REJECTED_SUFFIX) for _, _, names in os.walk(store.path) for name in names)
+    store.close()
+
+
+def test_rejected_files_are_not_segments(tmp_path):
+    store = PartitionedLogStore(str(tmp_path / 'gps_log')).open()
+    store.write_rows([fix('2025-10-08T10:00:00Z', 'FORKLIFT_1', lat='-95')])
+    store.seal()
+    store.close()
+
+    reopened = PartitionedLogStore(store.path).open()
+    assert list(reopened.iter_rows()) == []
+    assert all(not name.endswith(REJECTED_SUFFIX) for name in reopened.segments)
+    reopened.close()
@@ -0,0 +1,58 @@
+"""Proximity alerts between vehicles at the demo sites (Gothenburg and New York)"""
+
+from gps_proximity import ProximityDetector
+
+METERS_PER_DEGREE = 111320.0
+SITES = {'gothenburg': (57.7089, 11.9746), 'new_york': (40.7128, -74.0060)}
+
+
+def place(detector, device_id, site, east_m=0.0, now=1000.0):
+    lat, lng = SITES[site]
+    detector.update(device_id, lat, lng + east_m / 40000.0, now)
+
+
+def test_close_pairs_at_each_site_and_none_across_sites():
+    detector = ProximityDetector(distance_m=5, warn_m=15)
+    place(detector, 'GBG_1', 'gothenburg')
+    place(detector, 'GBG_2', 'gothenburg', east_m=0.6)
+    place(detector, 'NYC_1', 'new_york')
+    place(detector, 'NYC_2', 'new_york', east_m=0.6)
+
+    pairs = {(a[0], b[0]): (round(distance), severity) for a, b, distance, _, severity in detector.close_pairs(1000.0)}
+    # 0.6 / 40000 degrees of longitude is ~0.9 m in Gothenburg, ~1.3 m in New York
+    assert pairs == {('GBG_1', 'GBG_2'): (1, 'critical'), ('NYC_1', 'NYC_2'): (1, 'critical')}
+
+
+def test_warning_only_when_closing_in():
+    detector = ProximityDetector(distance_m=5, warn_m=15, closing_kmh=5)
+    detector.update('A', 57.7, 11.9, 1000.0)
+    detector.update('B', 57.7 + 20 / METERS_PER_DEGREE, 11.9, 1000.0)
+    detector.update('B', 57.7 + 12 / METERS_PER_DEGREE, 11.9, 1002.0)
+
+    assert [pair[4] for pair in detector.close_pairs(1002.0)] == ['warning']
+    detector.update('B', 57.7 + 13 / METERS_PER_DEGREE, 11.9, 1004.0)
+    assert detector.close_pairs(1004.0) == []
+
+
+def test_scan_records_new_escalated_and_cleared_alerts():
+    detector = ProximityDetector(distance_m=5, warn_m=15, closing_kmh=5)
+    detector.update('A', 57.7, 11.9, 1000.0)
+    detector.update('B', 57.7 + 20 / METERS_PER_DEGREE, 11.9, 1000.0)
+    detector.update('B', 57.7 + 12 / METERS_PER_DEGREE, 11.9, 1002.0)
+    assert [alert['severity'] for alert in detector.scan(1002.0)] == ['warning']
+
+    detector.update('B', 57.7 + 3 / METERS_PER_DEGREE, 11.9, 1004.0)
+    assert [alert['severity'] for alert in detector.scan(1004.0)] == ['critical']
+    assert detector.scan(1004.5) == []
+
+    detector.update('B', 57.7 + 40 / METERS_PER_DEGREE, 11.9, 1006.0)
+    assert [alert['severity'] for alert in detector.scan(1006.0)] == ['clear']
+    assert [alert['severity'] for alert in detector.alerts_since(device_id='A')] == ['warning', 'critical', 'clear']
+
+
+def test_stale_positions_are_ignored():
+    detector = ProximityDetector(max_age_s=30)
+    place(detector, 'GBG_1', 'gothenburg', now=1000.0)
+    place(detector, 'GBG_2', 'gothenburg', now=900.0)
+
+    assert detector.close_pairs(1000.0) == []